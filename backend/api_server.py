@@ -2,7 +2,7 @@
 Flask REST API Server for AI Surveillance System
 Provides endpoints for React frontendfghjk
 """
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import cv2
 import numpy as np
@@ -14,9 +14,20 @@ import base64
 from io import BytesIO
 from PIL import Image
 import json
+import mimetypes
+from functools import partial
 
 from face_detector import FaceDetector
-from database import SurveillanceDB
+from database import SurveillanceDB, epoch_ms, iso_from_ms
+from frame_buffer import FrameBuffer
+from recorder import VideoRecorder
+from jpeg_cache import JpegCache
+from events import EventBroker
+from image_index import ImageIndex
+from recording_indexer import RecordingIndexer
+from storage_manager import StorageManager
+from archiver import EventArchiver
+from overlay import build_overlay, draw_annotations
 import config
 
 app = Flask(__name__)
@@ -27,19 +38,114 @@ camera_state = {
     'is_running': False,
     'is_recording': False,
     'cap': None,
-    'current_frame': None,
     'faces_detected': [],
-    'video_writer': None,
     'recording_path': None,
+    'camera_id': str(config.CAMERA_ID),  # Source opened by the last camera start
     'detected_persons': {}  # Track last detection time for each person
 }
 
 face_detector = FaceDetector()
 db = SurveillanceDB()
 
+# Latest camera frame, shared with readers without per-frame copies
+frame_buffer = FrameBuffer()
+
+# JPEG encodes of the latest frame, shared by all pollers and stream clients
+jpeg_cache = JpegCache(frame_buffer, max_variants=16)
+
+# Video metadata and poster thumbnails are extracted once per recording, off the request path
+recording_indexer = RecordingIndexer(db)
+
+# Enforces the max_storage_gb quota from a ledger fed by closed segments and saved crops
+storage_manager = StorageManager(db, face_detector.crop_store)
+if face_detector.crop_store:
+    face_detector.crop_writer.on_write = partial(storage_manager.add, 'crops')
+recording_indexer.on_thumbnail = partial(storage_manager.add, 'thumbnails')
+
+# Moves old detections and logs to monthly archive files; reports still read them
+event_archiver = EventArchiver(db)
+
+def on_segment_closed(**segment):
+    """Register, index and account for a closed recording segment"""
+    recording_indexer.add_segment(**segment)
+    storage_manager.add('recordings', segment['byte_size'])
+    
+    # A rollover closed the segment we were pointing at: follow the recorder to the next one
+    if segment['file_path'] == camera_state['recording_path']:
+        camera_state['recording_path'] = recorder.current_path
+
+# Recordings are encoded on their own thread so encoder stalls never hold the lock;
+# each closed segment is registered in the recordings table. Recording is only
+# started by hand here, so no pre-record buffer is kept
+recorder = VideoRecorder(on_segment=on_segment_closed, annotate=config.RECORDING_ANNOTATED, preroll=False)
+
+# Server push channel for dashboards (Server-Sent Events)
+events = EventBroker()
+
+# Resolves /api/images names and caches thumbnails
+image_index = ImageIndex(face_detector.crop_store)
+image_index.on_thumbnail = partial(storage_manager.add, 'thumbnails')
+
 # Thread lock
 lock = threading.Lock()
 
+# Settings the running pipeline reads per frame, kept current by apply_live_settings
+pipeline_settings = {
+    'detection_interval': config.DETECTION_INTERVAL,
+    'enable_alerts': config.ENABLE_ALERTS,
+    'alert_cooldown': config.ALERT_COOLDOWN,
+    'enable_recording': config.ENABLE_RECORDING
+}
+
+# Settings applied without a restart (camera settings apply on the next camera start)
+LIVE_SETTINGS = ('detection_interval', 'enable_alerts', 'alert_cooldown', 'enable_recording',
+                 'recognition_threshold', 'recording_duration')
+
+def apply_live_settings(changes):
+    """Settings subscriber: push changed values into the pipeline, detector and recorder"""
+    if 'detection_interval' in changes:
+        pipeline_settings['detection_interval'] = max(1, int(changes['detection_interval']))
+    if 'enable_alerts' in changes:
+        pipeline_settings['enable_alerts'] = bool(changes['enable_alerts'])
+    if 'alert_cooldown' in changes:
+        # Seconds before the same person is logged (and alerted on) again
+        pipeline_settings['alert_cooldown'] = max(0, float(changes['alert_cooldown']))
+    if 'enable_recording' in changes:
+        pipeline_settings['enable_recording'] = bool(changes['enable_recording'])
+        if not pipeline_settings['enable_recording']:
+            # Disabling recording also ends the one in progress
+            with lock:
+                if camera_state['is_recording']:
+                    stop_recording_internal()
+    if 'recognition_threshold' in changes:
+        face_detector.recognition_threshold = float(changes['recognition_threshold'])
+    if 'recording_duration' in changes:
+        # Length of each recording file; the open segment rotates at the new length
+        recorder.segment_seconds = max(1, int(changes['recording_duration']))
+
+db.subscribe_settings(apply_live_settings, LIVE_SETTINGS)
+
+def publish_camera_state():
+    """Push the current camera state to subscribers"""
+    events.publish('camera', {
+        'is_running': camera_state['is_running'],
+        'is_recording': camera_state['is_recording'],
+        'faces_detected': len(camera_state['faces_detected'])
+    })
+
+# Statistics deltas pushed along with each logged row
+LOGGED_STATS = {
+    'detection': {'total_detections': 1, 'detections_today': 1},
+    'alert': {'pending_alerts': 1}
+}
+
+def publish_logged(event_type, data, row_id):
+    """Push a detection or alert once the batch writer has committed it"""
+    if row_id is None:
+        return  # The write failed; there is nothing for clients to fetch
+    events.publish(event_type, dict(data, id=row_id))
+    events.publish('stats', LOGGED_STATS[event_type])
+
 # ============= CAMERA CONTROL ENDPOINTS =============
 
 @app.route('/api/camera/start', methods=['POST'])
@@ -52,19 +158,22 @@ def start_camera():
             return jsonify({'success': False, 'message': 'Camera already running'})
         
         try:
-            camera_state['cap'] = cv2.VideoCapture(config.CAMERA_ID)
+            source = db.get_setting('camera_id', config.CAMERA_ID)
+            camera_state['cap'] = cv2.VideoCapture(source)
             
             if not camera_state['cap'].isOpened():
                 return jsonify({'success': False, 'message': 'Failed to open camera'})
             
-            camera_state['cap'].set(cv2.CAP_PROP_FRAME_WIDTH, config.CAMERA_WIDTH)
-            camera_state['cap'].set(cv2.CAP_PROP_FRAME_HEIGHT, config.CAMERA_HEIGHT)
+            camera_state['cap'].set(cv2.CAP_PROP_FRAME_WIDTH, db.get_setting('camera_width', config.CAMERA_WIDTH))
+            camera_state['cap'].set(cv2.CAP_PROP_FRAME_HEIGHT, db.get_setting('camera_height', config.CAMERA_HEIGHT))
+            camera_state['camera_id'] = recorder.camera_id = str(source)
             camera_state['is_running'] = True
             
             # Start processing thread
             threading.Thread(target=process_camera_feed, daemon=True).start()
             
             db.log_system_event("INFO", "Camera started via API")
+            publish_camera_state()
             
             return jsonify({'success': True, 'message': 'Camera started'})
         
@@ -89,11 +198,12 @@ def stop_camera():
             camera_state['cap'].release()
             camera_state['cap'] = None
         
-        camera_state['current_frame'] = None
+        frame_buffer.clear()
         camera_state['faces_detected'] = []
         camera_state['detected_persons'] = {}  # Clear detection history
         
         db.log_system_event("INFO", "Camera stopped via API")
+        publish_camera_state()
         
         return jsonify({'success': True, 'message': 'Camera stopped'})
 
@@ -103,20 +213,25 @@ def camera_status():
     return jsonify({
         'is_running': camera_state['is_running'],
         'is_recording': camera_state['is_recording'],
-        'faces_detected': len(camera_state['faces_detected'])
+        'faces_detected': len(camera_state['faces_detected']),
+        'recorder': recorder.stats(),
+        'crop_writer': face_detector.crop_writer.stats(),
+        'db_writer': db.writer.stats(),
+        'recording_indexer': recording_indexer.stats(),
+        'jpeg_cache': jpeg_cache.stats(),
+        'frame_buffer': frame_buffer.stats()
     })
 
 @app.route('/api/camera/frame', methods=['GET'])
 def get_frame():
     """Get current camera frame as JPEG"""
-    if camera_state['current_frame'] is None:
-        return jsonify({'success': False, 'message': 'No frame available'}), 404
-    
     try:
-        # Encode frame to JPEG with quality optimization
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 75]  # Reduced quality for faster transfer
-        _, buffer = cv2.imencode('.jpg', camera_state['current_frame'], encode_param)
-        img_base64 = base64.b64encode(buffer).decode('utf-8')
+        # Reduced quality for faster transfer; encoded once per frame for all viewers
+        encoded = jpeg_cache.get(quality=75, annotated=True)
+        if encoded is None:
+            return jsonify({'success': False, 'message': 'No frame available'}), 404
+        
+        img_base64 = base64.b64encode(encoded.data).decode('utf-8')
         
         return jsonify({
             'success': True,
@@ -127,17 +242,92 @@ def get_frame():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/camera/frame.jpg', methods=['GET'])
+def get_frame_jpeg():
+    """
+    Get current camera frame as binary JPEG
+    With ?after=<seq> or If-None-Match, waits until a newer frame exists
+    """
+    after = request.args.get('after', type=int)
+    if after is None:
+        for tag in request.if_none_match:
+            if tag.isdigit():
+                after = int(tag)
+    
+    if after is not None:
+        timeout = min(request.args.get('timeout', 10, type=float), 30)
+        if frame_buffer.wait_for(after, timeout) is None and frame_buffer.has_frame():
+            return Response(status=304, headers={'ETag': f'"{after}"', 'X-Frame-Seq': str(after)})
+    
+    quality = max(10, min(request.args.get('quality', 75, type=int), 95))
+    annotated = request.args.get('annotated', 0, type=int) == 1
+    encoded = jpeg_cache.get(quality=quality, annotated=annotated)
+    if encoded is None:
+        return jsonify({'success': False, 'message': 'No frame available'}), 404
+    
+    response = Response(encoded.data, mimetype='image/jpeg')
+    response.set_etag(str(encoded.seq))
+    response.headers['X-Frame-Seq'] = str(encoded.seq)
+    response.headers['X-Frame-Size'] = f"{encoded.width}x{encoded.height}"
+    # Overlay metadata for this exact frame, so clients can draw boxes themselves
+    response.headers['X-Frame-Overlay'] = json.dumps(encoded.meta or {})
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Frame-Seq, X-Frame-Size, X-Frame-Overlay'
+    return response
+
+@app.route('/api/camera/faces', methods=['GET'])
+def get_faces():
+    """Get face metadata for the current frame"""
+    return jsonify({
+        'success': True,
+        'seq': frame_buffer.seq,
+        'faces': camera_state['faces_detected']
+    })
+
 @app.route('/api/camera/stream')
 def video_stream():
-    """Stream video feed"""
+    """
+    Stream video feed (MJPEG)
+    Optional query parameters: fps (max frame rate), width, quality, annotated (default 1)
+    """
+    annotated = request.args.get('annotated', 1, type=int) == 1
+    max_fps = max(1, min(request.args.get('fps', config.CAMERA_FPS, type=int), config.CAMERA_FPS))
+    width = request.args.get('width', type=int)
+    quality = request.args.get('quality', 95, type=int)
+    
+    # Quantize so clients with similar settings share the same cached encodes
+    quality = max(30, min(95, int(round(quality / 5.0)) * 5))
+    if width:
+        width = max(160, int(round(width / 80.0)) * 80)
+    
     def generate():
+        interval = 1.0 / max_fps
+        last_seq = 0
+        last_sent = 0
+        
         while camera_state['is_running']:
-            if camera_state['current_frame'] is not None:
-                _, buffer = cv2.imencode('.jpg', camera_state['current_frame'])
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.033)  # ~30 FPS
+            # Respect the client's frame rate cap
+            remaining = interval - (time.monotonic() - last_sent)
+            if remaining > 0:
+                time.sleep(remaining)
+            
+            # Only send frames the client has not seen yet
+            if frame_buffer.wait_for(last_seq, timeout=1.0) is None:
+                if not frame_buffer.has_frame():
+                    time.sleep(0.05)
+                continue
+            
+            encoded = jpeg_cache.get(quality=quality, width=width, annotated=annotated)
+            if encoded is None or encoded.seq == last_seq:
+                continue
+            
+            last_seq = encoded.seq
+            last_sent = time.monotonic()
+            
+            # The yield blocks while a slow client drains its socket; frames
+            # published meanwhile are skipped rather than queued
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + encoded.data + b'\r\n')
     
     return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
@@ -153,21 +343,20 @@ def start_recording():
         if camera_state['is_recording']:
             return jsonify({'success': False, 'message': 'Already recording'})
         
+        if not pipeline_settings['enable_recording']:
+            return jsonify({'success': False, 'message': 'Recording is disabled in settings'})
+        
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"recording_{timestamp}.mp4"
             camera_state['recording_path'] = os.path.join(config.RECORDINGS_DIR, filename)
             
-            fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
-            camera_state['video_writer'] = cv2.VideoWriter(
-                camera_state['recording_path'],
-                fourcc,
-                config.VIDEO_FPS,
-                (config.CAMERA_WIDTH, config.CAMERA_HEIGHT)
-            )
+            # Non-blocking: the recorder thread opens the file
+            recorder.start(camera_state['recording_path'])
             
             camera_state['is_recording'] = True
             db.log_system_event("INFO", f"Recording started: {filename}")
+            publish_camera_state()
             
             return jsonify({'success': True, 'message': 'Recording started', 'filename': filename})
         
@@ -186,30 +375,33 @@ def stop_recording_internal():
     if not camera_state['is_recording']:
         return {'success': False, 'message': 'Not recording'}
     
-    if camera_state['video_writer']:
-        camera_state['video_writer'].release()
-        camera_state['video_writer'] = None
+    # Non-blocking: queued frames are flushed by the recorder thread
+    path = recorder.stop()
     
-    filename = os.path.basename(camera_state['recording_path']) if camera_state['recording_path'] else None
+    filename = os.path.basename(path) if path else None
     camera_state['is_recording'] = False
     camera_state['recording_path'] = None
     
     db.log_system_event("INFO", f"Recording stopped: {filename}")
+    publish_camera_state()
     
     return {'success': True, 'message': 'Recording stopped', 'filename': filename}
 
 @app.route('/api/camera/snapshot', methods=['POST'])
 def take_snapshot():
     """Take a snapshot from current frame"""
-    if camera_state['current_frame'] is None:
-        return jsonify({'success': False, 'message': 'No frame available'})
-    
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"snapshot_{timestamp}.jpg"
-        filepath = os.path.join(config.DATA_DIR, filename)
-        
-        cv2.imwrite(filepath, camera_state['current_frame'])
+        with frame_buffer.read() as view:
+            if view is None:
+                return jsonify({'success': False, 'message': 'No frame available'})
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"snapshot_{timestamp}.jpg"
+            filepath = os.path.join(config.DATA_DIR, filename)
+            
+            # Snapshots keep the annotations, drawn on a copy of the raw frame
+            snapshot = draw_annotations(view.frame.copy(), view.meta)
+            cv2.imwrite(filepath, snapshot)
         
         return jsonify({'success': True, 'message': 'Snapshot saved', 'filename': filename})
     except Exception as e:
@@ -293,6 +485,7 @@ def add_student():
             return jsonify({'success': True, 'message': f'Student {name} face data updated successfully'})
         
         db.log_system_event("INFO", f"Student added: {name}")
+        events.publish('stats', {'known_persons': 1})
         print(f"✅ Student {name} added successfully to database")
         
         # Verify it was added
@@ -336,66 +529,139 @@ def delete_student(student_id):
 
 # ============= DETECTION & ALERTS ENDPOINTS =============
 
-@app.route('/api/detections/recent', methods=['GET'])
-def get_recent_detections():
-    """Get recent detections"""
+# Largest page the listing endpoints return
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(row):
+    """Opaque cursor for the (timestamp, id) of the last row on a page"""
+    return base64.urlsafe_b64encode(f"{row['timestamp']}|{row['id']}".encode()).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return int(timestamp), int(row_id)
+    except (UnicodeError, ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def read_page_args():
+    """Get (before, limit) from ?cursor= and ?limit=; raises ValueError"""
+    cursor = request.args.get('cursor')
     limit = request.args.get('limit', 50, type=int)
-    detections = db.get_recent_detections(limit=limit)
+    return (decode_cursor(cursor) if cursor else None), max(1, min(limit, MAX_PAGE_SIZE))
+
+def read_time_arg(name):
+    """Get an ISO 8601 query parameter as epoch ms (None if absent); raises ValueError"""
+    value = request.args.get(name)
+    return epoch_ms(datetime.fromisoformat(value)) if value else None
+
+def day_start_ms(day):
+    """Epoch ms of local midnight at the start of a date"""
+    return epoch_ms(datetime.combine(day, datetime.min.time()))
+
+def paged(rows, limit):
+    """Split a LIMIT + 1 result into (page, next_cursor)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def serialize_detection(row):
+    """Convert a detection_events row to JSON"""
+    return {
+        'id': row['id'],
+        'timestamp': iso_from_ms(row['timestamp']),
+        'person_id': row['person_id'],
+        'person_name': row['person_name'],
+        'confidence': row['confidence'],
+        'face_image_path': row['face_image_path'],
+        'video_path': row['video_path'],
+        'camera_id': row['camera_id'],
+        'is_intruder': row['person_name'] is None  # Intruder if name is None
+    }
+
+def serialize_alert(row):
+    """Convert an alerts row to JSON"""
+    return {
+        'id': row['id'],
+        'timestamp': iso_from_ms(row['timestamp']),
+        'alert_type': row['alert_type'],
+        'person_id': row['person_id'],
+        'person_name': row['person_name'],
+        'description': row['description'],
+        'acknowledged': row['acknowledged']
+    }
+
+def list_detections(person_name=None):
+    """
+    One page of detections, newest first
+    Query: cursor, limit, camera_id, start/end (ISO timestamps), known=true|false
+    """
+    try:
+        before, limit = read_page_args()
+        start_time, end_time = read_time_arg('start'), read_time_arg('end')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or time range'}), 400
     
-    result = []
-    for det in detections:
-        result.append({
-            'id': det[0],
-            'timestamp': det[1],
-            'person_id': det[2],
-            'person_name': det[3],
-            'confidence': det[4],
-            'face_image_path': det[5],
-            'video_path': det[6],
-            'camera_id': det[7],
-            'is_intruder': det[3] is None  # Intruder if name is None
-        })
+    known = request.args.get('known')
+    rows = db.get_detections(
+        before=before,
+        limit=limit + 1,
+        person_name=person_name,
+        known=None if known is None else known.lower() == 'true',
+        camera_id=request.args.get('camera_id'),
+        start_time=start_time,
+        end_time=end_time
+    )
+    rows, next_cursor = paged(rows, limit)
     
-    return jsonify({'success': True, 'detections': result})
+    return jsonify({
+        'success': True,
+        'detections': [serialize_detection(r) for r in rows],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/detections/recent', methods=['GET'])
+def get_recent_detections():
+    """Get recent detections, one page at a time"""
+    return list_detections()
 
 @app.route('/api/detections/student/<string:name>', methods=['GET'])
 def get_student_detections(name):
-    """Get all detections for a specific student"""
-    detections = db.get_detections_by_person(name)
-    
-    result = []
-    for det in detections:
-        result.append({
-            'id': det[0],
-            'timestamp': det[1],
-            'person_id': det[2],
-            'person_name': det[3],
-            'confidence': det[4],
-            'face_image_path': det[5],
-            'video_path': det[6],
-            'camera_id': det[7]
-        })
-    
-    return jsonify({'success': True, 'detections': result})
+    """Get a student's detections, one page at a time"""
+    return list_detections(person_name=name)
 
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
-    """Get unacknowledged alerts"""
-    alerts = db.get_unacknowledged_alerts()
+    """
+    Get alerts, newest first, one page at a time
+    Query: cursor, limit, status=pending|acknowledged|all (default pending), type, start/end
+    """
+    try:
+        before, limit = read_page_args()
+        start_time, end_time = read_time_arg('start'), read_time_arg('end')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid cursor or time range'}), 400
     
-    result = []
-    for alert in alerts:
-        result.append({
-            'id': alert[0],
-            'timestamp': alert[1],
-            'alert_type': alert[2],
-            'person_id': alert[3],
-            'person_name': alert[4],
-            'description': alert[5],
-            'acknowledged': alert[6]
-        })
+    status = request.args.get('status', 'pending')
+    acknowledged = {'pending': False, 'acknowledged': True}.get(status)
     
-    return jsonify({'success': True, 'alerts': result})
+    rows = db.get_alerts(
+        before=before,
+        limit=limit + 1,
+        acknowledged=acknowledged,
+        alert_type=request.args.get('type'),
+        start_time=start_time,
+        end_time=end_time
+    )
+    rows, next_cursor = paged(rows, limit)
+    
+    return jsonify({
+        'success': True,
+        'alerts': [serialize_alert(r) for r in rows],
+        'counts': db.get_alert_counts(),
+        'next_cursor': next_cursor
+    })
 
 @app.route('/api/alerts/<int:alert_id>/acknowledge', methods=['POST'])
 def acknowledge_alert(alert_id):
@@ -403,6 +669,7 @@ def acknowledge_alert(alert_id):
     success = db.acknowledge_alert(alert_id)
     
     if success:
+        events.publish('alert_acknowledged', {'id': alert_id})
         return jsonify({'success': True, 'message': 'Alert acknowledged'})
     else:
         return jsonify({'success': False, 'message': 'Failed to acknowledge alert'})
@@ -415,111 +682,259 @@ def get_statistics():
     stats = db.get_statistics()
     
     # Add additional stats
-    alerts = db.get_unacknowledged_alerts()
-    intruder_count = len([a for a in alerts if a[2] == 'UNKNOWN_PERSON'])
-    
-    stats['pending_intruder_alerts'] = intruder_count
     stats['camera_status'] = camera_state['is_running']
     stats['recording_status'] = camera_state['is_recording']
     
     return jsonify({'success': True, 'statistics': stats})
 
-@app.route('/api/reports/daily', methods=['GET'])
-def get_daily_report():
-    """Get daily activity report"""
-    date = request.args.get('date', datetime.now().date().isoformat())
+@app.route('/api/storage', methods=['GET'])
+def get_storage():
+    """Get storage usage against the quota, what retention has reclaimed and the event archive"""
+    return jsonify({'success': True, 'storage': storage_manager.stats(), 'archive': event_archiver.stats(),
+                    'thumbnail_cache': image_index.stats()})
+
+def parse_report_range(default_today=True):
+    """
+    Read the report date range from ?date= or ?start=&end= (inclusive days)
+    Returns (start_day, end_day) as dates, None for an open end; raises ValueError
+    """
+    date = request.args.get('date')
+    start = request.args.get('start', date)
+    end = request.args.get('end', date)
     
-    # Get detections for the day
-    detections = db.get_recent_detections(limit=1000)
+    today = datetime.now().date()
+    start_day = datetime.strptime(start, '%Y-%m-%d').date() if start else (today if default_today else None)
+    end_day = datetime.strptime(end, '%Y-%m-%d').date() if end else (today if default_today else None)
     
-    # Filter by date
-    daily_detections = [d for d in detections if d[1].startswith(date)]
+    if start_day and end_day and end_day < start_day:
+        raise ValueError("end is before start")
+    return start_day, end_day
+
+@app.route('/api/reports/daily', methods=['GET'])
+def get_daily_report():
+    """Get the activity report for a day (?date=) or a range of days (?start=&end=)"""
+    try:
+        start_day, end_day = parse_report_range()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Dates must be YYYY-MM-DD, with end not before start'}), 400
+    camera_id = request.args.get('camera_id')
+    limit = max(1, min(request.args.get('limit', MAX_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
     
-    # Categorize
+    # Counts and first/last seen come from the daily rollups, so busy days are never truncated
     students = {}
-    intruders = []
-    
-    for det in daily_detections:
-        if det[3]:  # Known student
-            if det[3] not in students:
-                students[det[3]] = {'count': 0, 'first_seen': det[1], 'last_seen': det[1]}
-            students[det[3]]['count'] += 1
-            students[det[3]]['last_seen'] = det[1]
-        else:  # Intruder
-            intruders.append({
-                'timestamp': det[1],
-                'person_id': det[2],
-                'face_image_path': det[5]
-            })
+    intruder_count = 0
+    for row in db.get_detection_summary(start_day.isoformat(), end_day.isoformat(), camera_id=camera_id):
+        if row['person_name']:
+            students[row['person_name']] = {
+                'count': row['count'],
+                'first_seen': iso_from_ms(row['first_seen']),
+                'last_seen': iso_from_ms(row['last_seen'])
+            }
+        else:
+            intruder_count = row['count']
+    
+    # Newest intruder detections in the range, for their photos; next_cursor
+    # continues the list through /api/reports/intruders with the same range
+    rows = db.get_detections(
+        limit=limit + 1,
+        known=False,
+        camera_id=camera_id,
+        start_time=day_start_ms(start_day),
+        end_time=day_start_ms(end_day + timedelta(days=1))
+    )
+    intruders, next_cursor = paged(rows, limit)
     
     return jsonify({
         'success': True,
-        'date': date,
-        'total_detections': len(daily_detections),
+        'date': start_day.isoformat(),
+        'start': start_day.isoformat(),
+        'end': end_day.isoformat(),
+        'camera_id': camera_id,
+        'total_detections': intruder_count + sum(s['count'] for s in students.values()),
         'students': students,
-        'intruders': intruders
+        'intruder_count': intruder_count,
+        'intruders': [serialize_detection(d) for d in intruders],
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/reports/intruders', methods=['GET'])
 def get_intruder_report():
-    """Get all intruder detections"""
-    detections = db.get_recent_detections(limit=500)
-    
-    intruders = []
-    for det in detections:
-        if det[3] is None:  # Unknown person
-            intruders.append({
-                'id': det[0],
-                'timestamp': det[1],
-                'person_id': det[2],
-                'face_image_path': det[5],
-                'video_path': det[6]
-            })
+    """
+    Get intruder detections, newest first, one page at a time
+    Query: cursor, limit, start/end (days), camera_id
+    """
+    try:
+        start_day, end_day = parse_report_range(default_today=False)
+        before, limit = read_page_args()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid date range or cursor'}), 400
+    camera_id = request.args.get('camera_id')
+    
+    rows = db.get_detections(
+        before=before,
+        limit=limit + 1,
+        known=False,
+        camera_id=camera_id,
+        start_time=day_start_ms(start_day) if start_day else None,
+        end_time=day_start_ms(end_day + timedelta(days=1)) if end_day else None
+    )
+    detections, next_cursor = paged(rows, limit)
+    
+    # Total in the range from the rollups (the list is paged)
+    summary = db.get_detection_summary(
+        start_day.isoformat() if start_day else '0000-01-01',
+        end_day.isoformat() if end_day else '9999-12-31',
+        camera_id=camera_id
+    )
+    total = sum(row['count'] for row in summary if not row['person_name'])
+    
+    return jsonify({
+        'success': True,
+        'total': total,
+        'intruders': [serialize_detection(d) for d in detections],
+        'next_cursor': next_cursor
+    })
+
+@app.route('/api/events')
+def event_stream():
+    """Server-Sent Events: detections, alerts, camera state and stats deltas"""
+    return Response(events.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/recordings', methods=['GET'])
+def get_recordings():
+    """Get recording segments, optionally within a time range"""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    camera_id = request.args.get('camera_id')
+    limit = request.args.get('limit', 100, type=int)
+    
+    try:
+        recordings = db.get_recordings(start, end, camera_id=camera_id, limit=limit)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid start time'}), 400
+    
+    return jsonify({'success': True, 'recordings': [serialize_recording(r) for r in recordings]})
+
+@app.route('/api/detections/<int:detection_id>/recordings', methods=['GET'])
+def get_detection_recordings(detection_id):
+    """Get footage around a detection"""
+    padding = request.args.get('padding', 30, type=int)
+    recordings = db.get_recordings_for_detection(detection_id, padding=padding)
     
-    return jsonify({'success': True, 'intruders': intruders})
+    return jsonify({'success': True, 'recordings': [serialize_recording(r) for r in recordings]})
+
+def serialize_recording(row):
+    """Convert a recordings row to JSON"""
+    return {
+        'id': row['id'],
+        'camera_id': row['camera_id'],
+        'filename': os.path.basename(row['file_path']),
+        'start_time': row['start_time'],
+        'end_time': row['end_time'],
+        'frame_count': row['frame_count'],
+        'byte_size': row['byte_size'],
+        'detection_count': row['detection_count'],
+        'width': row['width'],
+        'height': row['height'],
+        'fps': row['fps'],
+        'duration': row['duration'],
+        'thumbnail_url': f"/api/recordings/{row['id']}/thumbnail" if row['thumbnail_path'] else None
+    }
+
+@app.route('/api/recordings/<int:recording_id>/thumbnail', methods=['GET'])
+def get_recording_thumbnail(recording_id):
+    """Serve the poster thumbnail extracted by the recording indexer"""
+    recording = db.get_recording(recording_id)
+    if recording is None or not recording['thumbnail_path']:
+        return jsonify({'success': False, 'message': 'Thumbnail not found'}), 404
+    
+    # Re-indexing rewrites the thumbnail, so tie the ETag to the indexed file
+    etag = f'"r{recording_id}-{recording["file_size"]}-{recording["indexed_at"]}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers=headers)
+    
+    try:
+        with open(recording['thumbnail_path'], 'rb') as f:
+            data = f.read()
+    except OSError:
+        return jsonify({'success': False, 'message': 'Thumbnail not found'}), 404
+    
+    return Response(data, mimetype='image/jpeg', headers=headers)
 
 @app.route('/api/images/<path:filename>')
 def serve_image(filename):
-    """Serve images from data directories"""
-    # Try different directories
-    paths = [
-        os.path.join(config.FACES_DIR, filename),
-        os.path.join(config.KNOWN_FACES_DIR, filename),
-        os.path.join(config.DATA_DIR, filename)
-    ]
+    """
+    Serve a detection crop, known face or data image
+    ?size=<px> returns a cached thumbnail no larger than that (rounded up to
+    one of THUMBNAIL_SIZES). Responses carry an ETag and honour If-None-Match.
+    """
+    source = image_index.resolve(filename)
+    if source is None:
+        return jsonify({'success': False, 'message': 'Image not found'}), 404
+    
+    size = request.args.get('size', type=int)
+    etag = source.etag
+    if size:
+        size = next((s for s in config.THUMBNAIL_SIZES if s >= size), config.THUMBNAIL_SIZES[-1])
+        etag = f'{etag[:-1]}-{size}"'
+    
+    # Crops never change; known faces can be replaced, so browsers revalidate
+    headers = {
+        'ETag': etag,
+        'Cache-Control': (f'public, max-age={config.IMAGE_CACHE_MAX_AGE}, immutable'
+                          if source.immutable else 'no-cache')
+    }
     
-    for path in paths:
-        if os.path.exists(path):
-            return send_file(path, mimetype='image/jpeg')
+    if request.if_none_match.contains_weak(etag.strip('"')):
+        return Response(status=304, headers=headers)
     
-    return jsonify({'success': False, 'message': 'Image not found'}), 404
+    if size:
+        data, mimetype = image_index.thumbnail(source, size), 'image/jpeg'
+    else:
+        # Known faces may be PNGs; crops are always JPEG
+        data, mimetype = source.read(), mimetypes.guess_type(source.name)[0] or 'image/jpeg'
+    if data is None:
+        return jsonify({'success': False, 'message': 'Image not found'}), 404
+    
+    return Response(data, mimetype=mimetype, headers=headers)
 
 # ============= CAMERA PROCESSING =============
 
 def process_camera_feed():
     """Process camera feed in background thread"""
     frame_count = 0
-    COOLDOWN_SECONDS = 30  # Don't detect same person again for 30 seconds
-    last_faces = []  # Keep track of last detected faces for continuous drawing
     
     while camera_state['is_running']:
         if camera_state['cap'] is None:
             break
         
-        ret, frame = camera_state['cap'].read()
+        # Read straight into a preallocated buffer from the frame pool
+        slot = frame_buffer.acquire()
+        ret, frame = camera_state['cap'].read(slot)
         
         if not ret:
             break
         
+        if frame is not slot:
+            # Camera delivered a different size than requested - resize the pool once
+            frame_buffer.resize(frame.shape)
+            slot = frame_buffer.acquire()
+            np.copyto(slot, frame)
+            frame = slot
+        
         frame_count += 1
         
         # Detect faces periodically
-        if frame_count % config.DETECTION_INTERVAL == 0:
+        if frame_count % pipeline_settings['detection_interval'] == 0:
             faces = face_detector.detect_faces(frame)
             
-            camera_state['faces_detected'] = []
+            faces_detected = []
+            previous_face_count = len(camera_state['faces_detected'])
             current_time = datetime.now()
-            last_faces = []  # Update the list of faces to draw
             
             for face in faces:
                 bbox = face.bbox.astype(int)
@@ -530,15 +945,8 @@ def process_camera_feed():
                 
                 person_id = person_name if person_name else f"intruder_{int(current_time.timestamp())}"
                 
-                # Store face info for continuous drawing
-                last_faces.append({
-                    'bbox': bbox,
-                    'name': person_name,
-                    'similarity': similarity
-                })
-                
-                # Store detection info
-                camera_state['faces_detected'].append({
+                # Store detection info (also drives the overlay on later frames)
+                faces_detected.append({
                     'bbox': bbox.tolist(),
                     'name': person_name,
                     'confidence': float(similarity),
@@ -553,9 +961,9 @@ def process_camera_feed():
                     # First time seeing this person
                     should_log = True
                 else:
-                    # Check if enough time has passed
+                    # Check if enough time has passed (the alert_cooldown setting)
                     time_diff = (current_time - last_detection).total_seconds()
-                    if time_diff > COOLDOWN_SECONDS:
+                    if time_diff > pipeline_settings['alert_cooldown']:
                         should_log = True
                 
                 # Only log and save photo if it's a new detection
@@ -564,73 +972,82 @@ def process_camera_feed():
                     face_image_path = face_detector.save_face_image(frame, face, person_id)
                     
                     # Log detection to database
-                    db.log_detection(
+                    video_path = recorder.note_detection()
+                    detection = {
+                        'timestamp': current_time.isoformat(timespec='milliseconds'),
+                        'person_id': person_id,
+                        'person_name': person_name,
+                        'confidence': float(similarity),
+                        'face_image_path': face_image_path,
+                        'video_path': video_path,
+                        'camera_id': camera_state['camera_id'],
+                        'is_intruder': person_name is None
+                    }
+                    detection_id = db.log_detection(
                         person_id=person_id,
                         person_name=person_name,
-                        confidence=similarity,
+                        confidence=float(similarity),
                         face_image_path=face_image_path,
-                        video_path=camera_state['recording_path'],
-                        camera_id=str(config.CAMERA_ID)
+                        video_path=video_path,
+                        camera_id=camera_state['camera_id'],
+                        timestamp=current_time
+                    )
+                    # Published once committed, so clients can fetch it by id
+                    detection_id.add_done_callback(
+                        lambda f, detection=detection: publish_logged('detection', detection, f.result())
                     )
                     
                     # Update last detection time
                     camera_state['detected_persons'][person_id] = current_time
                     
                     # Create alert for intruders
-                    if not person_name and config.ENABLE_ALERTS:
-                        db.create_alert(
+                    if not person_name and pipeline_settings['enable_alerts']:
+                        description = f"Intruder detected at {current_time.strftime('%H:%M:%S')}"
+                        alert = {
+                            'timestamp': current_time.isoformat(timespec='milliseconds'),
+                            'alert_type': "INTRUDER",
+                            'person_id': person_id,
+                            'person_name': None,
+                            'description': description,
+                            'acknowledged': 0
+                        }
+                        alert_id = db.create_alert(
                             alert_type="INTRUDER",
                             person_id=person_id,
-                            description=f"Intruder detected at {current_time.strftime('%H:%M:%S')}"
+                            description=description,
+                            timestamp=current_time
+                        )
+                        alert_id.add_done_callback(
+                            lambda f, alert=alert: publish_logged('alert', alert, f.result())
                         )
                     
                     print(f"📸 Photo saved for: {person_name or 'Unknown'} (similarity: {similarity:.2f})")
-        
-        # Draw bounding boxes on every frame using last detected faces
-        for face_info in last_faces:
-            bbox = face_info['bbox']
-            name = face_info['name']
-            similarity = face_info['similarity']
             
-            x1, y1, x2, y2 = bbox[0], bbox[1], bbox[2], bbox[3]
-            
-            # Choose color based on recognition
-            if name:
-                color = (0, 255, 0)  # Green for known
-                label = f"{name} ({similarity:.2f})"
-            else:
-                color = (0, 0, 255)  # Red for unknown
-                label = "Unknown"
-            
-            # Draw rectangle
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            
-            # Draw label background
-            label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-            cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), 
-                         (x1 + label_size[0], y1), color, -1)
-            
-            # Draw label text
-            cv2.putText(frame, label, (x1, y1 - 5), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            camera_state['faces_detected'] = faces_detected
+            if len(faces_detected) != previous_face_count:
+                publish_camera_state()
         
-        # Draw info overlay
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(frame, timestamp, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        # The frame stays raw: boxes, labels and the timestamp are published as
+        # overlay metadata and only drawn for consumers that ask for them
+        overlay = build_overlay(
+            camera_state['faces_detected'],
+            is_recording=camera_state['is_recording'],
+            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        )
         
-        if camera_state['is_recording']:
-            cv2.circle(frame, (frame.shape[1] - 30, 30), 8, (0, 0, 255), -1)
-            cv2.putText(frame, "REC", (frame.shape[1] - 70, 35), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        # Publish frame to readers (no copy - the buffer is handed over);
+        # None means every pool slot was pinned and the frame was dropped.
+        # The view is pinned at publish time, so a concurrent stop_camera()
+        # clearing the buffer can't take the frame away from the recorder
+        view = frame_buffer.publish(overlay, pin=True)
         
-        # Update current frame
-        with lock:
-            camera_state['current_frame'] = frame.copy()
-            
-            # Write to video if recording
-            if camera_state['is_recording'] and camera_state['video_writer']:
-                camera_state['video_writer'].write(frame)
+        # Hand the frame to the recorder thread while recording;
+        # the slot stays pinned until the recorder is done with it
+        if view is not None:
+            if recorder.wants_frame():
+                recorder.write(view.frame, release=partial(frame_buffer.release, view), overlay=overlay)
+            else:
+                frame_buffer.release(view)
         
         time.sleep(0.001)  # Small delay
 
@@ -826,6 +1243,7 @@ if __name__ == '__main__':
     print("  Detections: /api/detections/*")
     print("  Alerts: /api/alerts")
     print("  Statistics: /api/statistics")
+    print("  Storage: /api/storage")
     print("=" * 50)
     
     # Run without debug to avoid watchdog restarts that interrupt model loading
@@ -0,0 +1,154 @@
+"""
+Event Archiver Module for AI Surveillance System
+Moves old detections and system logs to monthly archive files and reclaims the space
+
+Usage:
+    python archiver.py run [--days N]    Archive rows older than N days now
+    python archiver.py enable-vacuum     Switch an existing database to incremental vacuum
+    python archiver.py list              Show the archived months
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+import config
+from database import epoch_ms, month_start
+
+class EventArchiver:
+    def __init__(self, db, archive_after_days=None, check_interval=None):
+        """
+        Start the archiver thread
+
+        Whole months older than `archive_after_days` are moved out of
+        surveillance.db into data/archive/events_YYYY_MM.db, a chunk per
+        transaction, so the live tables and their indexes only hold recent
+        history. Report queries read the archives through
+        SurveillanceDB.get_detections. The space freed in the live database
+        is then returned to the filesystem by incremental vacuum steps.
+        """
+        self.db = db
+        self.archive_after_days = archive_after_days or config.ARCHIVE_AFTER_DAYS
+        self.check_interval = check_interval or config.ARCHIVE_CHECK_INTERVAL
+
+        self._wake = threading.Event()
+        self._running = True
+
+        # Metrics
+        self.rows_archived = 0
+        self.pages_vacuumed = 0
+        self.last_run = None
+
+        self._thread = threading.Thread(target=self._run, name='event-archiver', daemon=True)
+        self._thread.start()
+
+    def cutoff(self):
+        """Start of the oldest month kept live (epoch ms)"""
+        return epoch_ms(month_start(datetime.now() - timedelta(days=self.archive_after_days)))
+
+    def run_once(self):
+        """Archive everything before the cutoff, then vacuum; returns rows archived"""
+        cutoff = self.cutoff()
+        archived = 0
+        while self._running:
+            moved = self.db.archive_events(cutoff)
+            if not moved:
+                break
+            archived += moved
+            self.rows_archived += moved
+            self._wake.wait(config.ARCHIVE_PAUSE)
+
+        # Small steps, so live writes are never held up for long
+        while self._running:
+            freed = self.db.incremental_vacuum(config.VACUUM_PAGES_PER_STEP)
+            if not freed:
+                break
+            self.pages_vacuumed += freed
+            self._wake.wait(config.ARCHIVE_PAUSE)
+
+        return archived
+
+    def stats(self):
+        """Get archive size and progress metrics"""
+        partitions = self.db.get_archive_partitions()
+        archive_bytes = 0
+        for partition in partitions:
+            try:
+                archive_bytes += os.path.getsize(self.db.archive_path(partition['month']))
+            except OSError:
+                pass
+
+        return {
+            'partitions': len(partitions),
+            'archived_detections': sum(p['detections'] for p in partitions),
+            'archived_logs': sum(p['system_logs'] for p in partitions),
+            'archive_bytes': archive_bytes,
+            'archive_after_days': self.archive_after_days,
+            'rows_archived': self.rows_archived,
+            'pages_vacuumed': self.pages_vacuumed,
+            'last_run': self.last_run
+        }
+
+    def close(self):
+        """Stop the archiver thread (a chunk in progress is finished first)"""
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        """Archive periodically"""
+        while self._running:
+            try:
+                archived = self.run_once()
+                if archived:
+                    print(f"Archived {archived} old detection and log rows")
+                self.last_run = datetime.now().isoformat()
+            except Exception as e:
+                print(f"Event archiving error: {e}")
+
+            self._wake.wait(self.check_interval)
+
+def main():
+    """Command line entry point for archiving and vacuum maintenance"""
+    import argparse
+    from database import SurveillanceDB
+
+    parser = argparse.ArgumentParser(description="Archive old detections and system logs")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="archive old rows now")
+    run_parser.add_argument('--days', type=int, default=config.ARCHIVE_AFTER_DAYS,
+                            help="archive whole months older than this many days")
+    subparsers.add_parser('enable-vacuum', help="convert the database to incremental vacuum (full VACUUM)")
+    subparsers.add_parser('list', help="show the archived months")
+
+    args = parser.parse_args()
+    db = SurveillanceDB()
+
+    try:
+        if args.command == 'run':
+            cutoff = epoch_ms(month_start(datetime.now() - timedelta(days=args.days)))
+            archived = 0
+            while True:
+                moved = db.archive_events(cutoff)
+                if not moved:
+                    break
+                archived += moved
+                print(f"Archived {archived} rows...")
+            freed = 0
+            while True:
+                pages = db.incremental_vacuum(config.VACUUM_PAGES_PER_STEP)
+                if not pages:
+                    break
+                freed += pages
+            print(f"Archived {archived} rows, returned {freed} pages to the filesystem")
+        elif args.command == 'enable-vacuum':
+            if db.enable_incremental_vacuum():
+                print("✅ Incremental vacuum enabled")
+        else:
+            for partition in db.get_archive_partitions():
+                print(f"{partition['month']}: {partition['detections']} detections, "
+                      f"{partition['system_logs']} log entries ({partition['file_name']})")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Annotation cost benchmark
+Times the overlay drawing paths against the plain cv2 drawing they replaced
+
+Usage:
+    python benchmark_annotation.py [--width W] [--height H] [--faces N] [--iterations I]
+
+Each case draws the same overlay on a synthetic frame, once with the code
+the project used before OverlayRenderer (cv2.putText per call, a full-frame
+addWeighted for the CLI info bar) and once with the current path:
+draw_annotations() as used by JpegCache, the recorder's annotated copy, and
+the CLI info bar. Outputs are compared pixel for pixel so a faster path
+that draws something different is caught.
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+import config
+from overlay import build_overlay, draw_annotations, renderer
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+def legacy_draw_annotations(frame, overlay):
+    """draw_annotations() as it was before OverlayRenderer"""
+    for face in overlay.get('faces') or []:
+        x1, y1, x2, y2 = face['bbox']
+        name = face.get('name')
+        if name:
+            color = (0, 255, 0)
+            label = f"{name} ({face.get('confidence', 0):.2f})"
+        else:
+            color = (0, 0, 255)
+            label = "Unknown"
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        label_size = cv2.getTextSize(label, FONT, 0.6, 2)[0]
+        cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), (x1 + label_size[0], y1), color, -1)
+        cv2.putText(frame, label, (x1, y1 - 5), FONT, 0.6, (255, 255, 255), 2)
+
+    if overlay.get('timestamp'):
+        cv2.putText(frame, overlay['timestamp'], (10, 30), FONT, 0.7, (255, 255, 255), 2)
+    if overlay.get('recording'):
+        x = frame.shape[1] - 70
+        cv2.circle(frame, (x + 40, 30), 8, (0, 0, 255), -1)
+        cv2.putText(frame, "REC", (x, 35), FONT, 0.6, (0, 0, 255), 2)
+    return frame
+
+def legacy_info_overlay(frame, timestamp, fps_text):
+    """The CLI info bar as it was: copy and blend the whole frame"""
+    overlay = frame.copy()
+    cv2.rectangle(overlay, (0, 0), (frame.shape[1], 80), (0, 0, 0), -1)
+    frame = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
+    cv2.putText(frame, timestamp, (10, 25), FONT, 0.7, (255, 255, 255), 2)
+    cv2.putText(frame, fps_text, (10, 55), FONT, 0.7, (0, 255, 0), 2)
+    return frame
+
+def info_overlay(frame, timestamp, fps_text, preview):
+    """The CLI info bar as main.py draws it now"""
+    np.copyto(preview, frame)
+    renderer.darken_band(preview, 81)
+    renderer.draw_text(preview, timestamp, (10, 25), 0.7, (255, 255, 255))
+    renderer.draw_text(preview, fps_text, (10, 55), 0.7, (0, 255, 0))
+    return preview
+
+def _faces(count, width, height):
+    """Face boxes spread across the frame, alternating known and unknown"""
+    faces = []
+    for i in range(count):
+        x = 20 + (i * 150) % max(width - 160, 1)
+        y = 80 + (i * 90) % max(height - 220, 1)
+        known = i % 2 == 0
+        faces.append({'bbox': [x, y, x + 120, y + 140], 'name': f"Student {i}" if known else None,
+                      'confidence': 0.8 if known else 0.3, 'is_intruder': not known})
+    return faces
+
+def _time(draw, iterations):
+    """Mean microseconds per call, after a warm-up call"""
+    draw()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        draw()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def run(width=1280, height=720, faces=4, iterations=300):
+    """Time each annotation path before and after; returns a list of result dicts"""
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    overlay = build_overlay(_faces(faces, width, height), is_recording=True, timestamp=timestamp)
+    scratch = np.empty_like(frame)
+    preview = np.empty_like(frame)
+
+    def legacy_annotate():
+        np.copyto(scratch, frame)
+        return legacy_draw_annotations(scratch, overlay)
+
+    def annotate():
+        np.copyto(scratch, frame)
+        return draw_annotations(scratch, overlay)
+
+    # The recorder draws on its own scratch copy on the writer thread
+    config.RECORDINGS_DIR = tempfile.mkdtemp()
+    from recorder import VideoRecorder
+    recorder = VideoRecorder(preroll_seconds=0, annotate=True)
+
+    cases = [
+        ('draw_annotations (JPEG cache)', legacy_annotate, annotate),
+        ('recorder annotate', lambda: legacy_draw_annotations(frame.copy(), overlay),
+         lambda: recorder._annotated(frame, overlay)),
+        ('CLI info bar', lambda: legacy_info_overlay(frame, timestamp, "FPS: 29.8"),
+         lambda: info_overlay(frame, timestamp, "FPS: 29.8", preview))
+    ]
+
+    results = []
+    try:
+        for name, before, after in cases:
+            identical = np.array_equal(before(), after())
+            before_us = _time(before, iterations)
+            after_us = _time(after, iterations)
+            results.append({
+                'case': name,
+                'before_us': round(before_us, 1),
+                'after_us': round(after_us, 1),
+                'speedup': round(before_us / after_us, 2) if after_us else None,
+                'identical': identical
+            })
+    finally:
+        recorder.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Overlay annotation cost benchmark")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--faces', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{args.width}x{args.height}, {args.faces} faces, {args.iterations} iterations")
+    for result in run(args.width, args.height, args.faces, args.iterations):
+        print(f"{result['case']}: {result['before_us']} us -> {result['after_us']} us per frame "
+              f"({result['speedup']}x, {'identical output' if result['identical'] else 'OUTPUT DIFFERS'})")
+
+if __name__ == "__main__":
+    main()
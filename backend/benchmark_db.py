@@ -0,0 +1,98 @@
+"""
+Database concurrency benchmark
+Runs a detection writer alongside dashboard-style readers against a scratch database
+
+Usage:
+    python benchmark_db.py [--readers N] [--seconds S] [--write-rate W]
+
+The writer logs W detections per second (like a busy pipeline) while the
+readers repeat the dashboard's recent-detections and statistics queries.
+Writer latency is what the pipeline pays per detection (queueing it for the
+batch writer); commits/s shows how many transactions the rows were grouped into.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import config
+
+def run(readers=4, seconds=5, write_rate=100):
+    """Measure writer and reader throughput; returns a result dict"""
+    # Scratch database so the real one is never touched
+    scratch = tempfile.mkdtemp()
+    config.DATABASE_PATH = os.path.join(scratch, 'benchmark.db')
+
+    from database import SurveillanceDB
+    db = SurveillanceDB()
+
+    # Some history for the readers to scan
+    for i in range(2000):
+        db.log_detection(None if i % 3 else f"Student {i % 50}", 0.5)
+    db.flush()
+    history = db.writer.stats()
+
+    stop = threading.Event()
+    counts = {'reads': 0}
+    latencies = []
+    counts_lock = threading.Lock()
+
+    def writer():
+        interval = 1.0 / write_rate
+        next_write = time.perf_counter()
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.log_detection(None, 0.4)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            next_write += interval
+            time.sleep(max(0, next_write - time.perf_counter()))
+
+    def reader():
+        reads = 0
+        while not stop.is_set():
+            db.get_recent_detections(limit=50)
+            db.get_statistics()
+            reads += 1
+        with counts_lock:
+            counts['reads'] += reads
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    db.flush()
+    writer = db.writer.stats()
+    db.close()
+    latencies.sort()
+    return {
+        'readers': readers,
+        'writes_per_sec': round(len(latencies) / seconds),
+        'reads_per_sec': round(counts['reads'] / seconds),
+        'write_p50_ms': round(latencies[len(latencies) // 2], 2),
+        'write_p99_ms': round(latencies[int(len(latencies) * 0.99)], 2),
+        'write_max_ms': round(latencies[-1], 2),
+        'write_errors': writer['failed'],
+        'batches_per_sec': round((writer['batches'] - history['batches']) / seconds)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="SurveillanceDB reader/writer benchmark")
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-rate', type=int, default=100)
+    args = parser.parse_args()
+
+    result = run(args.readers, args.seconds, args.write_rate)
+    print(f"Writer: {result['writes_per_sec']} detections/s, latency p50 {result['write_p50_ms']} ms, "
+          f"p99 {result['write_p99_ms']} ms, max {result['write_max_ms']} ms "
+          f"({result['write_errors']} errors, {result['batches_per_sec']} commits/s)")
+    print(f"Readers ({result['readers']}): {result['reads_per_sec']} dashboard refreshes/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Frame serving load benchmark
+Publishes synthetic camera frames and has concurrent clients fetch them as JPEG
+
+Usage:
+    python benchmark_frames.py [--clients N] [--seconds S] [--fps F] [--no-cache]
+    python benchmark_frames.py --url http://localhost:5000 [--clients N] [--seconds S]
+
+In-process mode runs a producer at F frames/s into a FrameBuffer and N
+client threads that wait for each new frame and fetch it annotated at the
+/api/camera/frame quality, through the shared JpegCache. With --no-cache
+every client encodes the frame itself, as each request did before the
+cache. Encodes per published frame should stay near 1 however many clients
+there are. With --url the clients long-poll /api/camera/frame.jpg?after=
+on a running API server instead, so the whole endpoint is exercised.
+"""
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+import cv2
+import numpy as np
+import config
+from frame_buffer import FrameBuffer
+from jpeg_cache import JpegCache
+from overlay import build_overlay, draw_annotations
+
+QUALITY = 75  # What /api/camera/frame serves
+
+def _synthetic_frames(count=8):
+    """A few noisy frames to cycle through (compress like camera footage, unlike flat colors)"""
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (config.CAMERA_HEIGHT, config.CAMERA_WIDTH, 3),
+                                         dtype=np.uint8), (0, 0), 3)
+    return [cv2.add(base, rng.integers(0, 16, base.shape, dtype=np.uint8)) for _ in range(count)]
+
+def _faces(i):
+    """Two moving face boxes, one known and one intruder"""
+    x = 40 + (i * 7) % 300
+    return [
+        {'bbox': [x, 120, x + 120, 260], 'name': 'Student 1', 'confidence': 0.82, 'is_intruder': False},
+        {'bbox': [x + 200, 140, x + 300, 260], 'name': None, 'confidence': 0.3, 'is_intruder': True}
+    ]
+
+def _percentiles(latencies):
+    latencies.sort()
+    if not latencies:
+        return 0, 0, 0
+    return (round(latencies[len(latencies) // 2], 2), round(latencies[int(len(latencies) * 0.99)], 2),
+            round(latencies[-1], 2))
+
+def run(clients=8, seconds=5, fps=30, cache=True):
+    """Serve published frames to concurrent clients in-process; returns a result dict"""
+    frame_buffer = FrameBuffer()
+    jpeg_cache = JpegCache(frame_buffer)
+    frames = _synthetic_frames()
+
+    stop = threading.Event()
+    published = [0]
+    latencies = []
+    counts = {'served': 0, 'encodes': 0}
+    counts_lock = threading.Lock()
+
+    def producer():
+        interval = 1.0 / fps
+        next_frame = time.perf_counter()
+        while not stop.is_set():
+            slot = frame_buffer.acquire()
+            np.copyto(slot, frames[published[0] % len(frames)])  # Stand-in for cap.read(slot)
+            overlay = build_overlay(_faces(published[0]), timestamp=time.strftime("%Y-%m-%d %H:%M:%S"))
+            if frame_buffer.publish(overlay) is not None:
+                published[0] += 1
+
+            next_frame += interval
+            time.sleep(max(0, next_frame - time.perf_counter()))
+
+    def client():
+        served, encodes, last_seq = 0, 0, 0
+        scratch = None
+        while not stop.is_set():
+            last_seq = frame_buffer.wait_for(last_seq, timeout=1.0) or last_seq
+            start = time.perf_counter()
+            if cache:
+                encoded = jpeg_cache.get(quality=QUALITY, annotated=True)
+                if encoded is None:
+                    continue
+            else:
+                # What every request did before the cache: copy, draw, encode
+                with frame_buffer.read() as view:
+                    if view is None:
+                        continue
+                    if scratch is None or scratch.shape != view.frame.shape:
+                        scratch = np.empty_like(view.frame)
+                    np.copyto(scratch, view.frame)
+                    draw_annotations(scratch, view.meta)
+                    cv2.imencode('.jpg', scratch, [int(cv2.IMWRITE_JPEG_QUALITY), QUALITY])
+                    encodes += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            served += 1
+        with counts_lock:
+            counts['served'] += served
+            counts['encodes'] += encodes
+
+    threads = [threading.Thread(target=producer)]
+    threads += [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    encodes = jpeg_cache.stats()['encodes'] if cache else counts['encodes']
+    p50, p99, worst = _percentiles(latencies)
+    return {
+        'clients': clients,
+        'cache': cache,
+        'frames_published': published[0],
+        'frames_served': counts['served'],
+        'served_per_sec': round(counts['served'] / seconds),
+        'encodes': encodes,
+        'encodes_per_frame': round(encodes / max(published[0], 1), 2),
+        'fetch_p50_ms': p50,
+        'fetch_p99_ms': p99,
+        'fetch_max_ms': worst,
+        'pool': frame_buffer.stats()
+    }
+
+def run_http(url, clients=8, seconds=5):
+    """Long-poll /api/camera/frame.jpg on a running server; returns a result dict"""
+    endpoint = url.rstrip('/') + '/api/camera/frame.jpg'
+    stop = threading.Event()
+    latencies = []
+    counts = {'frames': 0, 'not_modified': 0, 'errors': 0, 'bytes': 0}
+    counts_lock = threading.Lock()
+
+    def client():
+        local = dict.fromkeys(counts, 0)
+        seq = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(f"{endpoint}?after={seq}&timeout=1", timeout=5) as response:
+                    data = response.read()
+                    seq = int(response.headers.get('X-Frame-Seq', seq))
+                local['frames'] += 1
+                local['bytes'] += len(data)
+            except urllib.error.HTTPError as e:
+                local['not_modified' if e.code == 304 else 'errors'] += 1
+                if e.code != 304:
+                    time.sleep(0.1)
+                continue
+            except (urllib.error.URLError, OSError):
+                local['errors'] += 1
+                time.sleep(0.1)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+        with counts_lock:
+            for key, value in local.items():
+                counts[key] += value
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    p50, p99, worst = _percentiles(latencies)
+    return {
+        'clients': clients,
+        'frames_per_sec': round(counts['frames'] / seconds),
+        'mb_per_sec': round(counts['bytes'] / seconds / 1024 ** 2, 2),
+        'not_modified': counts['not_modified'],
+        'errors': counts['errors'],
+        'fetch_p50_ms': p50,
+        'fetch_p99_ms': p99,
+        'fetch_max_ms': worst
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame JPEG serving load benchmark")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--fps', type=int, default=config.CAMERA_FPS)
+    parser.add_argument('--no-cache', action='store_true', help="encode per client, as before JpegCache")
+    parser.add_argument('--url', help="load a running API server instead of an in-process frame buffer")
+    args = parser.parse_args()
+
+    if args.url:
+        result = run_http(args.url, args.clients, args.seconds)
+        print(f"Clients ({result['clients']}): {result['frames_per_sec']} frames/s, "
+              f"{result['mb_per_sec']} MB/s, latency p50 {result['fetch_p50_ms']} ms, "
+              f"p99 {result['fetch_p99_ms']} ms, max {result['fetch_max_ms']} ms "
+              f"({result['not_modified']} not modified, {result['errors']} errors)")
+        return
+
+    result = run(args.clients, args.seconds, args.fps, cache=not args.no_cache)
+    print(f"Producer: {result['frames_published']} frames published, pool {result['pool']['slots']} slots "
+          f"({result['pool']['frames_dropped']} frames dropped)")
+    print(f"Clients ({result['clients']}, {'cached' if result['cache'] else 'no cache'}): "
+          f"{result['served_per_sec']} frames/s, latency p50 {result['fetch_p50_ms']} ms, "
+          f"p99 {result['fetch_p99_ms']} ms, max {result['fetch_max_ms']} ms")
+    print(f"Encodes: {result['encodes']} ({result['encodes_per_frame']} per published frame)")
+
+if __name__ == "__main__":
+    main()
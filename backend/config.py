@@ -8,6 +8,7 @@ CAMERA_ID = 0  # 0 for default webcam, or use RTSP URL for IP camera
 CAMERA_WIDTH = 640  # Reduced for better performance
 CAMERA_HEIGHT = 480  # Reduced for better performance
 CAMERA_FPS = 30
+FRAME_POOL_MAX_SLOTS = 8  # Frame buffers shared with readers; frames are dropped while all are pinned
 
 # Face Detection Settings
 DETECTION_CONFIDENCE = 0.5  # Minimum confidence for face detection
@@ -22,15 +23,58 @@ ENABLE_RECOGNITION = True
 ENABLE_RECORDING = True
 RECORD_ON_DETECTION = True  # Only record when faces are detected
 MAX_RECORDING_DURATION = 300  # Maximum recording duration in seconds (5 minutes)
+RECORDING_SEGMENT_SECONDS = 60  # Recordings are split into files of this length
 VIDEO_CODEC = 'mp4v'  # Video codec: 'mp4v', 'XVID', 'H264'
 VIDEO_FPS = 20
+RECORDING_QUEUE_SIZE = 60  # Max frames buffered for the recorder thread (~3s at 20 FPS)
+RECORDING_PINNED_FRAMES = 4  # Max queued frames borrowed from the frame pool (keep below FRAME_POOL_MAX_SLOTS)
+RECORDING_DROP_POLICY = 'drop_oldest'  # When the queue is full: 'drop_oldest', 'drop_newest' or 'block'
+RECORDING_BLOCK_TIMEOUT = 1.0  # Seconds the 'block' policy waits for space before dropping
+RECORDING_ANNOTATED = False  # Burn face boxes and timestamp into recordings (False keeps raw footage)
+PRE_RECORD_SECONDS = 10  # Seconds of footage kept before a recording starts (0 disables)
+PRE_RECORD_QUALITY = 70  # JPEG quality of buffered pre-record frames
+PRE_RECORD_MAX_MB = 8  # Hard memory cap for the pre-record buffer
+
+# Face Crop Settings
+CROP_WRITER_THREADS = 2  # Threads encoding and saving face crops
+CROP_QUEUE_SIZE = 64  # Max crops waiting to be written
+CROP_DROP_POLICY = 'block'  # When the queue is full: 'block' (up to CROP_BLOCK_TIMEOUT) or 'drop'
+CROP_BLOCK_TIMEOUT = 1.0  # Seconds the 'block' policy waits for space before dropping
+CROP_JPEG_QUALITY = 95
+CROP_STORAGE = 'packed'  # 'packed' appends crops to shard files, 'files' writes one JPEG each
+CROP_SHARD_MAX_MB = 256  # Shard size before a new one is started
+CROP_RETENTION_DAYS = 90  # Crops older than this are removed by `crop_store.py compact`
+CROP_COMPACT_MIN_DEAD_RATIO = 0.3  # Rewrite a shard once this fraction of it is deleted data
+
+# Image Serving Settings
+IMAGE_CACHE_MAX_AGE = 86400  # Seconds browsers may reuse detection crops without asking
+THUMBNAIL_SIZES = [64, 128, 240, 320, 480]  # Allowed ?size= values (others round up)
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CACHE_MB = 256  # Disk cache for image thumbnails; least recently used are deleted past this
+
+# Storage Quota Settings (the quota itself is the max_storage_gb setting)
+STORAGE_EVICTION_POLICY = 'protect_detections'  # 'oldest_first' or 'protect_detections'
+STORAGE_CHECK_INTERVAL = 60  # Seconds between quota checks (also checked when data is added)
+STORAGE_LOW_WATER = 0.9  # Evict down to this fraction of the quota
+STORAGE_RETRY_GROWTH = 0.05  # With nothing evictable, retry once usage grows by this fraction of the quota
+
+# Archive Settings
+ARCHIVE_AFTER_DAYS = 90  # Detections and system logs older than this move to monthly archive files
+ARCHIVE_CHECK_INTERVAL = 3600  # Seconds between archive runs
+ARCHIVE_CHUNK = 5000  # Rows moved per transaction
+ARCHIVE_PAUSE = 0.2  # Seconds between chunks, leaving the lock to live writes
+VACUUM_PAGES_PER_STEP = 1000  # Free pages returned to the filesystem per incremental vacuum step
 
 # Storage Settings
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 RECORDINGS_DIR = os.path.join(DATA_DIR, 'recordings')
 FACES_DIR = os.path.join(DATA_DIR, 'faces')
+CROP_SHARDS_DIR = os.path.join(DATA_DIR, 'face_shards')
+THUMBNAILS_DIR = os.path.join(DATA_DIR, 'thumbnails')
+RECORDING_THUMBNAILS_DIR = os.path.join(THUMBNAILS_DIR, 'recordings')
 KNOWN_FACES_DIR = os.path.join(DATA_DIR, 'known_faces')
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
 DATABASE_PATH = os.path.join(DATA_DIR, 'surveillance.db')
 
 # Alert Settings
@@ -38,14 +82,32 @@ ENABLE_ALERTS = True
 UNKNOWN_FACE_ALERT = True
 ALERT_COOLDOWN = 60  # Seconds between alerts for the same person
 
+# Database Settings
+DB_BUSY_TIMEOUT = 10  # Seconds a connection waits for a lock before failing
+DB_CACHE_KB = 16384  # Page cache per connection
+DB_MMAP_MB = 64  # Memory-mapped I/O for reads
+DB_POOL_SIZE = 16  # Idle connections kept for reuse by new threads
+DB_BATCH_INTERVAL_MS = 50  # Detections, alerts and logs are committed together at most this often
+DB_BATCH_SIZE = 500  # ...or as soon as this many rows are waiting
+DB_BACKFILL_CHUNK = 5000  # Legacy event rows moved per transaction after a schema upgrade
+DB_BACKFILL_PAUSE = 0.2  # Seconds between backfill chunks, leaving the lock to live writes
+
 # Display Settings
 SHOW_PREVIEW = True
 SHOW_FPS = True
 PREVIEW_WIDTH = 1280
 PREVIEW_HEIGHT = 720
+GUI_DISPLAY_WIDTH = 800
+GUI_DISPLAY_HEIGHT = 600
+GUI_REFRESH_FPS = 30  # Live feed redraws per second (stale frames are skipped)
+GUI_STATS_INTERVAL = 5  # Seconds between background statistics refreshes
 
 # Create necessary directories
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(RECORDINGS_DIR, exist_ok=True)
 os.makedirs(FACES_DIR, exist_ok=True)
+os.makedirs(CROP_SHARDS_DIR, exist_ok=True)
+os.makedirs(THUMBNAILS_DIR, exist_ok=True)
+os.makedirs(RECORDING_THUMBNAILS_DIR, exist_ok=True)
 os.makedirs(KNOWN_FACES_DIR, exist_ok=True)
+os.makedirs(ARCHIVE_DIR, exist_ok=True)
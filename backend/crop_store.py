@@ -0,0 +1,358 @@
+"""
+Packed Face Crop Store for AI Surveillance System
+Appends face crop JPEGs to large shard files, indexed by name in SQLite
+
+Usage:
+    python crop_store.py migrate [--delete]   Pack existing files from FACES_DIR
+    python crop_store.py compact [--days N]   Apply retention and reclaim shard space
+"""
+import os
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+import config
+
+# Record header: magic, name length, data length (lets shards be scanned without the index)
+RECORD_HEADER = struct.Struct('<4sHI')
+RECORD_MAGIC = b'CRP1'
+
+class CropStore:
+    def __init__(self, directory=None, db_path=None, shard_max_mb=None):
+        """
+        Open the store
+
+        Each process appends to its own shard (allocated through the index
+        database), so the API server and the CLI can run side by side.
+        Shards are sealed when full or on close(); only sealed shards are
+        compacted.
+        """
+        self.directory = directory or config.CROP_SHARDS_DIR
+        self.db_path = db_path or config.DATABASE_PATH
+        self.shard_max_bytes = (shard_max_mb or config.CROP_SHARD_MAX_MB) * 1024 * 1024
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        # Whichever module creates the database file decides its vacuum mode (see SurveillanceDB)
+        self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_tables()
+
+        # Active shard for appends, opened on first put()
+        self._shard_id = None
+        self._shard_file = None
+        self._shard_size = 0
+
+    def _create_tables(self):
+        """Create the crop index tables"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS crop_shards (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    sealed INTEGER DEFAULT 0
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS face_crops (
+                    name TEXT PRIMARY KEY,
+                    shard_id INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_face_crops_shard ON face_crops (shard_id)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_face_crops_created ON face_crops (created_at)')
+
+    def shard_path(self, shard_id):
+        """File path of a shard"""
+        return os.path.join(self.directory, f"crops_{shard_id:06d}.pack")
+
+    def put(self, name, data, created_at=None):
+        """
+        Append a crop and index it under `name` (replacing any previous crop)
+        Returns the number of bytes added to the shard
+        """
+        created_at = created_at or datetime.now().isoformat()
+
+        with self._lock:
+            offset, written = self._append(name, data)
+
+            # Index only after the bytes are in the shard
+            with self.conn:
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO face_crops (name, shard_id, offset, length, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, self._shard_id, offset, len(data), created_at))
+            return written
+
+    def _append(self, name, data):
+        """
+        Write a crop record to the active shard (called with the lock held)
+        Returns (offset of the crop data, bytes written)
+        """
+        if self._shard_file is None or self._shard_size >= self.shard_max_bytes:
+            self._open_shard()
+
+        encoded_name = name.encode('utf-8')
+        offset = self._shard_size + RECORD_HEADER.size + len(encoded_name)
+        self._shard_file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(encoded_name), len(data)))
+        self._shard_file.write(encoded_name)
+        self._shard_file.write(data)
+        self._shard_file.flush()
+        self._shard_size = offset + len(data)
+        return offset, RECORD_HEADER.size + len(encoded_name) + len(data)
+
+    def get(self, name):
+        """Read a crop with one seek/read; returns bytes, or None if unknown"""
+        location = self.locate(name)
+        if location is None:
+            return None
+
+        shard_id, offset, length = location
+        try:
+            with open(self.shard_path(shard_id), 'rb') as f:
+                f.seek(offset)
+                return f.read(length)
+        except OSError:
+            # Shard was compacted between the lookup and the read
+            location = self.locate(name)
+            if location is None or location[0] == shard_id:
+                return None
+            with open(self.shard_path(location[0]), 'rb') as f:
+                f.seek(location[1])
+                return f.read(location[2])
+
+    def locate(self, name):
+        """Get (shard_id, offset, length) of a crop, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT shard_id, offset, length FROM face_crops WHERE name = ?', (name,)
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def contains(self, name):
+        """Check whether a crop is stored"""
+        return self.locate(name) is not None
+
+    def live_bytes(self):
+        """Total size of the crops in the index"""
+        with self._lock:
+            return self.conn.execute('SELECT COALESCE(SUM(length), 0) FROM face_crops').fetchone()[0]
+
+    def total_bytes(self):
+        """Size of the shard files on disk, including deleted crops not yet compacted"""
+        with self._lock:
+            shard_ids = [row[0] for row in self.conn.execute('SELECT id FROM crop_shards')]
+
+        total = 0
+        for shard_id in shard_ids:
+            try:
+                total += os.path.getsize(self.shard_path(shard_id))
+            except OSError:
+                pass
+        return total
+
+    def oldest(self, limit=50):
+        """Get (name, length, created_at) of the oldest crops"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT name, length, created_at FROM face_crops ORDER BY created_at LIMIT ?', (limit,)
+            ).fetchall()
+
+    def delete(self, names):
+        """Remove crops from the index; their bytes are reclaimed by compact()"""
+        with self._lock, self.conn:
+            self.conn.executemany('DELETE FROM face_crops WHERE name = ?', ((n,) for n in names))
+
+    def delete_older_than(self, cutoff):
+        """Remove crops created before `cutoff` from the index; returns the count"""
+        with self._lock, self.conn:
+            cursor = self.conn.execute('DELETE FROM face_crops WHERE created_at < ?', (cutoff.isoformat(),))
+            return cursor.rowcount
+
+    def compact(self, min_dead_ratio=None, abandoned_after=86400):
+        """
+        Rewrite sealed shards that are mostly dead space into the active shard
+        Unsealed shards untouched for `abandoned_after` seconds (left by a
+        crashed process) are treated as sealed.
+        Returns the number of bytes reclaimed
+        """
+        if min_dead_ratio is None:
+            min_dead_ratio = config.CROP_COMPACT_MIN_DEAD_RATIO
+
+        with self._lock:
+            shards = self.conn.execute('SELECT id, sealed FROM crop_shards').fetchall()
+            live = dict(self.conn.execute(
+                'SELECT shard_id, SUM(length) FROM face_crops GROUP BY shard_id'
+            ).fetchall())
+
+        reclaimed = 0
+        for shard_id, sealed in shards:
+            if shard_id == self._shard_id:
+                continue
+
+            path = self.shard_path(shard_id)
+            try:
+                size = os.path.getsize(path)
+                idle = time.time() - os.path.getmtime(path)
+            except OSError:
+                size, idle = 0, abandoned_after
+
+            if not sealed and idle < abandoned_after:
+                continue
+
+            live_bytes = live.get(shard_id, 0)
+            if size and (size - live_bytes) / size < min_dead_ratio:
+                continue
+
+            reclaimed += size - self._rewrite_shard(shard_id, path)
+
+        return reclaimed
+
+    def _rewrite_shard(self, shard_id, path):
+        """Move a shard's live crops to the active shard and delete it; returns bytes moved"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT name, offset, length FROM face_crops WHERE shard_id = ? ORDER BY offset',
+                (shard_id,)
+            ).fetchall()
+
+        moved = 0
+        if rows:
+            with open(path, 'rb') as f:
+                for name, offset, length in rows:
+                    f.seek(offset)
+                    data = f.read(length)
+
+                    # Repoint the index only if the crop is still where we read it: one
+                    # deleted (evicted) or replaced since the SELECT must not come back
+                    with self._lock:
+                        new_offset, _ = self._append(name, data)
+                        with self.conn:
+                            cursor = self.conn.execute('''
+                                UPDATE face_crops SET shard_id = ?, offset = ?
+                                WHERE name = ? AND shard_id = ? AND offset = ?
+                            ''', (self._shard_id, new_offset, name, shard_id, offset))
+                    if cursor.rowcount:
+                        moved += length
+
+        with self._lock, self.conn:
+            self.conn.execute('DELETE FROM crop_shards WHERE id = ?', (shard_id,))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+        return moved
+
+    def _open_shard(self):
+        """Seal the current shard and start a new one (called with the lock held)"""
+        self._seal()
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO crop_shards (created_at) VALUES (?)', (datetime.now().isoformat(),)
+            )
+        self._shard_id = cursor.lastrowid
+        self._shard_file = open(self.shard_path(self._shard_id), 'ab')
+        self._shard_size = self._shard_file.tell()
+
+    def seal(self):
+        """Seal the active shard so compact() can rewrite it; the next put() starts a new one"""
+        with self._lock:
+            self._seal()
+
+    def _seal(self):
+        """Close the active shard and mark it read-only (called with the lock held)"""
+        if self._shard_file is None:
+            return
+        self._shard_file.close()
+        with self.conn:
+            self.conn.execute('UPDATE crop_shards SET sealed = 1 WHERE id = ?', (self._shard_id,))
+        self._shard_file = None
+        self._shard_id = None
+
+    def stats(self):
+        """Get store size information"""
+        with self._lock:
+            crops, live_bytes = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM face_crops'
+            ).fetchone()
+            shards = self.conn.execute('SELECT COUNT(*) FROM crop_shards').fetchone()[0]
+
+        return {
+            'crops': crops,
+            'shards': shards,
+            'live_bytes': live_bytes,
+            'total_bytes': self.total_bytes()
+        }
+
+    def close(self):
+        """Seal the active shard and close the index connection"""
+        with self._lock:
+            self._seal()
+            self.conn.close()
+
+def migrate(store, faces_dir=None, delete=False):
+    """Pack loose JPEG files from FACES_DIR into the store; returns the count"""
+    faces_dir = faces_dir or config.FACES_DIR
+    migrated = 0
+
+    with os.scandir(faces_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.lower().endswith(('.jpg', '.jpeg')):
+                continue
+
+            if not store.contains(entry.name):
+                with open(entry.path, 'rb') as f:
+                    data = f.read()
+                created_at = datetime.fromtimestamp(entry.stat().st_mtime).isoformat()
+                store.put(entry.name, data, created_at)
+                migrated += 1
+
+            if delete:
+                os.remove(entry.path)
+
+            if migrated and migrated % 1000 == 0:
+                print(f"Migrated {migrated} face images...")
+
+    return migrated
+
+def main():
+    """Command line entry point for migration and compaction"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the packed face crop store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help="pack existing face images")
+    migrate_parser.add_argument('--delete', action='store_true', help="remove files once packed")
+
+    compact_parser = subparsers.add_parser('compact', help="apply retention and reclaim space")
+    compact_parser.add_argument('--days', type=int, default=config.CROP_RETENTION_DAYS,
+                                help="delete crops older than this many days (0 keeps all)")
+
+    args = parser.parse_args()
+    store = CropStore()
+
+    try:
+        if args.command == 'migrate':
+            count = migrate(store, delete=args.delete)
+            print(f"Migrated {count} face images")
+        else:
+            if args.days > 0:
+                expired = store.delete_older_than(datetime.now() - timedelta(days=args.days))
+                print(f"Expired {expired} face crops older than {args.days} days")
+            reclaimed = store.compact()
+            print(f"Reclaimed {reclaimed / (1024 * 1024):.1f} MB")
+
+        print(store.stats())
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
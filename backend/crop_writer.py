@@ -0,0 +1,136 @@
+"""
+Face Crop Writer Module for AI Surveillance System
+Encodes and saves face crops on a small worker pool off the detection loop
+"""
+import cv2
+import atexit
+import os
+import queue
+import threading
+import config
+
+class CropWriter:
+    def __init__(self, workers=None, max_queue=None, drop_policy=None, block_timeout=None, store=None,
+                 on_write=None):
+        """
+        Start the writer threads
+
+        submit() only queues a copy of the crop, so detection never waits on
+        JPEG encoding or the disk. When the queue is full, 'drop' discards the
+        new crop and 'block' waits up to `block_timeout` seconds for space.
+        Queued crops are always written before the process exits.
+
+        With a CropStore, crops are appended to its shards under the file
+        name of `path` instead of being written as individual files.
+        `on_write(nbytes)` is called on the worker thread after each crop is
+        saved, with the bytes it added on disk.
+        """
+        self.workers = workers or config.CROP_WRITER_THREADS
+        self.max_queue = max_queue or config.CROP_QUEUE_SIZE
+        self.drop_policy = drop_policy or config.CROP_DROP_POLICY
+        self.block_timeout = config.CROP_BLOCK_TIMEOUT if block_timeout is None else block_timeout
+        self.store = store
+        self.on_write = on_write
+        self._encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), config.CROP_JPEG_QUALITY]
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.crops_written = 0
+        self.crops_dropped = 0
+        self.crops_failed = 0
+
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'crop-writer-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        # Worker threads are daemons: make sure pending crops reach the disk
+        atexit.register(self.close)
+
+    def submit(self, path, image):
+        """
+        Queue an image to be written to `path`
+        The image is copied, so the caller may reuse its frame buffer
+        Returns False if the crop was dropped
+        """
+        if self._closed:
+            return False
+
+        item = (path, image.copy())
+
+        try:
+            if self.drop_policy == 'block':
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.crops_dropped += 1
+            print(f"Crop writer queue full, dropped {path}")
+            return False
+
+    def flush(self):
+        """Wait until every queued crop has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write all queued crops and stop the workers"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def stats(self):
+        """Get writer metrics"""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'written': self.crops_written,
+                'dropped': self.crops_dropped,
+                'failed': self.crops_failed
+            }
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path, image):
+        """Encode and save one crop"""
+        try:
+            ok, buffer = cv2.imencode('.jpg', image, self._encode_param)
+            if ok:
+                data = buffer.tobytes()
+                if self.store is None:
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    written = len(data)
+                else:
+                    written = self.store.put(os.path.basename(path), data)
+                if self.on_write:
+                    self.on_write(written)
+        except Exception as e:
+            print(f"Error saving face image {path}: {e}")
+            ok = False
+
+        with self._lock:
+            if ok:
+                self.crops_written += 1
+            else:
+                self.crops_failed += 1
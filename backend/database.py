@@ -1,48 +1,586 @@
 """
 Database Module for AI Surveillance System
 Stores detection events, face data, and system logs
+
+Usage:
+    python database.py migrate            Apply pending schema migrations
+    python database.py rebuild-rollups    Recompute the statistics rollups from existing rows
 """
 import sqlite3
-from datetime import datetime
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import config
 import os
+from db_writer import DBWriter, insert_references
+
+class _Lease:
+    """Binds a pooled connection to one thread; returns it to the pool when the thread ends"""
+    __slots__ = ('conn', 'pool')
+
+    def __init__(self, conn, pool):
+        self.conn = conn
+        self.pool = pool
+
+    def __del__(self):
+        try:
+            self.pool._release(self.conn)
+        except Exception:
+            pass  # Interpreter shutdown
+
+def _migrate_recording_media(db):
+    """Media metadata filled in by the recording indexer"""
+    db._ensure_columns('recordings', {
+        'width': 'INTEGER',
+        'height': 'INTEGER',
+        'fps': 'REAL',
+        'duration': 'REAL',
+        'file_size': 'INTEGER',
+        'file_mtime': 'REAL',
+        'thumbnail_path': 'TEXT',
+        'indexed_at': 'TEXT'
+    })
+
+def _migrate_event_indexes(db):
+    """Indexes for the dashboard's detection and alert queries"""
+    # Recent detections and date ranges
+    db.conn.execute('CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detection_events (timestamp)')
+    # A person's detections, newest first
+    db.conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_detections_person_timestamp
+        ON detection_events (person_name, timestamp)
+    ''')
+    # Pending alerts, newest first
+    db.conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_alerts_acknowledged_timestamp
+        ON alerts (acknowledged, timestamp)
+    ''')
+
+def _create_alert_rollup_triggers(db):
+    """Keep alert_counts current as alerts are created, acknowledged and deleted"""
+    db.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_insert_rollup
+        AFTER INSERT ON alerts
+        BEGIN
+            INSERT INTO alert_counts (alert_type, total, pending)
+            VALUES (NEW.alert_type, 1, NEW.acknowledged = 0)
+            ON CONFLICT (alert_type) DO UPDATE SET
+                total = total + 1,
+                pending = pending + excluded.pending;
+        END
+    ''')
+    db.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_acknowledge_rollup
+        AFTER UPDATE OF acknowledged ON alerts
+        WHEN (OLD.acknowledged = 0) != (NEW.acknowledged = 0)
+        BEGIN
+            UPDATE alert_counts
+            SET pending = pending + (NEW.acknowledged = 0) - (OLD.acknowledged = 0)
+            WHERE alert_type = NEW.alert_type;
+        END
+    ''')
+    db.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_alerts_delete_rollup
+        AFTER DELETE ON alerts
+        BEGIN
+            UPDATE alert_counts
+            SET total = total - 1, pending = pending - (OLD.acknowledged = 0)
+            WHERE alert_type = OLD.alert_type;
+        END
+    ''')
+
+def _count_alerts_and_detections(db):
+    """Recount alert_counts and the detection total (inside a write transaction)"""
+    db.conn.execute('DELETE FROM alert_counts')
+    db.conn.execute('''
+        INSERT INTO alert_counts (alert_type, total, pending)
+        SELECT alert_type, COUNT(*), SUM(acknowledged = 0)
+        FROM alerts
+        GROUP BY alert_type
+    ''')
+    db.conn.execute('''
+        INSERT OR REPLACE INTO stat_counters (name, value)
+        SELECT 'detections', COUNT(*) FROM detection_events
+    ''')
+
+def _migrate_rollups(db):
+    """Rollup tables behind get_statistics, kept current by triggers"""
+    # Detections per day, camera and person ('' for intruders and unknown cameras)
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS detection_daily_counts (
+            day TEXT NOT NULL,
+            camera_id TEXT NOT NULL,
+            person_name TEXT NOT NULL,
+            detections INTEGER NOT NULL DEFAULT 0,
+            first_seen TEXT,
+            last_seen TEXT,
+            PRIMARY KEY (day, camera_id, person_name)
+        )
+    ''')
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS alert_counts (
+            alert_type TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0,
+            pending INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS stat_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    # Triggers run inside the inserting transaction, so rollups never drift
+    # from the rows they count, whichever connection writes them
+    db.conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_detection_events_rollup
+        AFTER INSERT ON detection_events
+        BEGIN
+            INSERT INTO detection_daily_counts (day, camera_id, person_name, detections, first_seen, last_seen)
+            VALUES (substr(NEW.timestamp, 1, 10), COALESCE(NEW.camera_id, ''), COALESCE(NEW.person_name, ''),
+                    1, NEW.timestamp, NEW.timestamp)
+            ON CONFLICT (day, camera_id, person_name) DO UPDATE SET
+                detections = detections + 1,
+                first_seen = min(first_seen, excluded.first_seen),
+                last_seen = max(last_seen, excluded.last_seen);
+            UPDATE stat_counters SET value = value + 1 WHERE name = 'detections';
+        END
+    ''')
+    _create_alert_rollup_triggers(db)
+    
+    # Backfill from the existing rows
+    db.conn.execute('''
+        INSERT INTO detection_daily_counts (day, camera_id, person_name, detections, first_seen, last_seen)
+        SELECT substr(timestamp, 1, 10), COALESCE(camera_id, ''), COALESCE(person_name, ''),
+               COUNT(*), MIN(timestamp), MAX(timestamp)
+        FROM detection_events
+        GROUP BY 1, 2, 3
+    ''')
+    _count_alerts_and_detections(db)
+
+def _migrate_alert_timestamp_index(db):
+    """Index for paging through all alerts, newest first"""
+    db.conn.execute('CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)')
+
+# Event tables rebuilt by migration 5; their old rows stay in <table>_legacy
+# until migrate_legacy_rows() has copied them over
+LEGACY_TABLES = ('detection_events', 'alerts', 'system_logs')
+
+def _migrate_compact_events(db):
+    """Epoch-millisecond timestamps and integer person/camera keys in the event tables"""
+    # Everyone seen in the event history, so logging never touches known_persons (the students).
+    # person_key is the person_id the pipeline logged: the name for recognized people, the
+    # pipeline's own id (e.g. intruder_<time>) for intruders, whose name is NULL
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS people (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            person_key TEXT UNIQUE NOT NULL,
+            name TEXT UNIQUE,
+            created_at INTEGER NOT NULL
+        )
+    ''')
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS cameras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT UNIQUE NOT NULL,
+            name TEXT,
+            created_at INTEGER NOT NULL
+        )
+    ''')
+    
+    # Triggers and indexes follow a renamed table; drop them so the new tables can reuse the names
+    for trigger in ('trg_detection_events_rollup', 'trg_alerts_insert_rollup',
+                    'trg_alerts_acknowledge_rollup', 'trg_alerts_delete_rollup'):
+        db.conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    for index in ('idx_detections_timestamp', 'idx_detections_person_timestamp',
+                  'idx_alerts_acknowledged_timestamp', 'idx_alerts_timestamp'):
+        db.conn.execute(f'DROP INDEX IF EXISTS {index}')
+    for table in LEGACY_TABLES:
+        db.conn.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+    
+    db.conn.execute('''
+        CREATE TABLE detection_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            person_id INTEGER REFERENCES people (id),
+            confidence REAL,
+            face_image_path TEXT,
+            video_path TEXT,
+            camera_id INTEGER REFERENCES cameras (id),
+            notes TEXT
+        )
+    ''')
+    db.conn.execute('''
+        CREATE TABLE alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            alert_type TEXT NOT NULL,
+            person_id INTEGER REFERENCES people (id),
+            description TEXT,
+            acknowledged INTEGER DEFAULT 0
+        )
+    ''')
+    db.conn.execute('''
+        CREATE TABLE system_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp INTEGER NOT NULL,
+            level TEXT NOT NULL,
+            message TEXT NOT NULL,
+            details TEXT
+        )
+    ''')
+    db.conn.execute('CREATE INDEX idx_detections_timestamp ON detection_events (timestamp)')
+    db.conn.execute('CREATE INDEX idx_detections_person_timestamp ON detection_events (person_id, timestamp)')
+    db.conn.execute('CREATE INDEX idx_alerts_acknowledged_timestamp ON alerts (acknowledged, timestamp)')
+    db.conn.execute('CREATE INDEX idx_alerts_timestamp ON alerts (timestamp)')
+    
+    # Copied rows keep their ids, so new ids continue after the legacy ones
+    for table in LEGACY_TABLES:
+        db.conn.execute('DELETE FROM sqlite_sequence WHERE name = ?', (table,))
+        db.conn.execute(f'''
+            INSERT INTO sqlite_sequence (name, seq)
+            SELECT ?, COALESCE(MAX(id), 0) FROM {table}_legacy
+        ''', (table,))
+    
+    # Legacy rows whose values can't be converted are kept here instead of copied
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS legacy_rejected (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            legacy_id INTEGER NOT NULL,
+            row TEXT NOT NULL,
+            error TEXT NOT NULL,
+            rejected_at INTEGER NOT NULL
+        )
+    ''')
+    
+    # Rollups start empty: the triggers count live rows and copied legacy rows alike
+    db.conn.execute('DROP TABLE detection_daily_counts')
+    db.conn.execute('''
+        CREATE TABLE detection_daily_counts (
+            day TEXT NOT NULL,
+            camera_id INTEGER NOT NULL,
+            person_id INTEGER NOT NULL,
+            detections INTEGER NOT NULL DEFAULT 0,
+            first_seen INTEGER,
+            last_seen INTEGER,
+            PRIMARY KEY (day, camera_id, person_id)
+        )
+    ''')
+    db.conn.execute('DELETE FROM alert_counts')
+    db.conn.execute("INSERT OR REPLACE INTO stat_counters (name, value) VALUES ('detections', 0)")
+    
+    # Days are local dates, like the ISO timestamps they replace (0 = intruder / unknown camera);
+    # intruders have people rows of their own but are counted together
+    db.conn.execute('''
+        CREATE TRIGGER trg_detection_events_rollup
+        AFTER INSERT ON detection_events
+        BEGIN
+            INSERT INTO detection_daily_counts (day, camera_id, person_id, detections, first_seen, last_seen)
+            VALUES (date(NEW.timestamp / 1000, 'unixepoch', 'localtime'), COALESCE(NEW.camera_id, 0),
+                    COALESCE((SELECT id FROM people WHERE id = NEW.person_id AND name IS NOT NULL), 0),
+                    1, NEW.timestamp, NEW.timestamp)
+            ON CONFLICT (day, camera_id, person_id) DO UPDATE SET
+                detections = detections + 1,
+                first_seen = min(first_seen, excluded.first_seen),
+                last_seen = max(last_seen, excluded.last_seen);
+            UPDATE stat_counters SET value = value + 1 WHERE name = 'detections';
+        END
+    ''')
+    _create_alert_rollup_triggers(db)
+    
+    # A new database has nothing to copy
+    for table in LEGACY_TABLES:
+        if db.conn.execute(f'SELECT 1 FROM {table}_legacy LIMIT 1').fetchone() is None:
+            db.conn.execute(f'DROP TABLE {table}_legacy')
+
+def _migrate_archive_partitions(db):
+    """Registry of the monthly archive files holding old detections and system logs"""
+    db.conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            month TEXT PRIMARY KEY,
+            file_name TEXT NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER NOT NULL,
+            detections INTEGER NOT NULL DEFAULT 0,
+            system_logs INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER
+        )
+    ''')
+    # Lets the archiver find the oldest log rows without a scan
+    db.conn.execute('CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs (timestamp)')
+
+# Schema migrations in order; PRAGMA user_version counts how many have been applied.
+# Append new steps at the end and never reorder or remove existing ones.
+MIGRATIONS = [
+    _migrate_recording_media,
+    _migrate_event_indexes,
+    _migrate_rollups,
+    _migrate_alert_timestamp_index,
+    _migrate_compact_events,
+    _migrate_archive_partitions
+]
+
+# Per-day detection counts of the live event table, in detection_daily_counts
+# column order (intruders, who have no name, are counted under person 0)
+DAILY_COUNTS_SELECT = '''
+    SELECT date(d.timestamp / 1000, 'unixepoch', 'localtime'), COALESCE(d.camera_id, 0),
+           COALESCE(p.id, 0), COUNT(*), MIN(d.timestamp), MAX(d.timestamp)
+    FROM detection_events d
+    LEFT JOIN people p ON p.id = d.person_id AND p.name IS NOT NULL
+    GROUP BY 1, 2, 3
+'''
+# The same for an archive file on its own, per person id (people live in the main database)
+ARCHIVE_DAILY_COUNTS_SELECT = '''
+    SELECT date(timestamp / 1000, 'unixepoch', 'localtime'), COALESCE(camera_id, 0),
+           COALESCE(person_id, 0), COUNT(*), MIN(timestamp), MAX(timestamp)
+    FROM detection_events
+    GROUP BY 1, 2, 3
+'''
+
+# Tables whose old rows move to the monthly archive files
+ARCHIVED_TABLES = ('detection_events', 'system_logs')
+
+# Archive file schema: the event tables' columns, in the same order, with
+# the indexes the detection queries need
+ARCHIVE_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS {schema}.detection_events (
+        id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        person_id INTEGER,
+        confidence REAL,
+        face_image_path TEXT,
+        video_path TEXT,
+        camera_id INTEGER,
+        notes TEXT
+    )''',
+    '''CREATE TABLE IF NOT EXISTS {schema}.system_logs (
+        id INTEGER PRIMARY KEY,
+        timestamp INTEGER NOT NULL,
+        level TEXT NOT NULL,
+        message TEXT NOT NULL,
+        details TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_detections_timestamp ON detection_events (timestamp)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_detections_person_timestamp ON detection_events (person_id, timestamp)'
+)
+
+# Alert types shown as intruders on the dashboard
+INTRUDER_ALERT_TYPES = ('INTRUDER', 'UNKNOWN_PERSON')
+
+# Event rows with person and camera ids resolved back to names, in the
+# column order of the original tables
+DETECTION_SELECT = '''
+    SELECT d.id, d.timestamp, p.person_key AS person_id, p.name AS person_name, d.confidence,
+           d.face_image_path, d.video_path, c.source AS camera_id, d.notes
+    FROM detection_events d
+    LEFT JOIN people p ON p.id = d.person_id
+    LEFT JOIN cameras c ON c.id = d.camera_id
+'''
+# The same columns from an attached monthly archive (names still come from main)
+ARCHIVE_DETECTION_SELECT = DETECTION_SELECT.replace('FROM detection_events d', 'FROM {schema}.detection_events d')
+ALERT_SELECT = '''
+    SELECT a.id, a.timestamp, a.alert_type, p.person_key AS person_id, p.name AS person_name,
+           a.description, a.acknowledged
+    FROM alerts a
+    LEFT JOIN people p ON p.id = a.person_id
+'''
+
+def epoch_ms(moment=None):
+    """Event timestamp (milliseconds since the epoch) for a datetime, default now"""
+    return int((moment or datetime.now()).timestamp() * 1000)
+
+def iso_from_ms(ms):
+    """Local ISO 8601 string for an event timestamp"""
+    if ms is None:
+        return None
+    return datetime.fromtimestamp(ms / 1000).isoformat(timespec='milliseconds')
+
+def _convert_legacy(rows, convert):
+    """Convert legacy rows one by one; returns (params, [(row, error)] for rows that failed)"""
+    params, rejected = [], []
+    for r in rows:
+        try:
+            params.append(convert(r))
+        except (TypeError, ValueError) as e:
+            rejected.append((r, e))
+    return params, rejected
+
+def _copy_legacy_detections(conn, rows):
+    """Insert detection_events_legacy rows into the new detection_events table; returns the rejected rows"""
+    params, rejected = _convert_legacy(rows, lambda r: (
+        r['id'], epoch_ms(datetime.fromisoformat(r['timestamp'])), r['person_name'], r['person_id'],
+        r['confidence'], r['face_image_path'], r['video_path'], r['camera_id'], r['notes']
+    ))
+    insert_references(conn, {(p[2], p[3]) for p in params}, {p[7] for p in params})
+    conn.executemany('''
+        INSERT INTO detection_events
+        (id, timestamp, person_id, confidence, face_image_path, video_path, camera_id, notes)
+        VALUES (?, ?, (SELECT id FROM people WHERE person_key = COALESCE(?, ?)), ?, ?, ?,
+                (SELECT id FROM cameras WHERE source = ?), ?)
+    ''', params)
+    return rejected
+
+def _copy_legacy_alerts(conn, rows):
+    """Insert alerts_legacy rows into the new alerts table; returns the rejected rows"""
+    params, rejected = _convert_legacy(rows, lambda r: (
+        r['id'], epoch_ms(datetime.fromisoformat(r['timestamp'])), r['alert_type'], r['person_name'],
+        r['person_id'], r['description'], r['acknowledged']
+    ))
+    insert_references(conn, {(p[3], p[4]) for p in params}, ())
+    conn.executemany('''
+        INSERT INTO alerts (id, timestamp, alert_type, person_id, description, acknowledged)
+        VALUES (?, ?, ?, (SELECT id FROM people WHERE person_key = COALESCE(?, ?)), ?, ?)
+    ''', params)
+    return rejected
+
+def _copy_legacy_logs(conn, rows):
+    """Insert system_logs_legacy rows into the new system_logs table; returns the rejected rows"""
+    params, rejected = _convert_legacy(rows, lambda r: (
+        r['id'], epoch_ms(datetime.fromisoformat(r['timestamp'])), r['level'], r['message'], r['details']
+    ))
+    conn.executemany('''
+        INSERT INTO system_logs (id, timestamp, level, message, details)
+        VALUES (?, ?, ?, ?, ?)
+    ''', params)
+    return rejected
+
+def month_start(moment):
+    """Local midnight on the first day of a datetime's month"""
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(moment):
+    """First day of the month after a month_start()"""
+    return (moment.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _parse_setting(value):
+    """Convert a stored setting string to bool, int or float where it looks like one"""
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    elif value.replace('.', '', 1).isdigit():
+        if '.' in value:
+            return float(value)
+        else:
+            return int(value)
+    return value
+
+LEGACY_COPIES = {
+    'detection_events': _copy_legacy_detections,
+    'alerts': _copy_legacy_alerts,
+    'system_logs': _copy_legacy_logs
+}
 
 class SurveillanceDB:
-    def __init__(self):
-        """Initialize database connection"""
+    def __init__(self, backfill=True):
+        """
+        Initialize database connection
+        With backfill=True, event rows left over from before migration 5 are
+        copied into the new tables by a background thread
+        """
         self.db_path = config.DATABASE_PATH
-        self.conn = None
-        self.cursor = None
-        self.connect()
+        
+        # Each thread uses its own connection (WAL lets readers run alongside
+        # the pipeline's writes); connections of finished threads are reused
+        self._local = threading.local()
+        self._idle = []
+        self._all = set()
+        self._pool_lock = threading.Lock()
+        self._closed = False
+        
+        # Held while rows move to the archive files, so rollup rebuilds see each row once
+        self._archive_lock = threading.Lock()
+        
+        # Typed settings, loaded on first use and reloaded by update_settings
+        self._settings = None
+        self._settings_lock = threading.Lock()
+        self._settings_subscribers = []
+        
+        if self.connect() is not None:
+            print(f"Database connected: {self.db_path}")
         self.create_tables()
+        
+        # Detections, alerts and system logs are group-committed off the caller's thread
+        self.writer = DBWriter(self._open_connection)
+        
+        self._backfill_stop = threading.Event()
+        self._backfill_thread = None
+        if backfill and self.legacy_tables():
+            self._backfill_thread = threading.Thread(target=self._run_backfill, name='db-backfill', daemon=True)
+            self._backfill_thread.start()
+    
+    @property
+    def conn(self):
+        """The calling thread's connection"""
+        lease = getattr(self._local, 'lease', None)
+        if lease is None:
+            return self.connect()
+        return lease.conn
     
     def connect(self):
-        """Connect to SQLite database"""
-        try:
-            # Use check_same_thread=False for Flask multithreading
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row  # Enable column access by name
-            self.cursor = self.conn.cursor()
-            print(f"Database connected: {self.db_path}")
-        except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
+        """Bind a connection to the calling thread, reusing an idle one when possible"""
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        
+        if conn is None:
+            try:
+                conn = self._open_connection()
+            except sqlite3.Error as e:
+                print(f"Database connection error: {e}")
+                return None
+        
+        self._local.lease = _Lease(conn, self)
+        return conn
+    
+    def _open_connection(self):
+        """Open a tuned connection"""
+        # Pooled connections move between threads, but only one uses each at a time
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=config.DB_BUSY_TIMEOUT)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        
+        # Only takes effect on a new database (see enable_incremental_vacuum), so it comes before WAL
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('PRAGMA journal_mode=WAL')  # Readers and the writer no longer block each other
+        conn.execute('PRAGMA synchronous=NORMAL')  # Durable across app crashes, fsync only at checkpoints
+        conn.execute(f'PRAGMA cache_size=-{config.DB_CACHE_KB}')
+        conn.execute(f'PRAGMA mmap_size={config.DB_MMAP_MB * 1024 * 1024}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        
+        with self._pool_lock:
+            self._all.add(conn)
+        return conn
+    
+    def _release(self, conn):
+        """Return a thread's connection to the idle pool"""
+        with self._pool_lock:
+            healthy = conn in self._all
+            if healthy and not self._closed and len(self._idle) < config.DB_POOL_SIZE:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+                return
+            self._all.discard(conn)
+        conn.close()
     
     def _ensure_connection(self):
         """Ensure database connection is alive"""
         try:
-            if self.conn is None:
-                self.connect()
-            else:
-                # Test connection
-                self.conn.execute("SELECT 1")
+            self.conn.execute("SELECT 1")
         except sqlite3.Error:
             print("Database connection lost, reconnecting...")
+            # Drop the broken connection instead of returning it to the pool
+            with self._pool_lock:
+                self._all.discard(self._local.lease.conn)
+            self._local.lease = None
             self.connect()
     
     def create_tables(self):
         """Create necessary database tables"""
+        cursor = self.conn.cursor()
+        
         # Detection events table
-        self.cursor.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS detection_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT NOT NULL,
@@ -57,7 +595,7 @@ class SurveillanceDB:
         ''')
         
         # Known persons table
-        self.cursor.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS known_persons (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT UNIQUE NOT NULL,
@@ -68,7 +606,7 @@ class SurveillanceDB:
         ''')
         
         # System logs table
-        self.cursor.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS system_logs (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT NOT NULL,
@@ -79,7 +617,7 @@ class SurveillanceDB:
         ''')
         
         # Alerts table
-        self.cursor.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS alerts (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 timestamp TEXT NOT NULL,
@@ -92,7 +630,7 @@ class SurveillanceDB:
         ''')
         
         # Settings table
-        self.cursor.execute('''
+        cursor.execute('''
             CREATE TABLE IF NOT EXISTS settings (
                 key TEXT PRIMARY KEY,
                 value TEXT NOT NULL,
@@ -100,29 +638,315 @@ class SurveillanceDB:
             )
         ''')
         
+        # Recording segments table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recordings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                camera_id TEXT,
+                file_path TEXT UNIQUE NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                frame_count INTEGER DEFAULT 0,
+                byte_size INTEGER DEFAULT 0,
+                detection_count INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_recordings_camera_start
+            ON recordings (camera_id, start_time)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_recordings_start
+            ON recordings (start_time)
+        ''')
+        
         self.conn.commit()
+        self.migrate()
         self._initialize_default_settings()
     
-    def log_detection(self, person_id, person_name=None, confidence=0, 
-                     face_image_path=None, video_path=None, camera_id="0"):
-        """Log a face detection event"""
-        timestamp = datetime.now().isoformat()
+    def migrate(self):
+        """Apply pending schema migrations, each in its own transaction"""
+        if self.schema_version() >= len(MIGRATIONS):
+            return True
+        
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            try:
+                # The write lock makes a second process wait, then skip what was applied
+                self.conn.execute('BEGIN IMMEDIATE')
+                if self.schema_version() < version:
+                    migration(self)
+                    self.conn.execute(f'PRAGMA user_version = {version}')
+                    print(f"Applied database migration {version}: {migration.__doc__}")
+                self.conn.commit()
+            except sqlite3.Error as e:
+                print(f"Database migration {version} failed: {e}")
+                self.conn.rollback()
+                return False
+        return True
+    
+    def schema_version(self):
+        """Number of schema migrations applied to the database"""
+        return self.conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    def rebuild_rollups(self):
+        """Recompute the statistics rollups from the detection and alert tables"""
+        # Flush first so queued rows are counted exactly once (by their trigger)
+        self.flush()
         
+        # Archived detections still count; no rows may move while they are summed
+        with self._archive_lock:
+            try:
+                archived = self._archived_rollups()
+                self.conn.execute('BEGIN IMMEDIATE')
+                self._rebuild_rollups(archived)
+                self.conn.commit()
+                return True
+            except sqlite3.Error as e:
+                print(f"Error rebuilding statistics rollups: {e}")
+                self.conn.rollback()
+                return False
+    
+    def _rebuild_rollups(self, archived=()):
+        """Replace the rollup contents (called inside a write transaction)"""
+        self.conn.execute('DELETE FROM detection_daily_counts')
+        self.conn.execute(f'''
+            INSERT INTO detection_daily_counts (day, camera_id, person_id, detections, first_seen, last_seen)
+            {DAILY_COUNTS_SELECT}
+        ''')
+        self.conn.executemany('''
+            INSERT INTO detection_daily_counts (day, camera_id, person_id, detections, first_seen, last_seen)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (day, camera_id, person_id) DO UPDATE SET
+                detections = detections + excluded.detections,
+                first_seen = min(first_seen, excluded.first_seen),
+                last_seen = max(last_seen, excluded.last_seen)
+        ''', archived)
+        _count_alerts_and_detections(self)
+        self.conn.execute(
+            "UPDATE stat_counters SET value = value + ? WHERE name = 'detections'",
+            (sum(row[3] for row in archived),)
+        )
+    
+    def _archived_rollups(self):
+        """Daily detection counts of every archive file, read without attaching them"""
+        named = {row[0] for row in self.conn.execute('SELECT id FROM people WHERE name IS NOT NULL')}
+        rows = []
+        for partition in self.get_archive_partitions():
+            path = self.archive_path(partition['month'])
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, timeout=config.DB_BUSY_TIMEOUT)
+            try:
+                # Intruders count under person 0; the upsert merges their rows
+                rows += [(day, camera_id, person_id if person_id in named else 0, *counts)
+                         for day, camera_id, person_id, *counts
+                         in conn.execute(ARCHIVE_DAILY_COUNTS_SELECT).fetchall()]
+            finally:
+                conn.close()
+        return rows
+    
+    def legacy_tables(self):
+        """Event tables that still have rows waiting in <table>_legacy"""
+        names = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return [table for table in LEGACY_TABLES if f'{table}_legacy' in names]
+    
+    def migrate_legacy_rows(self, chunk=None):
+        """
+        Move one chunk of pre-migration-5 events into the new tables, newest
+        first, converting timestamps and names to the new columns
+        Rows that can't be converted are moved to legacy_rejected instead
+        Returns the number of rows moved (0 once every legacy table is gone)
+        """
+        chunk = chunk or config.DB_BACKFILL_CHUNK
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO detection_events 
-                (timestamp, person_id, person_name, confidence, face_image_path, video_path, camera_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (timestamp, person_id, person_name, confidence, face_image_path, video_path, camera_id))
-            
+            self.conn.execute('BEGIN IMMEDIATE')
+            for table in self.legacy_tables():
+                rows = self.conn.execute(
+                    f'SELECT * FROM {table}_legacy ORDER BY id DESC LIMIT ?', (chunk,)
+                ).fetchall()
+                if not rows:
+                    self.conn.execute(f'DROP TABLE {table}_legacy')
+                    continue
+                
+                # The new tables' triggers count the copied rows into the rollups
+                rejected = LEGACY_COPIES[table](self.conn, rows)
+                for row, error in rejected:
+                    print(f"Skipping legacy {table} row {row['id']}: {error}")
+                self.conn.executemany('''
+                    INSERT INTO legacy_rejected (table_name, legacy_id, row, error, rejected_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(table, row['id'], json.dumps(dict(row)), str(error), epoch_ms())
+                      for row, error in rejected])
+                self.conn.execute(f'DELETE FROM {table}_legacy WHERE id >= ?', (rows[-1]['id'],))
+                self.conn.commit()
+                return len(rows)
             self.conn.commit()
-            lastrowid = cursor.lastrowid
+        except sqlite3.Error as e:
+            print(f"Error migrating legacy event rows: {e}")
+            self.conn.rollback()
+        return 0
+    
+    def _run_backfill(self):
+        """Backfill thread: move legacy rows in chunks, pausing so live writes get the lock"""
+        moved = 0
+        while not self._backfill_stop.is_set():
+            count = self.migrate_legacy_rows()
+            if not count:
+                break
+            moved += count
+            self._backfill_stop.wait(config.DB_BACKFILL_PAUSE)
+        if not self.legacy_tables():
+            print(f"✅ Legacy event rows migrated ({moved} in this run)")
+    
+    def archive_path(self, month):
+        """File holding a month's archived rows ('YYYY_MM')"""
+        return os.path.join(config.ARCHIVE_DIR, f"events_{month}.db")
+    
+    def get_archive_partitions(self, start_time=None, end_time=None):
+        """Get the archived months overlapping [start_time, end_time) (epoch ms), newest first"""
+        query = 'SELECT * FROM archive_partitions WHERE 1 = 1'
+        params = []
+        if start_time is not None:
+            query += ' AND end_time > ?'
+            params.append(start_time)
+        if end_time is not None:
+            query += ' AND start_time < ?'
+            params.append(end_time)
+        query += ' ORDER BY month DESC'
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            results = cursor.fetchall()
             cursor.close()
-            return lastrowid
+            return results
         except sqlite3.Error as e:
-            print(f"Error logging detection: {e}")
-            return None
+            print(f"Error fetching archive partitions: {e}")
+            return []
+    
+    @contextmanager
+    def _attached_archive(self, month):
+        """Attach a month's archive file to the calling thread's connection"""
+        schema = f"archive_{month}"
+        self.conn.execute(f'ATTACH DATABASE ? AS {schema}', (self.archive_path(month),))
+        try:
+            yield schema
+        finally:
+            if self.conn.in_transaction:
+                self.conn.rollback()  # DETACH is refused inside a transaction
+            self.conn.execute(f'DETACH DATABASE {schema}')
+    
+    def archive_events(self, before, chunk=None):
+        """
+        Move up to `chunk` detection and system log rows of the oldest month
+        with rows older than `before` (epoch ms) into that month's archive file
+        Returns the number of rows moved (0 when nothing is left to move)
+        """
+        chunk = chunk or config.ARCHIVE_CHUNK
+        with self._archive_lock:
+            oldest = [self.conn.execute(f'SELECT MIN(timestamp) FROM {table} WHERE timestamp < ?',
+                                        (before,)).fetchone()[0] for table in ARCHIVED_TABLES]
+            oldest = [ts for ts in oldest if ts is not None]
+            if not oldest:
+                return 0
+            
+            start = month_start(datetime.fromtimestamp(min(oldest) / 1000))
+            month = start.strftime('%Y_%m')
+            start_ms, end_ms = epoch_ms(start), epoch_ms(next_month(start))
+            window = (start_ms, min(end_ms, before), chunk)
+            
+            try:
+                with self._attached_archive(month) as schema:
+                    for statement in ARCHIVE_SCHEMA:
+                        self.conn.execute(statement.format(schema=schema))
+                    self.conn.commit()
+                    
+                    # WAL commits each attached file separately, so the copy and the
+                    # delete are two transactions: the archive file is committed first,
+                    # and only rows found in it are deleted. A crash in between leaves
+                    # the rows in both files; the next run re-copies them (ignored) and deletes.
+                    ids = {}
+                    self.conn.execute('BEGIN')
+                    for table in ARCHIVED_TABLES:
+                        ids[table] = json.dumps([row[0] for row in self.conn.execute(
+                            f'SELECT id FROM main.{table} WHERE timestamp >= ? AND timestamp < ? '
+                            'ORDER BY timestamp, id LIMIT ?', window
+                        )])
+                        self.conn.execute(f'''
+                            INSERT OR IGNORE INTO {schema}.{table}
+                            SELECT * FROM main.{table} WHERE id IN (SELECT value FROM json_each(?))
+                        ''', (ids[table],))
+                    self.conn.commit()
+                    
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    moved = {}
+                    for table in ARCHIVED_TABLES:
+                        # No delete trigger: the rollups keep counting archived detections
+                        moved[table] = self.conn.execute(f'''
+                            DELETE FROM main.{table}
+                            WHERE id IN (SELECT value FROM json_each(?))
+                              AND id IN (SELECT id FROM {schema}.{table})
+                        ''', (ids[table],)).rowcount
+                    
+                    self.conn.execute('''
+                        INSERT INTO archive_partitions
+                        (month, file_name, start_time, end_time, detections, system_logs, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (month) DO UPDATE SET
+                            detections = detections + excluded.detections,
+                            system_logs = system_logs + excluded.system_logs,
+                            updated_at = excluded.updated_at
+                    ''', (month, os.path.basename(self.archive_path(month)), start_ms, end_ms,
+                          moved['detection_events'], moved['system_logs'], epoch_ms()))
+                    self.conn.commit()
+                return sum(moved.values())
+            except sqlite3.Error as e:
+                print(f"Error archiving events for {month}: {e}")
+                self.conn.rollback()
+                return 0
+    
+    def incremental_vacuum(self, pages):
+        """Return up to `pages` free pages to the filesystem; returns the number freed"""
+        try:
+            if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                return 0  # Not enabled on this database (see enable_incremental_vacuum)
+            free = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            # executescript steps the pragma to completion (one page per step)
+            self.conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+            return free - self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error during incremental vacuum: {e}")
+            return 0
+    
+    def enable_incremental_vacuum(self):
+        """Switch an existing database to incremental auto-vacuum (one full VACUUM)"""
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return True
+        self.flush()
+        try:
+            self.conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            self.conn.execute('VACUUM')
+            return self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+        except sqlite3.Error as e:
+            print(f"Error enabling incremental vacuum: {e}")
+            return False
+    
+    def _ensure_columns(self, table, columns):
+        """Add columns missing from a table created by an older version"""
+        existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')}
+        for name, column_type in columns.items():
+            if name not in existing:
+                self.conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+    
+    def log_detection(self, person_name=None, confidence=0, face_image_path=None,
+                      video_path=None, camera_id="0", timestamp=None, person_id=None):
+        """
+        Log a face detection event (person_name None for an intruder)
+        `person_id` is the pipeline's id for an intruder, returned as its person_id
+        Returns a Future resolving to the detection id once it is committed
+        """
+        return self.writer.submit('detection_events', (
+            epoch_ms(timestamp), person_name, person_id, confidence, face_image_path, video_path,
+            None if camera_id is None else str(camera_id)
+        ))
     
     def add_known_person(self, name, image_path=None, notes=None):
         """Add a known person to the database"""
@@ -172,50 +996,206 @@ class SurveillanceDB:
             return []
     
     def log_system_event(self, level, message, details=None):
-        """Log a system event"""
-        timestamp = datetime.now().isoformat()
-        
+        """Log a system event (queued; committed with the next batch)"""
+        self.writer.submit('system_logs', (epoch_ms(), level, message, details))
+    
+    def create_alert(self, alert_type, person_name=None, description=None, timestamp=None, person_id=None):
+        """
+        Create a new alert
+        `person_id` is the pipeline's id for an intruder, returned as its person_id
+        Returns a Future resolving to the alert id once it is committed
+        """
+        return self.writer.submit('alerts', (epoch_ms(timestamp), alert_type, person_name, person_id,
+                                             description))
+    
+    def flush(self):
+        """Wait until every queued detection, alert and log entry is committed"""
+        self.writer.flush()
+    
+    def add_recording(self, camera_id, file_path, start_time, end_time,
+                      frame_count=0, byte_size=0, detection_count=0):
+        """Register a closed recording segment"""
         try:
             cursor = self.conn.cursor()
             cursor.execute('''
-                INSERT INTO system_logs (timestamp, level, message, details)
-                VALUES (?, ?, ?, ?)
-            ''', (timestamp, level, message, details))
+                INSERT INTO recordings
+                (camera_id, file_path, start_time, end_time, frame_count, byte_size, detection_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(file_path) DO UPDATE SET
+                    camera_id = excluded.camera_id,
+                    start_time = excluded.start_time,
+                    end_time = excluded.end_time,
+                    frame_count = excluded.frame_count,
+                    byte_size = excluded.byte_size,
+                    detection_count = excluded.detection_count
+            ''', (camera_id, file_path, start_time, end_time, frame_count, byte_size, detection_count))
             
             self.conn.commit()
+            lastrowid = cursor.lastrowid
             cursor.close()
+            return lastrowid
         except sqlite3.Error as e:
-            print(f"Error logging system event: {e}")
+            print(f"Error registering recording: {e}")
+            return None
     
-    def create_alert(self, alert_type, person_id=None, person_name=None, description=None):
-        """Create a new alert"""
-        timestamp = datetime.now().isoformat()
+    def get_recordings(self, start_time=None, end_time=None, camera_id=None, limit=100):
+        """Get recording segments overlapping a time range, newest first"""
+        # A segment spans at most RECORDING_SEGMENT_SECONDS plus its pre-record
+        # footage, so the overlap test becomes an indexed range on start_time
+        query = 'SELECT * FROM recordings WHERE 1 = 1'
+        params = []
         
+        if camera_id is not None:
+            query += ' AND camera_id = ?'
+            params.append(str(camera_id))
+        if end_time:
+            query += ' AND start_time < ?'
+            params.append(end_time)
+        if start_time:
+            max_span = config.RECORDING_SEGMENT_SECONDS * 2 + config.PRE_RECORD_SECONDS
+            earliest = datetime.fromisoformat(start_time) - timedelta(seconds=max_span)
+            query += ' AND start_time >= ? AND end_time > ?'
+            params.extend([earliest.isoformat(), start_time])
+        
+        query += ' ORDER BY start_time DESC LIMIT ?'
+        params.append(limit)
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"Error fetching recordings: {e}")
+            return []
+    
+    def get_recording(self, recording_id):
+        """Get one recording segment"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT * FROM recordings WHERE id = ?', (recording_id,))
+            result = cursor.fetchone()
+            cursor.close()
+            return result
+        except sqlite3.Error as e:
+            print(f"Error fetching recording: {e}")
+            return None
+    
+    def get_recordings_to_index(self):
+        """Get path and indexed size/mtime of every recording (for staleness checks)"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT id, file_path, file_size, file_mtime, indexed_at FROM recordings')
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"Error fetching recordings to index: {e}")
+            return []
+    
+    def update_recording_media(self, file_path, width, height, fps, duration,
+                               file_size, file_mtime, thumbnail_path):
+        """Store media metadata extracted from a recording file"""
         try:
             cursor = self.conn.cursor()
             cursor.execute('''
-                INSERT INTO alerts 
-                (timestamp, alert_type, person_id, person_name, description)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (timestamp, alert_type, person_id, person_name, description))
+                UPDATE recordings
+                SET width = ?, height = ?, fps = ?, duration = ?,
+                    file_size = ?, file_mtime = ?, thumbnail_path = ?, indexed_at = ?
+                WHERE file_path = ?
+            ''', (width, height, fps, duration, file_size, file_mtime, thumbnail_path,
+                  datetime.now().isoformat(), file_path))
             
             self.conn.commit()
-            lastrowid = cursor.lastrowid
             cursor.close()
-            return lastrowid
+            return True
         except sqlite3.Error as e:
-            print(f"Error creating alert: {e}")
-            return None
+            print(f"Error updating recording metadata: {e}")
+            return False
+    
+    def get_recording_bytes(self):
+        """Total size of all registered recordings"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT COALESCE(SUM(COALESCE(file_size, byte_size)), 0) FROM recordings')
+            total = cursor.fetchone()[0]
+            cursor.close()
+            return total
+        except sqlite3.Error as e:
+            print(f"Error summing recording sizes: {e}")
+            return 0
+    
+    def get_oldest_recordings(self, limit=50, include_detections=True):
+        """Get the oldest recordings (eviction candidates), optionally skipping ones with detections"""
+        query = 'SELECT id, file_path, start_time, COALESCE(file_size, byte_size) AS size, thumbnail_path FROM recordings'
+        if not include_detections:
+            query += ' WHERE detection_count = 0'
+        query += ' ORDER BY start_time LIMIT ?'
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, (limit,))
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"Error fetching oldest recordings: {e}")
+            return []
+    
+    def delete_recording(self, recording_id):
+        """Remove a recording segment from the index"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('DELETE FROM recordings WHERE id = ?', (recording_id,))
+            self.conn.commit()
+            cursor.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error deleting recording: {e}")
+            return False
+    
+    def get_recordings_for_detection(self, detection_id, padding=30):
+        """Get the recording segments covering a detection, +/- padding seconds"""
+        query = '''
+            SELECT d.timestamp, c.source FROM {table} d
+            LEFT JOIN cameras c ON c.id = d.camera_id
+            WHERE d.id = ?
+        '''
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query.format(table='detection_events'), (detection_id,))
+            detection = cursor.fetchone()
+            cursor.close()
+        except sqlite3.Error as e:
+            print(f"Error fetching detection: {e}")
+            return []
+        
+        # Not live: it may have been moved to a monthly archive
+        if detection is None:
+            for partition in self.get_archive_partitions():
+                try:
+                    with self._attached_archive(partition['month']) as schema:
+                        detection = self.conn.execute(query.format(table=f'{schema}.detection_events'),
+                                                      (detection_id,)).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Error fetching archived detection from {partition['month']}: {e}")
+                if detection is not None:
+                    break
+        
+        if detection is None:
+            return []
+        
+        moment = datetime.fromtimestamp(detection[0] / 1000)
+        start = (moment - timedelta(seconds=padding)).isoformat()
+        end = (moment + timedelta(seconds=padding)).isoformat()
+        return self.get_recordings(start, end, camera_id=detection[1])
     
     def get_recent_detections(self, limit=50):
         """Get recent detection events"""
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT * FROM detection_events 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-            ''', (limit,))
+            cursor.execute(DETECTION_SELECT + ' ORDER BY d.timestamp DESC LIMIT ?', (limit,))
             results = cursor.fetchall()
             cursor.close()
             return results
@@ -223,14 +1203,43 @@ class SurveillanceDB:
             print(f"Error fetching recent detections: {e}")
             return []
     
+    def get_detection_summary(self, start_day, end_day, camera_id=None):
+        """
+        Get (person_name, count, first_seen, last_seen) per person for the
+        days start_day..end_day (inclusive, 'YYYY-MM-DD'), from the rollups
+        Intruders are summed under person_name ''; first/last seen are epoch ms
+        """
+        query = '''
+            SELECT COALESCE(p.name, '') AS person_name, SUM(r.detections) AS count,
+                   MIN(r.first_seen) AS first_seen, MAX(r.last_seen) AS last_seen
+            FROM detection_daily_counts r
+            LEFT JOIN people p ON p.id = r.person_id
+            WHERE r.day >= ? AND r.day <= ?
+        '''
+        params = [start_day, end_day]
+        
+        if camera_id is not None:
+            query += ' AND r.camera_id = (SELECT id FROM cameras WHERE source = ?)'
+            params.append(str(camera_id))
+        query += ' GROUP BY r.person_id ORDER BY r.person_id'
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"Error fetching detection summary: {e}")
+            return []
+    
     def get_detections_by_person(self, person_name):
         """Get all detections for a specific person"""
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT * FROM detection_events 
-                WHERE person_name = ? 
-                ORDER BY timestamp DESC
+            cursor.execute(DETECTION_SELECT + '''
+                WHERE d.person_id = (SELECT id FROM people WHERE name = ?)
+                ORDER BY d.timestamp DESC
             ''', (person_name,))
             results = cursor.fetchall()
             cursor.close()
@@ -239,14 +1248,136 @@ class SurveillanceDB:
             print(f"Error fetching detections by person: {e}")
             return []
     
+    def get_detections(self, before=None, limit=50, person_name=None, known=None, camera_id=None,
+                       start_time=None, end_time=None):
+        """
+        Get one page of detection events, newest first
+        `before` is the (timestamp, id) of the last row of the previous page;
+        known=True keeps recognized people, known=False only intruders;
+        start_time/end_time are epoch ms
+        Pages continue into the monthly archives once the live table runs out
+        """
+        query = ' WHERE 1 = 1'
+        params = []
+        
+        if person_name is not None:
+            query += ' AND d.person_id = (SELECT id FROM people WHERE name = ?)'
+            params.append(person_name)
+        elif known is not None:
+            # Intruders have people rows too (for their key), but no name
+            query += ' AND p.name IS NOT NULL' if known else ' AND p.name IS NULL'
+        if camera_id is not None:
+            query += ' AND d.camera_id = (SELECT id FROM cameras WHERE source = ?)'
+            params.append(str(camera_id))
+        if start_time is not None:
+            query += ' AND d.timestamp >= ?'
+            params.append(start_time)
+        if end_time is not None:
+            query += ' AND d.timestamp < ?'
+            params.append(end_time)
+        if before is not None:
+            # Keyset: continue right after the previous page's last row
+            query += ' AND (d.timestamp, d.id) < (?, ?)'
+            params.extend(before)
+        query += ' ORDER BY d.timestamp DESC, d.id DESC LIMIT ?'
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(DETECTION_SELECT + query, params + [limit])
+            results = cursor.fetchall()
+            cursor.close()
+        except sqlite3.Error as e:
+            print(f"Error fetching detections: {e}")
+            return []
+        
+        # Archived months are usually older than every live row, but the legacy
+        # backfill can still add live rows older than them. So each month that
+        # could hold a row of this page is read (newest first) and merged with
+        # the live rows by (timestamp, id) before the limit is applied.
+        upper = before[0] + 1 if before is not None else end_time
+        if end_time is not None and upper is not None:
+            upper = min(upper, end_time)
+        lower = results[-1]['timestamp'] if len(results) >= limit else None
+        if start_time is not None:
+            lower = start_time if lower is None else max(lower, start_time)
+        
+        for partition in self.get_archive_partitions(lower, upper):
+            if len(results) >= limit and partition['end_time'] <= results[limit - 1]['timestamp']:
+                break  # This month and older ones only hold rows past the page
+            try:
+                with self._attached_archive(partition['month']) as schema:
+                    cursor = self.conn.cursor()
+                    cursor.execute(ARCHIVE_DETECTION_SELECT.format(schema=schema) + query, params + [limit])
+                    rows = cursor.fetchall()
+                    cursor.close()
+            except sqlite3.Error as e:
+                print(f"Error fetching archived detections for {partition['month']}: {e}")
+                continue
+            if rows:
+                results += rows
+                results.sort(key=lambda row: (row['timestamp'], row['id']), reverse=True)
+                del results[limit:]
+        return results
+    
+    def get_alerts(self, before=None, limit=50, acknowledged=None, alert_type=None,
+                   start_time=None, end_time=None):
+        """
+        Get one page of alerts, newest first
+        `before` is the (timestamp, id) of the last row of the previous page;
+        acknowledged=None returns both pending and acknowledged alerts;
+        start_time/end_time are epoch ms
+        """
+        query = ALERT_SELECT + ' WHERE 1 = 1'
+        params = []
+        
+        if acknowledged is not None:
+            query += ' AND a.acknowledged = ?'
+            params.append(1 if acknowledged else 0)
+        if alert_type is not None:
+            query += ' AND a.alert_type = ?'
+            params.append(alert_type)
+        if start_time is not None:
+            query += ' AND a.timestamp >= ?'
+            params.append(start_time)
+        if end_time is not None:
+            query += ' AND a.timestamp < ?'
+            params.append(end_time)
+        if before is not None:
+            query += ' AND (a.timestamp, a.id) < (?, ?)'
+            params.extend(before)
+        
+        query += ' ORDER BY a.timestamp DESC, a.id DESC LIMIT ?'
+        params.append(limit)
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            results = cursor.fetchall()
+            cursor.close()
+            return results
+        except sqlite3.Error as e:
+            print(f"Error fetching alerts: {e}")
+            return []
+    
+    def get_alert_counts(self):
+        """Get total and pending alert counts (from the rollups)"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT COALESCE(SUM(total), 0), COALESCE(SUM(pending), 0) FROM alert_counts')
+            total, pending = cursor.fetchone()
+            cursor.close()
+            return {'total': total, 'pending': pending, 'acknowledged': total - pending}
+        except sqlite3.Error as e:
+            print(f"Error fetching alert counts: {e}")
+            return {'total': 0, 'pending': 0, 'acknowledged': 0}
+    
     def get_unacknowledged_alerts(self):
         """Get all unacknowledged alerts"""
         try:
             cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT * FROM alerts 
-                WHERE acknowledged = 0 
-                ORDER BY timestamp DESC
+            cursor.execute(ALERT_SELECT + '''
+                WHERE a.acknowledged = 0
+                ORDER BY a.timestamp DESC
             ''')
             results = cursor.fetchall()
             cursor.close()
@@ -273,30 +1404,31 @@ class SurveillanceDB:
             return False
     
     def get_statistics(self):
-        """Get system statistics"""
+        """Get system statistics (read from the rollup tables, not the event tables)"""
         stats = {}
         
         try:
             cursor = self.conn.cursor()
             
             # Total detections
-            cursor.execute('SELECT COUNT(*) FROM detection_events')
+            cursor.execute("SELECT COALESCE(MAX(value), 0) FROM stat_counters WHERE name = 'detections'")
             stats['total_detections'] = cursor.fetchone()[0]
             
             # Known persons count
             cursor.execute('SELECT COUNT(*) FROM known_persons')
             stats['known_persons'] = cursor.fetchone()[0]
             
-            # Unacknowledged alerts
-            cursor.execute('SELECT COUNT(*) FROM alerts WHERE acknowledged = 0')
-            stats['pending_alerts'] = cursor.fetchone()[0]
+            # Unacknowledged alerts, in total and for intruders
+            cursor.execute('SELECT alert_type, pending FROM alert_counts')
+            pending = dict(cursor.fetchall())
+            stats['pending_alerts'] = sum(pending.values())
+            stats['pending_intruder_alerts'] = sum(pending.get(t, 0) for t in INTRUDER_ALERT_TYPES)
             
-            # Detections today
-            today = datetime.now().date().isoformat()
+            # Detections today (one rollup row per camera and person seen)
             cursor.execute('''
-                SELECT COUNT(*) FROM detection_events 
-                WHERE date(timestamp) = ?
-            ''', (today,))
+                SELECT COALESCE(SUM(detections), 0) FROM detection_daily_counts
+                WHERE day = ?
+            ''', (datetime.now().date().isoformat(),))
             stats['detections_today'] = cursor.fetchone()[0]
             
             cursor.close()
@@ -315,7 +1447,7 @@ class SurveillanceDB:
             'recognition_threshold': '0.4',
             'enable_alerts': 'true',
             'alert_cooldown': '300',
-            'enable_recording': 'false',
+            'enable_recording': str(config.ENABLE_RECORDING).lower(),
             'recording_duration': '30',
             'max_storage_gb': '50'
         }
@@ -342,35 +1474,43 @@ class SurveillanceDB:
             print(f"Error initializing default settings: {e}")
     
     def get_settings(self):
-        """Get all settings as a dictionary"""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT key, value FROM settings')
-            results = cursor.fetchall()
-            cursor.close()
-            
-            # Convert to dictionary
-            settings = {}
-            for row in results:
-                key = row[0]
-                value = row[1]
+        """Get all settings as a dictionary (served from the cache)"""
+        return dict(self._cached_settings())
+    
+    def _cached_settings(self):
+        """The typed settings cache, loading it from the database if needed"""
+        with self._settings_lock:
+            if self._settings is None:
+                try:
+                    cursor = self.conn.cursor()
+                    cursor.execute('SELECT key, value FROM settings')
+                    results = cursor.fetchall()
+                    cursor.close()
+                except sqlite3.Error as e:
+                    print(f"Error fetching settings: {e}")
+                    return {}  # Not cached, so the next call retries
                 
-                # Convert string values to appropriate types
-                if value.lower() in ('true', 'false'):
-                    settings[key] = value.lower() == 'true'
-                elif value.replace('.', '', 1).isdigit():
-                    # Check if it's a float or int
-                    if '.' in value:
-                        settings[key] = float(value)
-                    else:
-                        settings[key] = int(value)
-                else:
-                    settings[key] = value
-            
-            return settings
-        except sqlite3.Error as e:
-            print(f"Error fetching settings: {e}")
-            return {}
+                self._settings = {row[0]: _parse_setting(row[1]) for row in results}
+            return self._settings
+    
+    def subscribe_settings(self, callback, keys):
+        """
+        Call `callback(changes)` with the current values of `keys`, then again
+        with the changed ones whenever update_settings modifies any of them
+        """
+        keys = set(keys)
+        self._settings_subscribers.append((callback, keys))
+        current = self._cached_settings()
+        self._notify(callback, {key: current[key] for key in keys if key in current})
+    
+    def _notify(self, callback, changes):
+        """Deliver setting changes to one subscriber"""
+        if not changes:
+            return
+        try:
+            callback(changes)
+        except Exception as e:
+            print(f"Error applying settings {sorted(changes)}: {e}")
     
     def update_settings(self, settings_dict):
         """Update multiple settings at once"""
@@ -390,38 +1530,74 @@ class SurveillanceDB:
             self.conn.commit()
             cursor.close()
             print(f"✅ Updated {len(settings_dict)} settings")
-            return True
         except sqlite3.Error as e:
             print(f"Error updating settings: {e}")
             self.conn.rollback()
             return False
+        
+        # Reload the cache and tell subscribers what actually changed
+        with self._settings_lock:
+            previous = self._settings or {}
+            self._settings = None
+        current = self._cached_settings()
+        changes = {key: value for key, value in current.items()
+                   if key not in previous or previous[key] != value}
+        for callback, keys in list(self._settings_subscribers):
+            self._notify(callback, {key: changes[key] for key in keys if key in changes})
+        return True
     
     def get_setting(self, key, default=None):
-        """Get a single setting value"""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-            result = cursor.fetchone()
-            cursor.close()
-            
-            if result:
-                value = result[0]
-                # Convert string to appropriate type
-                if value.lower() in ('true', 'false'):
-                    return value.lower() == 'true'
-                elif value.replace('.', '', 1).isdigit():
-                    if '.' in value:
-                        return float(value)
-                    else:
-                        return int(value)
-                return value
-            return default
-        except sqlite3.Error as e:
-            print(f"Error fetching setting {key}: {e}")
-            return default
+        """Get a single setting value (served from the cache)"""
+        return self._cached_settings().get(key, default)
     
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            print("Database connection closed")
+        """Commit queued writes and close all database connections"""
+        self._backfill_stop.set()
+        if self._backfill_thread is not None:
+            self._backfill_thread.join()
+        self.writer.close()
+        
+        with self._pool_lock:
+            self._closed = True
+            connections = list(self._all)
+            self._all.clear()
+            self._idle.clear()
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        print("Database connection closed")
+
+def main():
+    """Command line entry point for schema maintenance"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Maintain the surveillance database")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('migrate', help="apply pending schema migrations and move legacy event rows")
+    subparsers.add_parser('rebuild-rollups', help="recompute the statistics rollups")
+    
+    args = parser.parse_args()
+    db = SurveillanceDB(backfill=False)  # Opening the database applies pending migrations
+    
+    try:
+        if args.command == 'migrate':
+            print(f"Schema version: {db.schema_version()} of {len(MIGRATIONS)}")
+            moved = 0
+            while db.legacy_tables():
+                count = db.migrate_legacy_rows()
+                if not count and db.legacy_tables():
+                    break
+                if count:
+                    moved += count
+                    print(f"Moved {moved} legacy event rows...")
+        elif db.rebuild_rollups():
+            print("✅ Statistics rollups rebuilt")
+        print(db.get_statistics())
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
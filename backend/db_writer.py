@@ -0,0 +1,244 @@
+"""
+Database Writer Module for AI Surveillance System
+Group-commits detections, alerts and system logs from a background thread
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+import config
+
+# Insert statements for the tables written through the batch writer
+# (people and camera sources are stored as ids into people/cameras; a person
+# is keyed by name if recognized, else by the pipeline's person id)
+INSERTS = {
+    'detection_events': '''
+        INSERT INTO detection_events
+        (timestamp, person_id, confidence, face_image_path, video_path, camera_id)
+        VALUES (?, (SELECT id FROM people WHERE person_key = COALESCE(?, ?)), ?, ?, ?,
+                (SELECT id FROM cameras WHERE source = ?))
+    ''',
+    'alerts': '''
+        INSERT INTO alerts
+        (timestamp, alert_type, person_id, description)
+        VALUES (?, ?, (SELECT id FROM people WHERE person_key = COALESCE(?, ?)), ?)
+    ''',
+    'system_logs': '''
+        INSERT INTO system_logs (timestamp, level, message, details)
+        VALUES (?, ?, ?, ?)
+    '''
+}
+
+# Position of the person name (followed by the person id) / camera source in each table's parameters
+PERSON_PARAM = {'detection_events': 1, 'alerts': 2}
+CAMERA_PARAM = {'detection_events': 6}
+
+def _text(value):
+    return None if value is None else str(value)
+
+def _real(value):
+    return None if value is None else float(value)
+
+# Column types of each table's parameters, applied at submit() so values such
+# as numpy floats can't fail a batch when it is inserted
+PARAM_TYPES = {
+    'detection_events': (int, _text, _text, _real, _text, _text, _text),
+    'alerts': (int, _text, _text, _text, _text),
+    'system_logs': (int, _text, _text, _text)
+}
+
+class DBWriter:
+    def __init__(self, open_connection, interval_ms=None, batch_size=None):
+        """
+        Start the writer thread
+
+        submit() only queues the row, so the caller never waits on SQLite.
+        The thread collects rows for up to `interval_ms` (or until
+        `batch_size` rows are waiting), inserts them with one executemany per
+        table and commits the whole batch at once. If the batch fails, its
+        rows are retried one at a time so only the bad rows are lost. Each
+        submit() returns a Future that resolves to the new row id, or None if
+        the row could not be written.
+        """
+        self.interval = (interval_ms or config.DB_BATCH_INTERVAL_MS) / 1000
+        self.batch_size = batch_size or config.DB_BATCH_SIZE
+        self.conn = open_connection()
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.last_batch_ms = 0
+
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+        # The thread is a daemon: make sure queued rows are committed
+        atexit.register(self.close)
+
+    def submit(self, table, params):
+        """Queue a row for `table`; returns a Future for its row id"""
+        future = Future()
+        if self._closed:
+            future.set_result(None)
+            return future
+
+        try:
+            if len(params) != len(PARAM_TYPES[table]):
+                raise ValueError(f"expected {len(PARAM_TYPES[table])} values")
+            params = tuple(convert(value) for convert, value in zip(PARAM_TYPES[table], params))
+        except (TypeError, ValueError) as e:
+            print(f"Error queuing {table} row {params!r}: {e}")
+            with self._lock:
+                self.rows_failed += 1
+            future.set_result(None)
+            return future
+
+        self._queue.put((table, params, future))
+        return future
+
+    def flush(self, timeout=None):
+        """Wait until every row queued so far is committed"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(('flush', done, None))
+        done.wait(timeout)
+
+    def close(self):
+        """Commit all queued rows and stop the thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        self._queue.put(('stop', None, None))
+        self._thread.join()
+
+    def stats(self):
+        """Get writer metrics"""
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'written': self.rows_written,
+                'failed': self.rows_failed,
+                'batches': self.batches,
+                'last_batch_ms': self.last_batch_ms
+            }
+
+    def _run(self):
+        """Writer loop: gather a batch, commit it, signal any flush waiting on it"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+
+            # Keep collecting until the batch is full, the interval is over,
+            # or a flush/stop asks for everything queued so far
+            while len(batch) < self.batch_size and batch[-1][0] not in ('flush', 'stop'):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            control = batch[-1] if batch[-1][0] in ('flush', 'stop') else None
+            if control:
+                batch.pop()
+            if batch:
+                self._write(batch)
+
+            if control:
+                if control[0] == 'stop':
+                    self.conn.close()
+                    return
+                control[1].set()
+
+    def _write(self, batch):
+        """Insert a batch in one transaction and resolve its futures"""
+        start = time.perf_counter()
+
+        # Group rows by table, keeping submission order within each table
+        tables = {}
+        for table, params, future in batch:
+            rows, futures = tables.setdefault(table, ([], []))
+            rows.append(params)
+            futures.append(future)
+
+        results = []
+        try:
+            with self.conn:
+                self._insert_references(tables)
+                for table, (rows, futures) in tables.items():
+                    self.conn.executemany(INSERTS[table], rows)
+                    # The transaction holds the write lock, so the batch got
+                    # consecutive AUTOINCREMENT ids ending at last_insert_rowid()
+                    last_id = self.conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                    first_id = last_id - len(rows) + 1
+                    results.extend(zip(futures, range(first_id, last_id + 1)))
+        except sqlite3.Error as e:
+            print(f"Error writing {len(batch)} database rows, retrying one by one: {e}")
+            results = [(future, self._write_row(table, params)) for table, params, future in batch]
+
+        failed = sum(1 for _, row_id in results if row_id is None)
+        with self._lock:
+            self.batches += 1
+            self.last_batch_ms = round((time.perf_counter() - start) * 1000, 2)
+            self.rows_written += len(batch) - failed
+            self.rows_failed += failed
+
+        for future, row_id in results:
+            future.set_result(row_id)
+
+    def _write_row(self, table, params):
+        """Insert a single row in its own transaction; returns its id, or None if it fails"""
+        try:
+            with self.conn:
+                self._insert_references({table: ([params], None)})
+                return self.conn.execute(INSERTS[table], params).lastrowid
+        except sqlite3.Error as e:
+            print(f"Error writing {table} row {params!r}: {e}")
+            return None
+
+    def _insert_references(self, tables):
+        """Add the people and cameras a batch refers to but the database doesn't know yet"""
+        people, sources = set(), set()
+        for table, (rows, _) in tables.items():
+            if table in PERSON_PARAM:
+                i = PERSON_PARAM[table]
+                people.update((row[i], row[i + 1]) for row in rows)
+            if table in CAMERA_PARAM:
+                sources.update(row[CAMERA_PARAM[table]] for row in rows)
+        insert_references(self.conn, people, sources)
+
+def insert_references(conn, people, sources):
+    """
+    Register people and camera sources so inserts can look up their ids
+    `people` holds (name, person_id) pairs; recognized people are keyed by
+    name, intruders (name None) by the pipeline's person id
+    """
+    # NOT EXISTS rather than INSERT OR IGNORE, which would use up an AUTOINCREMENT id per call
+    now = int(datetime.now().timestamp() * 1000)
+    people = [(name or person_id, name, now, name or person_id)
+              for name, person_id in people if (name or person_id) is not None]
+    sources = [(source, now, source) for source in sources if source is not None]
+    if people:
+        conn.executemany('''
+            INSERT INTO people (person_key, name, created_at)
+            SELECT ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM people WHERE person_key = ?)
+        ''', people)
+    if sources:
+        conn.executemany('''
+            INSERT INTO cameras (source, created_at)
+            SELECT ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM cameras WHERE source = ?)
+        ''', sources)
@@ -0,0 +1,91 @@
+"""
+Event Broadcasting Module for AI Surveillance System
+Pushes detections, alerts, camera state and statistics changes to clients (SSE)
+"""
+import json
+import queue
+import threading
+
+# Tells a client that it missed events and should refetch its state
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+
+class EventBroker:
+    def __init__(self, max_queue=100, heartbeat=15):
+        """
+        Fan out pipeline events to every connected subscriber
+
+        A subscriber that falls `max_queue` events behind has its backlog
+        replaced by a single 'resync' event. Clients apply 'stats' as deltas,
+        so silently dropping events would leave their totals wrong.
+        """
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self):
+        """Register a subscriber and return its event queue"""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event_type, data):
+        """Send an event to all subscribers (never blocks the publisher)"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._next_id += 1
+            subscribers = list(self._subscribers)
+            event_id = self._next_id
+
+        # Serialize once for everyone
+        message = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # Slow client: rather than stall the pipeline, discard its backlog
+                # and have it refetch, then carry on from this event
+                self._resync(q)
+                try:
+                    q.put_nowait(message)
+                except queue.Full:
+                    pass
+
+    def _resync(self, q):
+        """Replace a subscriber's queued events with a resync event"""
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            q.put_nowait(RESYNC_MESSAGE)
+        except queue.Full:
+            pass
+
+    def stream(self):
+        """Generator producing a text/event-stream for one client"""
+        q = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(q)
+
+    def subscriber_count(self):
+        """Number of connected clients"""
+        with self._lock:
+            return len(self._subscribers)
@@ -9,6 +9,9 @@ import os
 import pickle
 from datetime import datetime
 import config
+from crop_writer import CropWriter
+from crop_store import CropStore
+from overlay import renderer
 
 class FaceDetector:
     def __init__(self):
@@ -18,7 +21,12 @@ class FaceDetector:
         self.app.prepare(ctx_id=0, det_size=(640, 640))
         
         self.known_faces = {}  # Dictionary to store known face embeddings
+        self.recognition_threshold = config.RECOGNITION_THRESHOLD  # Can be changed while running
         self.load_known_faces()
+        
+        # Face crops are encoded and written in the background, packed into shards
+        self.crop_store = CropStore() if config.CROP_STORAGE == 'packed' else None
+        self.crop_writer = CropWriter(store=self.crop_store)
         print(f"Face detector initialized. Loaded {len(self.known_faces)} known faces.")
     
     def detect_faces(self, frame):
@@ -48,7 +56,7 @@ class FaceDetector:
             # Calculate cosine similarity
             similarity = self.compute_similarity(face_embedding, known_embedding)
             
-            if similarity > max_similarity and similarity > config.RECOGNITION_THRESHOLD:
+            if similarity > max_similarity and similarity > self.recognition_threshold:
                 max_similarity = similarity
                 recognized_name = name
         
@@ -66,7 +74,10 @@ class FaceDetector:
         return similarity
     
     def save_face_image(self, frame, face, person_id):
-        """Save detected face image"""
+        """
+        Queue a detected face image for saving
+        Returns the path it will be written to, or None if the crop was dropped
+        """
         bbox = face.bbox.astype(int)
         x1, y1, x2, y2 = bbox[0], bbox[1], bbox[2], bbox[3]
         
@@ -83,9 +94,16 @@ class FaceDetector:
         filename = f"{person_id}_{timestamp}.jpg"
         filepath = os.path.join(config.FACES_DIR, filename)
         
-        cv2.imwrite(filepath, face_img)
+        if not self.crop_writer.submit(filepath, face_img):
+            return None
         return filepath
     
+    def close(self):
+        """Write any queued face images"""
+        self.crop_writer.close()
+        if self.crop_store:
+            self.crop_store.close()
+    
     def add_known_face(self, name, image_path):
         """Add a new known face from an image"""
         img = cv2.imread(image_path)
@@ -143,32 +161,5 @@ class FaceDetector:
     
     def draw_face_box(self, frame, face, name=None, similarity=0):
         """Draw bounding box and label on frame"""
-        bbox = face.bbox.astype(int)
-        x1, y1, x2, y2 = bbox[0], bbox[1], bbox[2], bbox[3]
-        
-        # Choose color based on recognition
-        if name:
-            color = (0, 255, 0)  # Green for known
-            label = f"{name} ({similarity:.2f})"
-        else:
-            color = (0, 0, 255)  # Red for unknown
-            label = "Unknown"
-        
-        # Draw rectangle
-        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-        
-        # Draw label background
-        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-        cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), 
-                     (x1 + label_size[0], y1), color, -1)
-        
-        # Draw label text
-        cv2.putText(frame, label, (x1, y1 - 5), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        
-        # Draw landmarks if available
-        if hasattr(face, 'kps') and face.kps is not None:
-            for kp in face.kps:
-                cv2.circle(frame, (int(kp[0]), int(kp[1])), 2, (255, 255, 0), -1)
-        
-        return frame
+        landmarks = face.kps if hasattr(face, 'kps') else None
+        return renderer.draw_face(frame, face.bbox.astype(int), name, similarity, landmarks)
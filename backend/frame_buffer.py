@@ -0,0 +1,184 @@
+"""
+Frame Buffer Module for AI Surveillance System
+Shares camera frames between the capture thread and readers without copying
+"""
+import threading
+from contextlib import contextmanager
+import numpy as np
+import config
+
+class _Slot:
+    """One preallocated frame buffer in the pool"""
+    __slots__ = ('frame', 'seq', 'meta', 'pins')
+
+    def __init__(self, shape):
+        self.frame = np.zeros(shape, dtype=np.uint8)
+        self.seq = 0
+        self.meta = None
+        self.pins = 0  # Number of readers currently holding this slot
+
+class FrameView:
+    """Read-only handle on a published frame"""
+    __slots__ = ('seq', 'frame', 'meta', '_slot')
+
+    def __init__(self, slot):
+        self.seq = slot.seq
+        self.frame = slot.frame
+        self.meta = slot.meta
+        self._slot = slot
+
+class FrameBuffer:
+    def __init__(self, width=None, height=None, channels=3, slots=3, max_slots=None):
+        """
+        Allocate a pool of frame buffers
+
+        The producer fills a free slot and publishes it with a new sequence
+        number. Readers pin the latest slot while they use it, so the producer
+        never overwrites a frame that is being encoded or saved. The pool grows
+        when every slot is pinned, up to `max_slots`; past that, new frames are
+        captured into a spare buffer and dropped instead of published.
+        """
+        width = width or config.CAMERA_WIDTH
+        height = height or config.CAMERA_HEIGHT
+        self.max_slots = max(slots, max_slots or config.FRAME_POOL_MAX_SLOTS)
+
+        # Guards slot bookkeeping only - never held while pixels are touched
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+
+        self._slots = [_Slot((height, width, channels)) for _ in range(slots)]
+        self._spare = None  # Capture target while every slot is pinned (never published)
+        self._latest = None
+        self._writing = None
+        self.seq = 0
+        self.shape = (height, width, channels)
+
+        # Metrics
+        self.slots_grown = 0
+        self.frames_dropped = 0
+
+    def acquire(self):
+        """
+        Get a writable frame buffer for the producer
+        Returns the buffer array; fill it and pass it to publish()
+        """
+        with self._lock:
+            for slot in self._slots:
+                if slot is not self._latest and slot.pins == 0:
+                    self._writing = slot
+                    return slot.frame
+
+            # Every slot is pinned by a reader: grow the pool instead of
+            # blocking the camera, up to the cap; then the frame is dropped
+            if len(self._slots) < self.max_slots:
+                slot = _Slot(self.shape)
+                self._slots.append(slot)
+                self.slots_grown += 1
+            else:
+                if self._spare is None:
+                    self._spare = _Slot(self.shape)
+                slot = self._spare
+            self._writing = slot
+            return slot.frame
+
+    def resize(self, shape):
+        """Reallocate the pool for a new frame shape (camera ignored requested size)"""
+        with self._lock:
+            if tuple(shape) == self.shape:
+                return
+            self.shape = tuple(shape)
+            self._slots = [_Slot(self.shape) for _ in range(len(self._slots))]
+            self._spare = None
+            self._latest = None
+            self._writing = None
+
+    def publish(self, meta=None, pin=False):
+        """
+        Publish the buffer returned by the last acquire() as the latest frame
+        Returns the new sequence number, or None if the frame was dropped.
+        With pin=True returns a pinned FrameView of the published slot instead
+        (hand it back with release()), so the producer can pass on exactly the
+        frame it published even if clear() runs right after.
+        """
+        with self._lock:
+            slot = self._writing
+            if slot is None:
+                return None if pin else self.seq
+            if slot is self._spare:
+                self._writing = None
+                self.frames_dropped += 1
+                return None
+
+            self.seq += 1
+            slot.seq = self.seq
+            slot.meta = meta
+            self._latest = slot
+            self._writing = None
+            self._new_frame.notify_all()
+            if pin:
+                slot.pins += 1
+                return FrameView(slot)
+            return self.seq
+
+    def latest(self):
+        """
+        Pin and return the latest frame as a FrameView, or None
+        Callers must hand the view back with release()
+        """
+        with self._lock:
+            slot = self._latest
+            if slot is None:
+                return None
+            slot.pins += 1
+            return FrameView(slot)
+
+    def release(self, view):
+        """Unpin a view returned by latest() or publish(pin=True)"""
+        if view is None:
+            return
+        with self._lock:
+            view._slot.pins -= 1
+
+    @contextmanager
+    def read(self):
+        """Context manager yielding the latest FrameView (or None)"""
+        view = self.latest()
+        try:
+            yield view
+        finally:
+            self.release(view)
+
+    def wait_for(self, after_seq, timeout):
+        """
+        Block until a frame other than `after_seq` is published
+        Returns the new sequence number, or None on timeout or camera stop
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(
+                lambda: self._latest is None or self.seq != after_seq, timeout)
+            if self._latest is None or self.seq == after_seq:
+                return None
+            return self.seq
+
+    def clear(self):
+        """Forget the published frame (camera stopped)"""
+        with self._lock:
+            self._latest = None
+            self._writing = None
+            self._new_frame.notify_all()
+
+    def has_frame(self):
+        """Check whether a frame has been published"""
+        return self._latest is not None
+
+    def stats(self):
+        """Get pool size and pinning metrics"""
+        with self._lock:
+            return {
+                'slots': len(self._slots),
+                'max_slots': self.max_slots,
+                'pinned': sum(1 for slot in self._slots if slot.pins),
+                'slots_grown': self.slots_grown,
+                'frames_dropped': self.frames_dropped
+            }
+
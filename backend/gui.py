@@ -6,11 +6,15 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from PIL import Image, ImageTk
 import cv2
+import numpy as np
+import queue
 import threading
 from datetime import datetime
 import os
 from database import SurveillanceDB
 from face_detector import FaceDetector
+from frame_buffer import FrameBuffer
+from overlay import build_overlay, draw_annotations
 import config
 
 class SurveillanceGUI:
@@ -27,15 +31,29 @@ class SurveillanceGUI:
         # GUI variables
         self.is_monitoring = False
         self.cap = None
-        self.current_frame = None
+        self.capture_thread = None
+        
+        # Latest-frame slot: the capture thread publishes, the Tk main loop displays
+        self.frame_buffer = FrameBuffer()
+        self.last_rendered_seq = 0
+        self.display_frame = None  # Reused display-size buffers
+        self.display_rgb = None
+        self.photo = None
+        
+        # Database queries run on a worker; widgets are only touched on the Tk thread
+        self.ui_updates = queue.Queue()
+        self.refresh_requested = threading.Event()
+        self.closing = threading.Event()
+        self.last_detection_ids = None
         
         # Create GUI layout
         self.create_widgets()
-        self.update_statistics()
-        self.load_recent_detections()
         
         # Start periodic updates
+        self.refresh_thread = threading.Thread(target=self.refresh_worker, daemon=True)
+        self.refresh_thread.start()
         self.schedule_updates()
+        self.render_frame()
     
     def create_widgets(self):
         """Create GUI widgets"""
@@ -151,6 +169,9 @@ class SurveillanceGUI:
     
     def start_monitoring(self):
         """Start camera monitoring"""
+        if self.capture_thread is not None:
+            return  # The previous capture thread is still shutting down
+        
         try:
             self.cap = cv2.VideoCapture(config.CAMERA_ID)
             
@@ -162,70 +183,141 @@ class SurveillanceGUI:
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.CAMERA_HEIGHT)
             
             self.is_monitoring = True
+            self.last_rendered_seq = 0
             self.start_btn.config(text="Stop Monitoring")
             self.record_btn.config(state=tk.NORMAL)
             self.snapshot_btn.config(state=tk.NORMAL)
             
             self.db.log_system_event("INFO", "Monitoring started from GUI")
             
-            # Start video feed thread
-            threading.Thread(target=self.update_video_feed, daemon=True).start()
+            # Start capture thread (frames are displayed by render_frame)
+            self.capture_thread = threading.Thread(target=self.update_video_feed, daemon=True)
+            self.capture_thread.start()
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start monitoring: {e}")
     
     def stop_monitoring(self):
-        """Stop camera monitoring"""
+        """Stop camera monitoring (the capture thread is waited for without blocking Tk)"""
         self.is_monitoring = False
         
-        if self.cap:
-            self.cap.release()
-            self.cap = None
-        
+        self.photo = None
         self.video_label.config(image="", text="Camera Inactive")
-        self.start_btn.config(text="Start Monitoring")
+        self.start_btn.config(text="Stopping...", state=tk.DISABLED)
         self.record_btn.config(state=tk.DISABLED)
         self.snapshot_btn.config(state=tk.DISABLED)
         
         self.db.log_system_event("INFO", "Monitoring stopped from GUI")
+        self.finish_stop()
+    
+    def finish_stop(self):
+        """Poll until the capture thread has exited, then allow a restart"""
+        # The capture thread releases the camera once its current read returns
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.root.after(50, self.finish_stop)
+            return
+        
+        self.capture_thread = None
+        self.start_btn.config(text="Start Monitoring", state=tk.NORMAL)
     
     def update_video_feed(self):
-        """Update video feed in real-time"""
+        """Capture frames and run detection (background thread, never touches Tk)"""
         frame_count = 0
+        faces_detected = []
         
         while self.is_monitoring and self.cap:
-            ret, frame = self.cap.read()
+            # Read straight into a preallocated buffer from the frame pool
+            slot = self.frame_buffer.acquire()
+            ret, frame = self.cap.read(slot)
             
             if not ret:
                 break
             
+            if frame is not slot:
+                # Camera delivered a different size than requested - resize the pool once
+                self.frame_buffer.resize(frame.shape)
+                slot = self.frame_buffer.acquire()
+                np.copyto(slot, frame)
+                frame = slot
+            
             frame_count += 1
             
-            # Detect faces periodically
+            # Detect faces periodically; boxes stay on screen until the next detection
             if frame_count % config.DETECTION_INTERVAL == 0:
-                faces = self.face_detector.detect_faces(frame)
+                faces_detected = []
                 
-                for face in faces:
+                for face in self.face_detector.detect_faces(frame):
                     # Recognize face
                     embedding = self.face_detector.get_face_embedding(face)
                     person_name, similarity = self.face_detector.recognize_face(embedding)
                     
-                    # Draw box
-                    frame = self.face_detector.draw_face_box(frame, face, person_name, similarity)
-            
-            # Convert frame for display
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame_resized = cv2.resize(frame_rgb, (800, 600))
-            
-            # Convert to ImageTk
-            img = Image.fromarray(frame_resized)
-            imgtk = ImageTk.PhotoImage(image=img)
-            
-            # Update label
-            self.video_label.imgtk = imgtk
-            self.video_label.configure(image=imgtk, text="")
+                    faces_detected.append({
+                        'bbox': face.bbox.astype(int).tolist(),
+                        'name': person_name,
+                        'confidence': float(similarity),
+                        'is_intruder': person_name is None,
+                        'landmarks': face.kps.tolist() if getattr(face, 'kps', None) is not None else None
+                    })
             
-            self.current_frame = frame
+            self.frame_buffer.publish(build_overlay(faces_detected))
+        
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        self.frame_buffer.clear()
+    
+    def render_frame(self):
+        """Display the newest frame on the Tk main loop, skipping frames already shown"""
+        if self.is_monitoring:
+            if self.capture_thread and not self.capture_thread.is_alive():
+                # Camera read failed
+                self.stop_monitoring()
+            elif self.frame_buffer.seq != self.last_rendered_seq:
+                with self.frame_buffer.read() as view:
+                    if view is not None:
+                        self.show_frame(view)
+                        self.last_rendered_seq = view.seq
+        
+        self.root.after(max(1, 1000 // config.GUI_REFRESH_FPS), self.render_frame)
+    
+    def show_frame(self, view):
+        """Scale a published frame to the display size, annotate it and show it"""
+        width, height = config.GUI_DISPLAY_WIDTH, config.GUI_DISPLAY_HEIGHT
+        
+        if self.display_frame is None:
+            self.display_frame = np.empty((height, width, 3), dtype=np.uint8)
+            self.display_rgb = np.empty_like(self.display_frame)
+        
+        # Resize first so drawing and color conversion only touch display pixels
+        cv2.resize(view.frame, (width, height), dst=self.display_frame)
+        draw_annotations(self.display_frame, self.scale_overlay(view.meta, view.frame.shape))
+        cv2.cvtColor(self.display_frame, cv2.COLOR_BGR2RGB, dst=self.display_rgb)
+        
+        img = Image.fromarray(self.display_rgb)
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage(image=img)
+            self.video_label.configure(image=self.photo, text="")
+        else:
+            # Reuse the Tk image instead of creating one per frame
+            self.photo.paste(img)
+    
+    def scale_overlay(self, overlay, frame_shape):
+        """Map overlay coordinates from camera to display resolution"""
+        if not overlay or not overlay.get('faces'):
+            return overlay
+        
+        sx = config.GUI_DISPLAY_WIDTH / frame_shape[1]
+        sy = config.GUI_DISPLAY_HEIGHT / frame_shape[0]
+        
+        faces = []
+        for face in overlay['faces']:
+            x1, y1, x2, y2 = face['bbox']
+            scaled = dict(face, bbox=[int(x1 * sx), int(y1 * sy), int(x2 * sx), int(y2 * sy)])
+            if face.get('landmarks'):
+                scaled['landmarks'] = [(kp[0] * sx, kp[1] * sy) for kp in face['landmarks']]
+            faces.append(scaled)
+        
+        return dict(overlay, faces=faces)
     
     def toggle_recording(self):
         """Toggle video recording"""
@@ -234,35 +326,51 @@ class SurveillanceGUI:
     
     def take_snapshot(self):
         """Take a snapshot from current frame"""
-        if self.current_frame is not None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"snapshot_{timestamp}.jpg"
-            filepath = os.path.join(config.DATA_DIR, filename)
+        with self.frame_buffer.read() as view:
+            if view is None:
+                return
+            frame = draw_annotations(view.frame.copy(), view.meta)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"snapshot_{timestamp}.jpg"
+        filepath = os.path.join(config.DATA_DIR, filename)
+        
+        cv2.imwrite(filepath, frame)
+        messagebox.showinfo("Snapshot", f"Snapshot saved: {filename}")
+        self.db.log_system_event("INFO", f"Snapshot saved: {filename}")
+    
+    def refresh_worker(self):
+        """Query statistics and recent detections off the Tk thread"""
+        while not self.closing.is_set():
+            stats = self.db.get_statistics()
+            detections = self.db.get_recent_detections(limit=20)
+            self.ui_updates.put((stats, detections))
             
-            cv2.imwrite(filepath, self.current_frame)
-            messagebox.showinfo("Snapshot", f"Snapshot saved: {filename}")
-            self.db.log_system_event("INFO", f"Snapshot saved: {filename}")
+            # Wake up early when the UI asks for a refresh
+            self.refresh_requested.wait(config.GUI_STATS_INTERVAL)
+            self.refresh_requested.clear()
     
-    def update_statistics(self):
+    def update_statistics(self, stats):
         """Update statistics display"""
-        stats = self.db.get_statistics()
-        
         for key, value in stats.items():
             if key in self.stats_labels:
                 self.stats_labels[key].config(text=str(value))
     
-    def load_recent_detections(self):
+    def load_recent_detections(self, detections):
         """Load recent detections into treeview"""
+        # Skip the rebuild when nothing changed
+        detection_ids = [detection[0] for detection in detections]
+        if detection_ids == self.last_detection_ids:
+            return
+        self.last_detection_ids = detection_ids
+        
         # Clear existing items
         for item in self.detections_tree.get_children():
             self.detections_tree.delete(item)
         
-        # Load from database
-        detections = self.db.get_recent_detections(limit=20)
-        
         for detection in detections:
-            # detection = (id, timestamp, person_id, person_name, confidence, ...)
-            time_str = datetime.fromisoformat(detection[1]).strftime("%H:%M:%S")
+            # detection = (id, timestamp (epoch ms), person_id, person_name, confidence, ...)
+            time_str = datetime.fromtimestamp(detection[1] / 1000).strftime("%H:%M:%S")
             person = detection[3] if detection[3] else "Unknown"
             confidence = f"{detection[4]:.2f}" if detection[4] else "N/A"
             
@@ -313,7 +421,7 @@ class SurveillanceGUI:
                 self.db.add_known_person(name, dest_path)
                 messagebox.showinfo("Success", f"Added known face: {name}")
                 self.load_known_faces()
-                self.update_statistics()
+                self.refresh_requested.set()
             else:
                 messagebox.showerror("Error", "Failed to add face. Make sure the image contains a clear face.")
             
@@ -339,12 +447,16 @@ class SurveillanceGUI:
                 messagebox.showinfo("Success", f"Removed: {name}")
     
     def schedule_updates(self):
-        """Schedule periodic updates"""
-        self.update_statistics()
-        self.load_recent_detections()
-        
-        # Schedule next update in 5 seconds
-        self.root.after(5000, self.schedule_updates)
+        """Apply database results from the refresh worker"""
+        try:
+            while True:
+                stats, detections = self.ui_updates.get_nowait()
+                self.update_statistics(stats)
+                self.load_recent_detections(detections)
+        except queue.Empty:
+            pass
+        
+        self.root.after(200, self.schedule_updates)
     
     def run(self):
         """Run the GUI"""
@@ -356,6 +468,17 @@ class SurveillanceGUI:
         if self.is_monitoring:
             self.stop_monitoring()
         
+        # The capture thread still uses the detector and database until it exits
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.root.after(50, self.on_closing)
+            return
+        
+        # Let the refresh worker finish its query before closing the database
+        self.closing.set()
+        self.refresh_requested.set()
+        self.refresh_thread.join(timeout=2)
+        
+        self.face_detector.close()
         self.db.close()
         self.root.destroy()
 
@@ -0,0 +1,216 @@
+"""
+Image Index Module for AI Surveillance System
+Resolves /api/images names without probing directories and caches thumbnails
+"""
+import cv2
+import hashlib
+import numpy as np
+import os
+import threading
+import time
+from collections import OrderedDict
+import config
+
+class ImageSource:
+    """A resolved image; its bytes are only read when needed (not for a 304)"""
+    __slots__ = ('name', 'etag', 'path', 'loader', 'immutable', '_data')
+
+    def __init__(self, name, etag, path=None, loader=None, immutable=False):
+        self.name = name
+        self.etag = etag
+        self.path = path
+        self.loader = loader
+        self.immutable = immutable  # Detection crops never change once written
+        self._data = None
+
+    def read(self):
+        """Get the image bytes, or None if the image has gone away"""
+        if self._data is None:
+            if self.loader:
+                self._data = self.loader()
+            else:
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._data = f.read()
+                except OSError:
+                    return None
+        return self._data
+
+class ImageIndex:
+    def __init__(self, crop_store=None, rescan_interval=5, thumbnail_cache_mb=None):
+        """
+        Look up images by name: packed crops through the crop store index,
+        known faces and data-directory images through an in-memory map that
+        is rescanned (at most every `rescan_interval` seconds) on a miss.
+
+        Thumbnails are cached on disk up to `thumbnail_cache_mb`; the least
+        recently used ones are deleted past that. `on_thumbnail(nbytes)` is
+        called with the change in cached bytes (negative on eviction).
+        """
+        self.crop_store = crop_store
+        self.rescan_interval = rescan_interval
+        self.on_thumbnail = None
+        self.thumbnail_dir = config.THUMBNAILS_DIR
+        self.thumbnail_max_bytes = int((thumbnail_cache_mb or config.THUMBNAIL_CACHE_MB) * 1024 * 1024)
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._files = {}  # name -> path for known faces and data directory images
+        self._last_scan = 0
+
+        # Cached thumbnails, least recently used first (oldest files first after a restart)
+        self._thumbnails = OrderedDict()  # path -> size
+        self._thumbnail_bytes = 0
+        self.thumbnails_evicted = 0
+        entries = []
+        with os.scandir(self.thumbnail_dir) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.endswith('.jpg'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, entry.path, st.st_size))
+        for _, path, size in sorted(entries):
+            self._thumbnails[path] = size
+            self._thumbnail_bytes += size
+
+    def resolve(self, name):
+        """Find an image by file name; returns an ImageSource or None"""
+        name = os.path.basename(name)
+
+        # Packed detection crops
+        if self.crop_store:
+            location = self.crop_store.locate(name)
+            if location is not None:
+                shard_id, offset, length = location
+                return ImageSource(name, f'"c{shard_id}-{offset}-{length}"',
+                                   loader=lambda: self.crop_store.get(name), immutable=True)
+
+        # Loose detection crops (older installs, or CROP_STORAGE = 'files')
+        source = self._stat_source(name, os.path.join(config.FACES_DIR, name), immutable=True)
+        if source:
+            return source
+
+        path = self._lookup_file(name)
+        if path:
+            source = self._stat_source(name, path)
+            if source:
+                return source
+            # File was removed since the last scan
+            with self._lock:
+                self._files.pop(name, None)
+
+        return None
+
+    def thumbnail(self, source, size):
+        """
+        Get a JPEG no wider or taller than `size`, cached on disk by ETag
+        Returns the bytes, or None if the image cannot be decoded
+        """
+        key = hashlib.sha1(f"{source.etag}:{size}".encode()).hexdigest()
+        path = os.path.join(self.thumbnail_dir, f"{key}.jpg")
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            with self._lock:
+                if path in self._thumbnails:
+                    self._thumbnails.move_to_end(path)
+            return data
+        except OSError:
+            pass
+
+        data = source.read()
+        if data is None:
+            return None
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+
+        height, width = image.shape[:2]
+        scale = size / max(height, width)
+        if scale >= 1:
+            return data
+
+        image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), config.THUMBNAIL_QUALITY])
+        if not ok:
+            return None
+        thumbnail = buffer.tobytes()
+
+        # Write atomically so concurrent requests never read a partial file
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(thumbnail)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error caching thumbnail {path}: {e}")
+        else:
+            self._cache_thumbnail(path, len(thumbnail))
+
+        return thumbnail
+
+    def _cache_thumbnail(self, path, size):
+        """Account for a cached thumbnail and evict the least recently used past the cap"""
+        evicted = []
+        with self._lock:
+            added = size - self._thumbnails.pop(path, 0)
+            self._thumbnails[path] = size
+            self._thumbnail_bytes += added
+            while self._thumbnail_bytes > self.thumbnail_max_bytes and len(self._thumbnails) > 1:
+                old_path, old_size = self._thumbnails.popitem(last=False)
+                self._thumbnail_bytes -= old_size
+                evicted.append((old_path, old_size))
+            self.thumbnails_evicted += len(evicted)
+
+        for old_path, old_size in evicted:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error deleting thumbnail {old_path}: {e}")
+            added -= old_size
+
+        if self.on_thumbnail and added:
+            self.on_thumbnail(added)
+
+    def stats(self):
+        """Get thumbnail cache metrics"""
+        with self._lock:
+            return {
+                'thumbnails': len(self._thumbnails),
+                'bytes': self._thumbnail_bytes,
+                'max_bytes': self.thumbnail_max_bytes,
+                'evicted': self.thumbnails_evicted
+            }
+
+    def _stat_source(self, name, path, immutable=False):
+        """Build an ImageSource from one stat() of a file, or None if missing"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return ImageSource(name, f'"f{st.st_mtime_ns:x}-{st.st_size:x}"', path=path, immutable=immutable)
+
+    def _lookup_file(self, name):
+        """Find a known face or data directory image, rescanning on a miss"""
+        with self._lock:
+            path = self._files.get(name)
+            if path is not None or time.monotonic() - self._last_scan < self.rescan_interval:
+                return path
+
+        files = {}
+        for directory in (config.DATA_DIR, config.KNOWN_FACES_DIR):
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            files[entry.name] = entry.path
+            except OSError:
+                continue
+
+        with self._lock:
+            self._files = files
+            self._last_scan = time.monotonic()
+            return files.get(name)
@@ -0,0 +1,121 @@
+"""
+JPEG Cache Module for AI Surveillance System
+Encodes each published frame at most once per quality/size variant
+"""
+import cv2
+import numpy as np
+import threading
+from collections import OrderedDict
+from overlay import draw_annotations
+
+class EncodedFrame:
+    """JPEG bytes of one published frame"""
+    __slots__ = ('seq', 'data', 'meta', 'width', 'height')
+
+    def __init__(self, seq, data, meta=None, width=0, height=0):
+        self.seq = seq
+        self.data = data
+        self.meta = meta
+        self.width = width
+        self.height = height
+
+class JpegCache:
+    def __init__(self, frame_buffer, max_variants=8):
+        """Share JPEG encodes of the latest frame between all requests and streams"""
+        self.frame_buffer = frame_buffer
+        self.max_variants = max_variants
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (quality, width, annotated) -> EncodedFrame
+        self._variant_locks = {}
+        self._scratch = {}  # Per-variant buffers for drawing annotations
+
+        # Metrics
+        self.encodes = 0
+        self.hits = 0
+
+    def get(self, quality=95, width=None, annotated=False):
+        """
+        Get the latest frame as JPEG for a quality/width variant
+        Annotated variants draw the frame's overlay metadata on a copy first
+        Returns an EncodedFrame, or None if no frame is available
+        """
+        key = (int(quality), int(width) if width else None, bool(annotated))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            variant_lock = self._variant_locks.setdefault(key, threading.Lock())
+
+        if entry is not None and self._is_current(entry):
+            self._hit(key)
+            return entry
+
+        # One encode per variant and frame: concurrent viewers wait for it
+        with variant_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and self._is_current(entry):
+                self._hit(key)
+                return entry
+
+            with self.frame_buffer.read() as view:
+                if view is None:
+                    return None
+                frame = view.frame
+                if key[2]:
+                    frame = self._annotate(key, frame, view.meta)
+                entry = self._encode(frame, key[0], key[1])
+                if entry is None:
+                    return None
+                entry.seq = view.seq
+                entry.meta = view.meta
+
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_variants:
+                    old_key, _ = self._entries.popitem(last=False)
+                    self._variant_locks.pop(old_key, None)
+                    self._scratch.pop(old_key, None)
+                self.encodes += 1
+
+        return entry
+
+    def _is_current(self, entry):
+        """Check whether a cached entry still matches the published frame"""
+        return self.frame_buffer.has_frame() and entry.seq == self.frame_buffer.seq
+
+    def _hit(self, key):
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def _annotate(self, key, frame, overlay):
+        """Draw the overlay on this variant's scratch copy of the frame"""
+        scratch = self._scratch.get(key)
+        if scratch is None or scratch.shape != frame.shape:
+            scratch = np.empty_like(frame)
+            self._scratch[key] = scratch
+        np.copyto(scratch, frame)
+        return draw_annotations(scratch, overlay)
+
+    def _encode(self, frame, quality, width):
+        """Resize (if requested) and JPEG-encode a frame"""
+        if width and width < frame.shape[1]:
+            height = int(frame.shape[0] * width / frame.shape[1])
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+        ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if not ok:
+            return None
+        return EncodedFrame(0, buffer.tobytes(), width=frame.shape[1], height=frame.shape[0])
+
+    def stats(self):
+        """Get cache metrics"""
+        with self._lock:
+            return {
+                'encodes': self.encodes,
+                'hits': self.hits,
+                'variants': len(self._entries)
+            }
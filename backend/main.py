@@ -9,6 +9,10 @@ import threading
 import os
 from face_detector import FaceDetector
 from database import SurveillanceDB
+from recorder import VideoRecorder
+from recording_indexer import RecordingIndexer
+from storage_manager import StorageManager
+from overlay import renderer
 import config
 
 class SurveillanceCamera:
@@ -27,18 +31,35 @@ class SurveillanceCamera:
         self.is_running = False
         self.frame_count = 0
         
-        # Recording setup
-        self.video_writer = None
+        # Recording setup (encoding happens on the recorder thread, metadata
+        # and thumbnails are extracted by the indexer once a segment closes)
+        self.recording_indexer = RecordingIndexer(self.db)
+        self.recorder = VideoRecorder(on_segment=self.on_segment_closed)
+        
+        # Keeps recordings and face crops within the max_storage_gb setting
+        self.storage_manager = StorageManager(self.db, self.face_detector.crop_store)
+        if self.face_detector.crop_store:
+            self.face_detector.crop_writer.on_write = lambda nbytes: self.storage_manager.add('crops', nbytes)
+        self.recording_indexer.on_thumbnail = lambda nbytes: self.storage_manager.add('thumbnails', nbytes)
         self.recording_start_time = None
         self.current_video_path = None
         self.is_recording = False
         
+        # Settings table values the loop reads (config.py defaults until applied)
+        self.enable_recording = config.ENABLE_RECORDING
+        self.alert_cooldown = config.ALERT_COOLDOWN
+        self.db.subscribe_settings(self.apply_settings, ('enable_recording', 'alert_cooldown'))
+        
         # Detection tracking
         self.last_detection_time = {}
+        self.last_alert_time = {}
         self.detected_persons = set()
         self.photo_taken_for = {}  # Track which persons have had photos taken
         self.person_still_present = {}  # Track if person is still in frame
         
+        # Reused buffer for the preview overlay (the raw frame may be queued for recording)
+        self.preview_frame = None
+        
         # FPS calculation
         self.fps = 0
         self.fps_start_time = time.time()
@@ -46,6 +67,13 @@ class SurveillanceCamera:
         
         print("Initialization complete!")
     
+    def apply_settings(self, changes):
+        """Settings subscriber: update the values the surveillance loop reads"""
+        if 'enable_recording' in changes:
+            self.enable_recording = bool(changes['enable_recording'])
+        if 'alert_cooldown' in changes:
+            self.alert_cooldown = max(0, float(changes['alert_cooldown']))
+    
     def initialize_camera(self):
         """Initialize camera capture"""
         print(f"Initializing camera (ID: {config.CAMERA_ID})...")
@@ -76,15 +104,7 @@ class SurveillanceCamera:
         filename = f"recording_{timestamp}.mp4"
         self.current_video_path = os.path.join(config.RECORDINGS_DIR, filename)
         
-        fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
-        frame_size = (config.CAMERA_WIDTH, config.CAMERA_HEIGHT)
-        
-        self.video_writer = cv2.VideoWriter(
-            self.current_video_path,
-            fourcc,
-            config.VIDEO_FPS,
-            frame_size
-        )
+        self.recorder.start(self.current_video_path)
         
         self.recording_start_time = datetime.now()
         self.is_recording = True
@@ -97,9 +117,7 @@ class SurveillanceCamera:
         if not self.is_recording:
             return
         
-        if self.video_writer:
-            self.video_writer.release()
-            self.video_writer = None
+        self.current_video_path = self.recorder.stop() or self.current_video_path
         
         duration = (datetime.now() - self.recording_start_time).total_seconds()
         self.db.log_system_event("INFO", f"Recording stopped (Duration: {duration:.1f}s)", 
@@ -111,6 +129,15 @@ class SurveillanceCamera:
         self.recording_start_time = None
         self.current_video_path = None
     
+    def on_segment_closed(self, **segment):
+        """Register, index and account for a closed recording segment"""
+        self.recording_indexer.add_segment(**segment)
+        self.storage_manager.add('recordings', segment['byte_size'])
+        
+        # A rollover closed the segment we were pointing at: follow the recorder to the next one
+        if segment['file_path'] == self.current_video_path:
+            self.current_video_path = self.recorder.current_path
+    
     def process_frame(self, frame):
         """Process a single frame for face detection"""
         faces = []
@@ -130,7 +157,7 @@ class SurveillanceCamera:
         current_frame_persons = set()
         
         # Start recording if faces detected and recording is enabled
-        if faces_detected and config.ENABLE_RECORDING and config.RECORD_ON_DETECTION:
+        if faces_detected and self.enable_recording and config.RECORD_ON_DETECTION:
             if not self.is_recording:
                 self.start_recording()
         
@@ -183,19 +210,22 @@ class SurveillanceCamera:
                 self.db.log_detection(
                     person_id=person_id,
                     person_name=person_name,
-                    confidence=similarity,
+                    confidence=float(similarity),
                     face_image_path=face_image_path,
-                    video_path=self.current_video_path,
+                    video_path=self.recorder.note_detection(),
                     camera_id=str(config.CAMERA_ID)
                 )
                 
-                # Create alert for unknown faces
+                # Create alert for unknown faces (at most one per alert cooldown)
                 if not person_name and config.ENABLE_ALERTS and config.UNKNOWN_FACE_ALERT:
-                    self.db.create_alert(
-                        alert_type="UNKNOWN_PERSON",
-                        person_id=person_id,
-                        description=f"Unknown person detected at {current_time.strftime('%H:%M:%S')}"
-                    )
+                    last_alert = self.last_alert_time.get(person_id)
+                    if last_alert is None or (current_time - last_alert).total_seconds() >= self.alert_cooldown:
+                        self.last_alert_time[person_id] = current_time
+                        self.db.create_alert(
+                            alert_type="UNKNOWN_PERSON",
+                            person_id=person_id,
+                            description=f"Unknown person detected at {current_time.strftime('%H:%M:%S')}"
+                        )
                 
                 print(f"[{current_time.strftime('%H:%M:%S')}] Photo captured: {person_name or 'Unknown'} "
                       f"(Confidence: {similarity:.2f})")
@@ -240,23 +270,23 @@ class SurveillanceCamera:
             self.fps_start_time = current_time
     
     def draw_info_overlay(self, frame):
-        """Draw information overlay on frame"""
-        overlay = frame.copy()
+        """Draw information overlay on a copy of the frame"""
+        if self.preview_frame is None or self.preview_frame.shape != frame.shape:
+            self.preview_frame = np.empty_like(frame)
+        np.copyto(self.preview_frame, frame)
+        frame = self.preview_frame
         
-        # Draw semi-transparent black box at top
-        cv2.rectangle(overlay, (0, 0), (frame.shape[1], 80), (0, 0, 0), -1)
-        frame = cv2.addWeighted(overlay, 0.5, frame, 0.5, 0)
+        # Darken the top band in place (only those rows are touched)
+        renderer.darken_band(frame, 81)
         
         # System info
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(frame, timestamp, (10, 25), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+        renderer.draw_text(frame, timestamp, (10, 25), 0.7, (255, 255, 255))
         
         # FPS
         if config.SHOW_FPS:
             fps_text = f"FPS: {self.fps:.1f}"
-            cv2.putText(frame, fps_text, (10, 55), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            renderer.draw_text(frame, fps_text, (10, 55), 0.7, (0, 255, 0))
         
         # Recording indicator
         if self.is_recording:
@@ -264,8 +294,7 @@ class SurveillanceCamera:
             text_size = cv2.getTextSize(rec_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
             x_pos = frame.shape[1] - text_size[0] - 20
             cv2.circle(frame, (x_pos - 15, 30), 8, (0, 0, 255), -1)
-            cv2.putText(frame, rec_text, (x_pos, 35), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+            renderer.draw_text(frame, rec_text, (x_pos, 35), 0.8, (0, 0, 255))
         
         return frame
     
@@ -281,7 +310,7 @@ class SurveillanceCamera:
             print("-" * 50)
             
             # Start continuous recording if enabled and not detection-based
-            if config.ENABLE_RECORDING and not config.RECORD_ON_DETECTION:
+            if self.enable_recording and not config.RECORD_ON_DETECTION:
                 self.start_recording()
             
             while self.is_running:
@@ -300,9 +329,10 @@ class SurveillanceCamera:
                 if faces:
                     frame = self.handle_detection(frame, faces)
                 
-                # Record frame if recording
-                if self.is_recording and self.video_writer:
-                    self.video_writer.write(frame)
+                # Record frame, or keep it in the pre-record buffer so detection-
+                # triggered recordings include the moments before the first face
+                if self.recorder.wants_frame():
+                    self.recorder.write(frame)
                 
                 # Calculate FPS
                 self.calculate_fps()
@@ -352,6 +382,16 @@ class SurveillanceCamera:
         if self.is_recording:
             self.stop_recording()
         
+        # Flush queued frames and face crops before exiting
+        self.recorder.close()
+        self.recording_indexer.close()
+        self.face_detector.close()
+        self.storage_manager.close()
+        stats = self.recorder.stats()
+        if stats['frames_dropped']:
+            print(f"Recorder dropped {stats['frames_dropped']} frames "
+                  f"(max queue depth {stats['max_queue_depth']})")
+        
         if self.cap:
             self.cap.release()
         
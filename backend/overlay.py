@@ -0,0 +1,147 @@
+"""
+Overlay Module for AI Surveillance System
+Draws face boxes, labels and status text from published overlay metadata
+"""
+import cv2
+import numpy as np
+import threading
+from collections import OrderedDict
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+class _Sprite:
+    """Pre-rendered label and its offset from the label origin"""
+    __slots__ = ('image', 'dx', 'dy')
+
+    def __init__(self, image, dx, dy):
+        self.image = image
+        self.dx = dx
+        self.dy = dy
+
+class OverlayRenderer:
+    def __init__(self, max_sprites=256):
+        """Shared renderer for annotations; label boxes are rendered once and reused"""
+        self.max_sprites = max_sprites
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def draw_text(self, frame, text, origin, scale, color, thickness=2):
+        """
+        Draw text at a cv2.putText-style origin (bottom-left of the text)
+        Plain putText: blending a cached glyph sprite measured slower
+        (benchmark_annotation.py)
+        """
+        cv2.putText(frame, text, origin, FONT, scale, color, thickness)
+
+    def draw_label(self, frame, text, x, y, color, scale=0.6, thickness=2):
+        """Draw white text on a filled `color` box whose bottom-left corner is (x, y)"""
+        sprite = self._sprite(text, scale, thickness, color)
+        self._paste(frame, sprite, x + sprite.dx, y + sprite.dy)
+
+    def draw_face(self, frame, bbox, name=None, similarity=0, landmarks=None):
+        """Draw a face bounding box with its name label"""
+        x1, y1, x2, y2 = (int(v) for v in bbox[:4])
+
+        # Choose color based on recognition
+        if name:
+            color = (0, 255, 0)  # Green for known
+            label = f"{name} ({similarity:.2f})"
+        else:
+            color = (0, 0, 255)  # Red for unknown
+            label = "Unknown"
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        self.draw_label(frame, label, x1, y1, color)
+
+        # Draw landmarks if available
+        if landmarks is not None:
+            for kp in landmarks:
+                cv2.circle(frame, (int(kp[0]), int(kp[1])), 2, (255, 255, 0), -1)
+
+        return frame
+
+    def darken_band(self, frame, height, opacity=0.5):
+        """Darken the top `height` rows in place (same result as blending a black box)"""
+        roi = frame[:height]
+        cv2.convertScaleAbs(roi, dst=roi, alpha=1.0 - opacity)
+        return frame
+
+    def draw_recording_indicator(self, frame, scale=0.6, right_margin=70, y=35):
+        """Draw the red REC dot and text in the top-right corner"""
+        x = frame.shape[1] - right_margin
+        cv2.circle(frame, (x + 40, y - 5), 8, (0, 0, 255), -1)
+        self.draw_text(frame, "REC", (x, y), scale, (0, 0, 255))
+        return frame
+
+    def draw_annotations(self, frame, overlay):
+        """Draw published overlay metadata onto a frame in place"""
+        if not overlay:
+            return frame
+
+        for face in overlay.get('faces') or []:
+            self.draw_face(frame, face['bbox'], face.get('name'), face.get('confidence', 0),
+                           face.get('landmarks'))
+
+        if overlay.get('timestamp'):
+            self.draw_text(frame, overlay['timestamp'], (10, 30), 0.7, (255, 255, 255))
+
+        if overlay.get('recording'):
+            self.draw_recording_indicator(frame)
+
+        return frame
+
+    def _sprite(self, text, scale, thickness, background):
+        """Get a cached rendering of a label"""
+        key = (text, scale, thickness, background)
+
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                return sprite
+
+        (width, height), _ = cv2.getTextSize(text, FONT, scale, thickness)
+
+        # Opaque box (matches the original label rectangle), text 5px above its bottom
+        image = np.empty((height + 11, width + 1, 3), dtype=np.uint8)
+        image[:] = background
+        cv2.putText(image, text, (0, height + 5), FONT, scale, (255, 255, 255), thickness)
+        sprite = _Sprite(image, 0, -(height + 10))
+
+        with self._lock:
+            self._sprites[key] = sprite
+            while len(self._sprites) > self.max_sprites:
+                self._sprites.popitem(last=False)
+
+        return sprite
+
+    def _paste(self, frame, sprite, x, y):
+        """Copy a sprite into the frame with its top-left at (x, y), clipped to the frame"""
+        sprite_h, sprite_w = sprite.image.shape[:2]
+        frame_h, frame_w = frame.shape[:2]
+
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite_w, frame_w), min(y + sprite_h, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        sx, sy = x0 - x, y0 - y
+        frame[y0:y1, x0:x1] = sprite.image[sy:sy + (y1 - y0), sx:sx + (x1 - x0)]
+
+# Shared by the API server, CLI and GUI
+renderer = OverlayRenderer()
+
+def build_overlay(faces, is_recording=False, timestamp=None):
+    """
+    Build the overlay metadata published alongside a raw frame
+    `faces` items have bbox [x1, y1, x2, y2], name, confidence, is_intruder
+    """
+    return {
+        'faces': faces,
+        'timestamp': timestamp,
+        'recording': is_recording
+    }
+
+def draw_annotations(frame, overlay):
+    """Draw overlay metadata onto a frame in place"""
+    return renderer.draw_annotations(frame, overlay)
@@ -0,0 +1,391 @@
+"""
+Video Recorder Module for AI Surveillance System
+Encodes recordings on a dedicated writer thread fed by a bounded frame queue
+"""
+import cv2
+import numpy as np
+import threading
+import time
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from overlay import draw_annotations
+import config
+
+class PreRollBuffer:
+    def __init__(self, seconds, quality=None, max_bytes=None):
+        """Rolling buffer of the last N seconds of frames, held as JPEG bytes"""
+        self.seconds = seconds
+        self.quality = quality or config.PRE_RECORD_QUALITY
+        self.max_bytes = max_bytes or config.PRE_RECORD_MAX_MB * 1024 * 1024
+        self._encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        self._frames = deque()  # (timestamp, jpeg bytes)
+        self._lock = threading.Lock()  # stats() is read from other threads
+        self.total_bytes = 0
+
+    def add(self, frame, timestamp):
+        """Compress a frame into the buffer and evict anything too old or over budget"""
+        ok, buffer = cv2.imencode('.jpg', frame, self._encode_param)
+        if not ok:
+            return
+
+        data = buffer.tobytes()
+        cutoff = timestamp - self.seconds
+
+        with self._lock:
+            self._frames.append((timestamp, data))
+            self.total_bytes += len(data)
+
+            while self._frames and (self._frames[0][0] < cutoff or self.total_bytes > self.max_bytes):
+                self.total_bytes -= len(self._frames.popleft()[1])
+
+    def drain(self):
+        """Remove and return all buffered JPEG frames, oldest first"""
+        with self._lock:
+            frames = [data for _, data in self._frames]
+            self._frames.clear()
+            self.total_bytes = 0
+        return frames
+
+    def stats(self):
+        """Get buffer size information"""
+        with self._lock:
+            span = self._frames[-1][0] - self._frames[0][0] if self._frames else 0
+            return {
+                'frames': len(self._frames),
+                'bytes': self.total_bytes,
+                'seconds': round(span, 1),
+                'max_bytes': self.max_bytes
+            }
+
+class VideoRecorder:
+    def __init__(self, max_queue=None, drop_policy=None, fps=None, preroll_seconds=None,
+                 camera_id=None, segment_seconds=None, on_segment=None, annotate=False,
+                 max_pinned=None, preroll=None):
+        """
+        Start the writer thread
+
+        Recordings are split into files of `segment_seconds`. When a segment is
+        closed, `on_segment` is called on the writer thread with its metadata
+        (camera_id, file_path, start_time, end_time, frame_count, byte_size,
+        detection_count).
+
+        With `annotate`, the overlay passed to write() is drawn on a copy of
+        each frame on the writer thread; otherwise raw frames are recorded.
+
+        The pre-record buffer costs a JPEG encode per buffered frame, so it is
+        only kept with `preroll` (default config.RECORD_ON_DETECTION): only
+        recordings triggered by a detection can make use of it.
+
+        Frames written with a `release` callback are borrowed from a shared
+        frame pool; at most `max_pinned` of them are queued at once, and the
+        drop policy applies past that just as it does for a full queue.
+        """
+        self.max_queue = max_queue or config.RECORDING_QUEUE_SIZE
+        self.max_pinned = max_pinned or config.RECORDING_PINNED_FRAMES
+        self.drop_policy = drop_policy or config.RECORDING_DROP_POLICY
+        self.fps = fps or config.VIDEO_FPS
+        self.camera_id = str(config.CAMERA_ID if camera_id is None else camera_id)
+        self.segment_seconds = segment_seconds or config.RECORDING_SEGMENT_SECONDS
+        self.on_segment = on_segment
+        self.annotate = annotate
+        self._scratch = None  # Writer-thread buffer for annotated frames
+
+        # Pre-record buffer, filled by the writer thread while not recording
+        if preroll is None:
+            preroll = config.RECORD_ON_DETECTION
+        if preroll_seconds is None:
+            preroll_seconds = config.PRE_RECORD_SECONDS
+        self.preroll = PreRollBuffer(preroll_seconds) if preroll and preroll_seconds > 0 else None
+        self._preroll_interval = 1.0 / self.fps
+        self._last_preroll = 0
+
+        # Commands and frames share one queue so they stay in order;
+        # only frames count towards max_queue
+        self._queue = deque()
+        self._frames_queued = 0
+        self._frames_pinned = 0  # Queued frames that hold a frame pool slot
+        self._cond = threading.Condition()
+        self._running = True
+
+        # State as seen by callers (updated immediately, applied by the thread)
+        self.is_recording = False
+        self.current_path = None
+        self._segment = None
+        self._segment_started = 0
+
+        # Metrics
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.max_queue_depth = 0
+
+        self._thread = threading.Thread(target=self._run, name='video-recorder', daemon=True)
+        self._thread.start()
+
+    def start(self, path=None):
+        """Ask the writer thread to open a new recording (non-blocking)"""
+        with self._cond:
+            if self.is_recording or not self._running:
+                return False
+
+            self.is_recording = True
+            self._open_segment(path or self._segment_path())
+            return True
+
+    def _open_segment(self, path):
+        """Queue a new segment file (called with the lock held)"""
+        self._segment = {
+            'camera_id': self.camera_id,
+            'file_path': path,
+            'start_time': None,
+            'end_time': None,
+            'frame_count': 0,
+            'byte_size': 0,
+            'detection_count': 0
+        }
+        self._segment_started = time.monotonic()
+        self.current_path = path
+        self._queue.append(('start', self._segment, None, None))
+        self._cond.notify_all()
+
+    def _segment_path(self):
+        """Build a unique file name for a segment starting now"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(config.RECORDINGS_DIR, f"recording_{timestamp}.mp4")
+        suffix = 1
+        while os.path.exists(path) or path == self.current_path:
+            path = os.path.join(config.RECORDINGS_DIR, f"recording_{timestamp}_{suffix}.mp4")
+            suffix += 1
+        return path
+
+    def note_detection(self):
+        """
+        Count a detection against the segment being recorded
+        Returns that segment's file path, or None when not recording
+        """
+        with self._cond:
+            if not self.is_recording or self._segment is None:
+                return None
+            self._segment['detection_count'] += 1
+            return self.current_path
+
+    def stop(self):
+        """Ask the writer thread to finish the current recording (non-blocking)"""
+        with self._cond:
+            if not self.is_recording:
+                return None
+
+            path = self.current_path
+            self.is_recording = False
+            self.current_path = None
+            self._segment = None
+            self._queue.append(('stop', None, None, None))
+            self._cond.notify_all()
+            return path
+
+    def wants_frame(self):
+        """Cheap check whether write() would use a frame right now"""
+        if self.is_recording:
+            return True
+        return (self.preroll is not None and
+                time.monotonic() - self._last_preroll >= self._preroll_interval)
+
+    def write(self, frame, release=None, overlay=None):
+        """
+        Queue a frame for the current recording, or for the pre-record buffer
+        `release` is called once the recorder no longer needs the frame buffer
+        `overlay` is drawn onto the recording when the recorder annotates
+        Returns False if the frame was dropped
+        """
+        with self._cond:
+            kind = 'frame'
+            if not self.is_recording:
+                now = time.monotonic()
+                if self.preroll is None or now - self._last_preroll < self._preroll_interval:
+                    if release:
+                        release()
+                    return False
+
+                # Sample at the video frame rate so the buffer plays back at normal speed
+                self._last_preroll = now
+                kind = 'preroll'
+
+            elif time.monotonic() - self._segment_started >= self.segment_seconds:
+                # Roll over to a new segment; the writer closes the previous one
+                self._open_segment(self._segment_path())
+
+            if self._full(release):
+                if not self._make_room(release):
+                    self.frames_dropped += 1
+                    if release:
+                        release()
+                    return False
+
+            self._queue.append((kind, frame, release, overlay))
+            self._frames_queued += 1
+            if release:
+                self._frames_pinned += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._frames_queued)
+            self._cond.notify_all()
+            return True
+
+    def _full(self, release):
+        """Check whether a frame (pinned if it has `release`) has to wait or be dropped"""
+        return (self._frames_queued >= self.max_queue or
+                (release is not None and self._frames_pinned >= self.max_pinned))
+
+    def _make_room(self, release):
+        """Apply the drop policy to a full queue or pin budget (called with the lock held)"""
+        if self.drop_policy == 'block':
+            self._cond.wait_for(lambda: not self._full(release),
+                                timeout=config.RECORDING_BLOCK_TIMEOUT)
+            return not self._full(release)
+
+        if self.drop_policy == 'drop_oldest':
+            # Out of pins rather than queue space: the oldest pinned frame has to go
+            need_pin = self._frames_queued < self.max_queue
+            for i, item in enumerate(self._queue):
+                if item[0] in ('frame', 'preroll') and (item[2] or not need_pin):
+                    del self._queue[i]
+                    self._frames_queued -= 1
+                    self.frames_dropped += 1
+                    if item[2]:
+                        self._frames_pinned -= 1
+                        item[2]()
+                    return True
+
+        # 'drop_newest': discard the incoming frame
+        return False
+
+    def stats(self):
+        """Get recorder metrics"""
+        with self._cond:
+            preroll = self.preroll.stats() if self.preroll else None
+            return {
+                'preroll': preroll,
+                'is_recording': self.is_recording,
+                'path': self.current_path,
+                'queue_depth': self._frames_queued,
+                'max_queue_depth': self.max_queue_depth,
+                'queue_size': self.max_queue,
+                'pinned_frames': self._frames_pinned,
+                'max_pinned': self.max_pinned,
+                'drop_policy': self.drop_policy,
+                'frames_written': self.frames_written,
+                'frames_dropped': self.frames_dropped
+            }
+
+    def close(self, timeout=5.0):
+        """Stop any recording, flush the queue and join the writer thread"""
+        self.stop()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        """Writer thread: drain the queue and encode frames"""
+        writer = None
+        segment = None
+
+        while True:
+            with self._cond:
+                while not self._queue and self._running:
+                    self._cond.wait()
+
+                if not self._queue:
+                    break
+
+                kind, payload, release, overlay = self._queue.popleft()
+                if kind in ('frame', 'preroll'):
+                    self._frames_queued -= 1
+                    self._cond.notify_all()  # Wake a producer blocked on a full queue
+
+            try:
+                if self.annotate and overlay and kind in ('frame', 'preroll'):
+                    payload = self._annotated(payload, overlay)
+
+                if kind == 'start':
+                    self._close_segment(writer, segment)
+                    writer = None
+                    segment = payload
+                    segment['start_time'] = datetime.now().isoformat()
+
+                    # Footage from before the trigger goes first
+                    if self.preroll:
+                        frames = self.preroll.drain()
+                        if frames:
+                            started = datetime.now() - timedelta(seconds=len(frames) / self.fps)
+                            segment['start_time'] = started.isoformat()
+                        for data in frames:
+                            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                            if frame is not None:
+                                writer = self._write_frame(writer, segment, frame)
+
+                elif kind == 'frame':
+                    if segment:
+                        writer = self._write_frame(writer, segment, payload)
+
+                elif kind == 'preroll':
+                    if self.preroll:
+                        self.preroll.add(payload, time.monotonic())
+
+                elif kind == 'stop':
+                    self._close_segment(writer, segment)
+                    writer = None
+                    segment = None
+
+            except Exception as e:
+                print(f"Recorder error: {e}")
+
+            finally:
+                if release:
+                    release()
+                    with self._cond:
+                        self._frames_pinned -= 1
+                        self._cond.notify_all()  # ...or on the pin budget
+
+        self._close_segment(writer, segment)
+
+    def _annotated(self, frame, overlay):
+        """Draw the overlay on a copy of the frame (writer thread only)"""
+        if self._scratch is None or self._scratch.shape != frame.shape:
+            self._scratch = np.empty_like(frame)
+        np.copyto(self._scratch, frame)
+        return draw_annotations(self._scratch, overlay)
+
+    def _write_frame(self, writer, segment, frame):
+        """Write one frame, opening the file on first use (writer thread only)"""
+        if writer is None:
+            # Open lazily so the file matches the real frame size
+            height, width = frame.shape[:2]
+            fourcc = cv2.VideoWriter_fourcc(*config.VIDEO_CODEC)
+            writer = cv2.VideoWriter(segment['file_path'], fourcc, self.fps, (width, height))
+        writer.write(frame)
+        segment['frame_count'] += 1
+        self.frames_written += 1
+        return writer
+
+    def _close_segment(self, writer, segment):
+        """Finish a segment file and report it (writer thread only)"""
+        if writer:
+            writer.release()
+
+        if segment is None or segment['frame_count'] == 0:
+            return
+
+        # note_detection() may still be counting into this segment
+        with self._cond:
+            segment = dict(segment)
+
+        segment['end_time'] = datetime.now().isoformat()
+        try:
+            segment['byte_size'] = os.path.getsize(segment['file_path'])
+        except OSError:
+            segment['byte_size'] = 0
+
+        if self.on_segment:
+            try:
+                self.on_segment(**segment)
+            except Exception as e:
+                print(f"Error registering recording segment: {e}")
@@ -0,0 +1,127 @@
+"""
+Recording Indexer Module for AI Surveillance System
+Extracts video metadata and a poster thumbnail once per recording, in the background
+"""
+import os
+import queue
+import threading
+import config
+from utils import probe_video
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+class RecordingIndexer:
+    def __init__(self, db, thumbnail_dir=None):
+        """
+        Start the indexer thread
+
+        Closed segments are registered through add_segment() and probed once.
+        On start, every recording whose file size or mtime no longer matches
+        what was indexed is probed again, so listings never open video files.
+        `on_thumbnail(nbytes)` is called with the change in thumbnail bytes
+        each time a poster thumbnail is written.
+        """
+        self.db = db
+        self.on_thumbnail = None
+        self.thumbnail_dir = thumbnail_dir or config.RECORDING_THUMBNAILS_DIR
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+
+        self._queue = queue.Queue()
+        self._queue.put(('sweep', None))
+
+        # Metrics
+        self.indexed = 0
+        self.failed = 0
+
+        self._thread = threading.Thread(target=self._run, name='recording-indexer', daemon=True)
+        self._thread.start()
+
+    def add_segment(self, **segment):
+        """VideoRecorder on_segment callback: register the segment and queue it for indexing"""
+        self.db.add_recording(**segment)
+        self.submit(segment['file_path'])
+
+    def submit(self, file_path):
+        """Queue a recording file to be (re)indexed"""
+        self._queue.put(('index', file_path))
+
+    def sweep(self):
+        """Queue every recording whose file changed since it was indexed"""
+        self._queue.put(('sweep', None))
+
+    def close(self):
+        """Finish queued work and stop the thread"""
+        self._queue.put(('stop', None))
+        self._thread.join()
+
+    def stats(self):
+        """Get indexer metrics"""
+        return {
+            'pending': self._queue.qsize(),
+            'indexed': self.indexed,
+            'failed': self.failed
+        }
+
+    def _run(self):
+        """Indexer loop"""
+        while True:
+            command, file_path = self._queue.get()
+
+            if command == 'stop':
+                return
+            try:
+                if command == 'sweep':
+                    self._sweep()
+                else:
+                    self._index(file_path)
+            except Exception as e:
+                self.failed += 1
+                print(f"Error indexing recording {file_path}: {e}")
+
+    def _sweep(self):
+        """Index new recordings and re-index those whose size or mtime changed"""
+        for row in self.db.get_recordings_to_index():
+            file_path = row['file_path']
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+
+            if (row['indexed_at'] is None or row['file_size'] != st.st_size
+                    or row['file_mtime'] != st.st_mtime):
+                self._index(file_path, st)
+
+    def _index(self, file_path, st=None):
+        """Probe one recording and store its metadata"""
+        if st is None:
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                return
+
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        thumbnail_path = os.path.join(self.thumbnail_dir, f"{name}.jpg")
+        old_size = _file_size(thumbnail_path)
+
+        info = probe_video(file_path, thumbnail_path)
+        if info is None:
+            self.failed += 1
+            return
+        if self.on_thumbnail:
+            self.on_thumbnail(_file_size(thumbnail_path) - old_size)
+
+        self.db.update_recording_media(
+            file_path,
+            width=info['width'],
+            height=info['height'],
+            fps=info['fps'],
+            duration=info['duration'],
+            file_size=st.st_size,
+            file_mtime=st.st_mtime,
+            thumbnail_path=info['thumbnail_path']
+        )
+        self.indexed += 1
@@ -0,0 +1,221 @@
+"""
+Storage Manager Module for AI Surveillance System
+Keeps recordings, face crops and thumbnails within the max_storage_gb quota
+"""
+import os
+import threading
+from datetime import datetime
+import config
+
+def _dir_bytes(directory):
+    """Total size of the files under a directory"""
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class StorageManager:
+    def __init__(self, db, crop_store=None, policy=None, check_interval=None):
+        """
+        Start the retention thread
+
+        Usage is tracked in a ledger: measured once at start (recordings from
+        the database, crop shard files, the thumbnail directories), then
+        updated through add() as segments close and crops and thumbnails are
+        written, so quota checks never walk the data directories.
+
+        When usage crosses the quota, the oldest data is evicted until usage
+        drops below STORAGE_LOW_WATER of it. 'oldest_first' evicts recordings
+        and crops purely by age; 'protect_detections' keeps recordings that
+        contain detections and the face crops themselves. Evicted crops only
+        free disk space once their shards are compacted, so the crop ledger is
+        re-measured from the shard files afterwards.
+
+        Crops saved as loose files (CROP_STORAGE = 'files', no `crop_store`)
+        cannot be evicted and are left out of the quota.
+
+        If usage is over the quota and the policy leaves nothing to evict, the
+        condition is logged once and the thread backs off: it only tries again
+        when the quota changes or usage grows by STORAGE_RETRY_GROWTH of it.
+        """
+        self.db = db
+        self.crop_store = crop_store
+        self.policy = policy or config.STORAGE_EVICTION_POLICY
+        self.check_interval = check_interval or config.STORAGE_CHECK_INTERVAL
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = True
+        self._stalled = None  # (quota, usage) when the last run found nothing to evict
+
+        # Ledger (bytes)
+        self.usage = {
+            'recordings': db.get_recording_bytes(),
+            'crops': crop_store.total_bytes() if crop_store else 0,
+            'thumbnails': _dir_bytes(config.THUMBNAILS_DIR)
+        }
+
+        # Metrics
+        self.reclaimed_bytes = 0
+        self.evicted_recordings = 0
+        self.evicted_crops = 0
+        self.last_run = None
+
+        self._thread = threading.Thread(target=self._run, name='storage-manager', daemon=True)
+        self._thread.start()
+
+    def add(self, kind, nbytes):
+        """Record new data in the ledger (negative if removed); wakes the thread if over quota"""
+        with self._lock:
+            self.usage[kind] = max(0, self.usage.get(kind, 0) + nbytes)
+            used = sum(self.usage.values())
+        quota = self.quota_bytes()
+        if used > quota and self._should_retry(used, quota):
+            self._wake.set()
+
+    def _should_retry(self, used, quota):
+        """Whether eviction is worth trying again after a run that found nothing to evict"""
+        stalled = self._stalled
+        if stalled is None or stalled[0] != quota:
+            return True
+        return used >= stalled[1] + quota * config.STORAGE_RETRY_GROWTH
+
+    def quota_bytes(self):
+        """Current quota from the max_storage_gb setting"""
+        return int(float(self.db.get_setting('max_storage_gb', 50)) * 1024 ** 3)
+
+    def enforce(self):
+        """Evict data until usage is under the low-water mark; returns bytes reclaimed"""
+        quota = self.quota_bytes()
+        with self._lock:
+            used = sum(self.usage.values())
+        if used <= quota:
+            self._stalled = None
+            return 0
+        if not self._should_retry(used, quota):
+            return 0
+
+        target = int(quota * config.STORAGE_LOW_WATER)
+        protect = self.policy == 'protect_detections'
+        reclaimed = 0
+        crops_evicted = 0
+
+        while used > target:
+            recordings = self.db.get_oldest_recordings(limit=50, include_detections=not protect)
+            crops = self.crop_store.oldest(limit=50) if self.crop_store and not protect else []
+            if not recordings and not crops:
+                if self._stalled is None:
+                    self.db.log_system_event(
+                        "WARNING",
+                        f"Storage at {used / 1024 ** 2:.0f} MB of a {quota / 1024 ** 2:.0f} MB quota, "
+                        f"but nothing is left to evict",
+                        f"policy={self.policy}")
+                self._stalled = (quota, used)
+                break
+
+            # Merge both candidate lists by age
+            candidates = [(r['start_time'], 'recording', r) for r in recordings]
+            candidates += [(c[2], 'crop', c) for c in crops]
+            candidates.sort(key=lambda c: c[0])
+
+            crop_names = []
+            before = used
+            for _, kind, item in candidates:
+                if used <= target:
+                    break
+                if kind == 'recording':
+                    freed = self._evict_recording(item)
+                    reclaimed += freed
+                else:
+                    # Counted as freed for this loop; the ledger waits for compaction
+                    crop_names.append(item[0])
+                    freed = item[1]
+                    crops_evicted += 1
+                used -= freed
+
+            if crop_names:
+                self.crop_store.delete(crop_names)
+            self._stalled = None
+            if used == before:
+                break  # Nothing could be freed (e.g. database errors)
+
+        if crops_evicted:
+            self.evicted_crops += crops_evicted
+            # The active shard may hold evicted crops too; seal it so it can be rewritten
+            self.crop_store.seal()
+            self.crop_store.compact()
+            crop_bytes = self.crop_store.total_bytes()
+            with self._lock:
+                reclaimed += max(0, self.usage['crops'] - crop_bytes)
+                self.usage['crops'] = crop_bytes
+
+        self.reclaimed_bytes += reclaimed
+        if reclaimed:
+            self.db.log_system_event("INFO", f"Storage quota enforced: reclaimed {reclaimed / 1024 ** 2:.1f} MB",
+                                     f"policy={self.policy}")
+        return reclaimed
+
+    def _evict_recording(self, recording):
+        """Delete a recording file, its thumbnail and its row; returns its size"""
+        if recording['thumbnail_path']:
+            try:
+                self._debit('thumbnails', os.path.getsize(recording['thumbnail_path']))
+            except OSError:
+                pass
+
+        for path in (recording['file_path'], recording['thumbnail_path']):
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error deleting {path}: {e}")
+
+        self.db.delete_recording(recording['id'])
+        size = recording['size'] or 0
+        self._debit('recordings', size)
+        self.evicted_recordings += 1
+        return size
+
+    def _debit(self, kind, nbytes):
+        with self._lock:
+            self.usage[kind] = max(0, self.usage[kind] - nbytes)
+
+    def stats(self):
+        """Get usage and eviction metrics"""
+        with self._lock:
+            usage = dict(self.usage)
+        return {
+            'usage_bytes': usage,
+            'total_bytes': sum(usage.values()),
+            'quota_bytes': self.quota_bytes(),
+            'policy': self.policy,
+            'reclaimed_bytes': self.reclaimed_bytes,
+            'evicted_recordings': self.evicted_recordings,
+            'evicted_crops': self.evicted_crops,
+            'nothing_to_evict': self._stalled is not None,
+            'last_run': self.last_run
+        }
+
+    def close(self):
+        """Stop the retention thread"""
+        self._running = False
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        """Check the quota periodically, or as soon as add() crosses it"""
+        while self._running:
+            try:
+                self.enforce()
+                self.last_run = datetime.now().isoformat()
+            except Exception as e:
+                print(f"Storage enforcement error: {e}")
+
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
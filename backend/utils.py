@@ -56,6 +56,42 @@ def get_video_info(video_path):
     cap.release()
     return info
 
+def probe_video(video_path, thumbnail_path=None, thumbnail_width=320):
+    """
+    Read video metadata and save a poster thumbnail with a single open
+    Returns an info dict (without 'size'), or None if the file cannot be read
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        cap.release()
+        return None
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    info = {
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': fps,
+        'frame_count': frame_count,
+        'duration': frame_count / fps if fps else 0,
+        'thumbnail_path': None
+    }
+    
+    if thumbnail_path:
+        # Poster from a third of the way in (the start is often pre-record footage)
+        if frame_count > 3:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 3)
+        ret, frame = cap.read()
+        
+        if ret:
+            height = int(frame.shape[0] * thumbnail_width / frame.shape[1])
+            thumbnail = cv2.resize(frame, (thumbnail_width, height), interpolation=cv2.INTER_AREA)
+            if cv2.imwrite(thumbnail_path, thumbnail):
+                info['thumbnail_path'] = thumbnail_path
+    
+    cap.release()
+    return info
+
 def cleanup_old_recordings(days=7):
     """Delete recordings older than specified days"""
     import config
@@ -83,6 +119,7 @@ def cleanup_old_recordings(days=7):
 def export_detections_to_json(db, output_file, days=30):
     """Export detections to JSON file"""
     from datetime import timedelta
+    from database import iso_from_ms
     
     detections = db.get_recent_detections(limit=1000)
     
@@ -90,7 +127,7 @@ def export_detections_to_json(db, output_file, days=30):
     for det in detections:
         export_data.append({
             'id': det[0],
-            'timestamp': det[1],
+            'timestamp': iso_from_ms(det[1]),
             'person_id': det[2],
             'person_name': det[3],
             'confidence': det[4],
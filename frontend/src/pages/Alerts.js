@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { toast } from 'react-toastify';
 import {
   Bell,
@@ -7,21 +7,38 @@ import {
   X,
   RefreshCw
 } from 'lucide-react';
-import { alertsAPI } from '../services/api';
+import { alertsAPI, subscribeEvents } from '../services/api';
 import './Alerts.css';
 
+// Alerts fetched per page; older ones are loaded on demand
+const PAGE_SIZE = 50;
+
 const Alerts = () => {
   const [alerts, setAlerts] = useState([]);
+  const [counts, setCounts] = useState({ total: 0, pending: 0, acknowledged: 0 });
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filter, setFilter] = useState('all'); // all, unacknowledged
 
-  // Fetch alerts
-  const fetchAlerts = async () => {
+  // Latest list for the event handlers, which are set up once per filter
+  const alertsRef = useRef(alerts);
+  useEffect(() => {
+    alertsRef.current = alerts;
+  }, [alerts]);
+
+  // Fetch the newest page of alerts
+  const fetchAlerts = useCallback(async () => {
     setLoading(true);
     try {
-      const response = await alertsAPI.getAll();
+      const response = await alertsAPI.getAll({
+        status: filter === 'all' ? 'all' : 'pending',
+        limit: PAGE_SIZE,
+      });
       if (response.data.success) {
         setAlerts(response.data.alerts);
+        setCounts(response.data.counts);
+        setNextCursor(response.data.next_cursor);
       }
     } catch (error) {
       toast.error('Failed to fetch alerts');
@@ -29,15 +46,54 @@ const Alerts = () => {
     } finally {
       setLoading(false);
     }
+  }, [filter]);
+
+  // Append the next page of older alerts
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await alertsAPI.getAll({
+        status: filter === 'all' ? 'all' : 'pending',
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      if (response.data.success) {
+        setAlerts(prev => [...prev, ...response.data.alerts]);
+        setNextCursor(response.data.next_cursor);
+      }
+    } catch (error) {
+      toast.error('Failed to load more alerts');
+      console.error(error);
+    } finally {
+      setLoadingMore(false);
+    }
   };
 
   useEffect(() => {
     fetchAlerts();
     
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(fetchAlerts, 10000);
-    return () => clearInterval(interval);
-  }, []);
+    // New alerts are pushed by the server as they happen
+    const unsubscribe = subscribeEvents({
+      alert: (alert) => {
+        setAlerts(prev => [alert, ...prev]);
+        setCounts(prev => ({ ...prev, total: prev.total + 1, pending: prev.pending + 1 }));
+        toast.warning(alert.description || 'New alert');
+      },
+      alert_acknowledged: ({ id }) => {
+        // Already counted if a refetch (e.g. after our own acknowledge) shows it acknowledged
+        const known = alertsRef.current.find(a => a.id === id);
+        if (known && known.acknowledged) return;
+        setAlerts(prev => prev.map(a => (a.id === id ? { ...a, acknowledged: 1 } : a)));
+        setCounts(prev => ({
+          ...prev,
+          pending: Math.max(0, prev.pending - 1),
+          acknowledged: prev.acknowledged + 1,
+        }));
+      },
+      reconnect: fetchAlerts,
+    });
+    return unsubscribe;
+  }, [fetchAlerts]);
 
   // Acknowledge alert
   const handleAcknowledge = async (alertId) => {
@@ -60,8 +116,6 @@ const Alerts = () => {
     ? alerts
     : alerts.filter(alert => alert.acknowledged === 0);
 
-  const unacknowledgedCount = alerts.filter(a => a.acknowledged === 0).length;
-
   return (
     <div className="alerts-page">
       <div className="page-header">
@@ -81,17 +135,17 @@ const Alerts = () => {
       <div className="alert-stats">
         <div className="stat-item">
           <Bell size={20} />
-          <span className="stat-count">{alerts.length}</span>
+          <span className="stat-count">{counts.total}</span>
           <span className="stat-label">Total Alerts</span>
         </div>
         <div className="stat-item warning">
           <AlertTriangle size={20} />
-          <span className="stat-count">{unacknowledgedCount}</span>
+          <span className="stat-count">{counts.pending}</span>
           <span className="stat-label">Unacknowledged</span>
         </div>
         <div className="stat-item success">
           <CheckCircle size={20} />
-          <span className="stat-count">{alerts.length - unacknowledgedCount}</span>
+          <span className="stat-count">{counts.acknowledged}</span>
           <span className="stat-label">Acknowledged</span>
         </div>
       </div>
@@ -102,13 +156,13 @@ const Alerts = () => {
           className={`filter-btn ${filter === 'all' ? 'active' : ''}`}
           onClick={() => setFilter('all')}
         >
-          All Alerts ({alerts.length})
+          All Alerts ({counts.total})
         </button>
         <button
           className={`filter-btn ${filter === 'unacknowledged' ? 'active' : ''}`}
           onClick={() => setFilter('unacknowledged')}
         >
-          Unacknowledged ({unacknowledgedCount})
+          Unacknowledged ({counts.pending})
         </button>
       </div>
 
@@ -181,6 +235,12 @@ const Alerts = () => {
           ))
         )}
       </div>
+
+      {nextCursor && (
+        <button className="load-more-btn" onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? 'Loading...' : 'Load older alerts'}
+        </button>
+      )}
     </div>
   );
 };
@@ -12,7 +12,7 @@ import {
   Activity,
   RefreshCw
 } from 'lucide-react';
-import { cameraAPI, recordingAPI, reportsAPI, alertsAPI } from '../services/api';
+import { cameraAPI, recordingAPI, reportsAPI, alertsAPI, subscribeEvents } from '../services/api';
 import './Dashboard.css';
 
 const Dashboard = () => {
@@ -23,6 +23,7 @@ const Dashboard = () => {
   });
   
   const [currentFrame, setCurrentFrame] = useState(null);
+  const [frameOverlay, setFrameOverlay] = useState(null);
   const [statistics, setStatistics] = useState({
     total_detections: 0,
     known_persons: 0,
@@ -43,20 +44,6 @@ const Dashboard = () => {
     }
   }, []);
 
-  // Fetch current frame
-  const fetchFrame = useCallback(async () => {
-    if (!cameraStatus.is_running) return;
-    
-    try {
-      const response = await cameraAPI.getFrame();
-      if (response.data.success) {
-        setCurrentFrame(response.data.frame);
-      }
-    } catch (error) {
-      console.error('Failed to fetch frame:', error);
-    }
-  }, [cameraStatus.is_running]);
-
   // Fetch statistics
   const fetchStatistics = useCallback(async () => {
     try {
@@ -111,6 +98,7 @@ const Dashboard = () => {
         toast.success('Camera stopped');
         setCameraStatus(prev => ({ ...prev, is_running: false, is_recording: false }));
         setCurrentFrame(null);
+        setFrameOverlay(null);
       } else {
         toast.error(response.data.message || 'Failed to stop camera');
       }
@@ -166,23 +154,79 @@ const Dashboard = () => {
     fetchRecentDetections();
   }, [fetchCameraStatus, fetchStatistics, fetchRecentDetections]);
 
-  // Update frame periodically
+  // Update frame: long-poll the binary endpoint, which only answers with a new frame
   useEffect(() => {
-    if (cameraStatus.is_running) {
-      const interval = setInterval(fetchFrame, 500); // Update every 500ms for smooth video
-      return () => clearInterval(interval);
-    }
-  }, [cameraStatus.is_running, fetchFrame]);
+    if (!cameraStatus.is_running) return undefined;
+
+    let cancelled = false;
+    let lastSeq = 0;
+    let objectUrl = null;
+
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+
+    const pollFrames = async () => {
+      while (!cancelled) {
+        const started = Date.now();
+        try {
+          const response = await cameraAPI.getFrameJpeg(lastSeq);
+          if (cancelled) break;
+
+          if (response.status === 200) {
+            lastSeq = parseInt(response.headers['x-frame-seq'], 10) || lastSeq;
+            const url = URL.createObjectURL(response.data);
+            if (objectUrl) URL.revokeObjectURL(objectUrl);
+            objectUrl = url;
+            setCurrentFrame(url);
 
-  // Update statistics periodically
+            // The frame is raw; boxes and labels are drawn here from its metadata
+            const [width, height] = (response.headers['x-frame-size'] || '0x0').split('x').map(Number);
+            const overlay = JSON.parse(response.headers['x-frame-overlay'] || '{}');
+            setFrameOverlay({ ...overlay, width, height });
+          }
+        } catch (error) {
+          console.error('Failed to fetch frame:', error);
+          await sleep(1000);
+        }
+
+        // At most one frame every 500ms per viewer
+        await sleep(Math.max(0, 500 - (Date.now() - started)));
+      }
+    };
+
+    pollFrames();
+
+    return () => {
+      cancelled = true;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
+  }, [cameraStatus.is_running]);
+
+  // Live updates pushed by the server instead of polling
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchStatistics();
-      fetchRecentDetections();
-    }, 5000); // Update every 5 seconds
-    
-    return () => clearInterval(interval);
-  }, [fetchStatistics, fetchRecentDetections]);
+    const unsubscribe = subscribeEvents({
+      camera: (state) => setCameraStatus(prev => ({ ...prev, ...state })),
+      stats: (delta) => setStatistics(prev => {
+        const next = { ...prev };
+        Object.entries(delta).forEach(([key, value]) => {
+          next[key] = (next[key] || 0) + value;
+        });
+        return next;
+      }),
+      detection: (detection) => {
+        if (detection.is_intruder) {
+          setRecentDetections(prev => [detection, ...prev]);
+        }
+      },
+      alert_acknowledged: fetchStatistics,
+      reconnect: () => {
+        fetchCameraStatus();
+        fetchStatistics();
+        fetchRecentDetections();
+      },
+    });
+
+    return unsubscribe;
+  }, [fetchCameraStatus, fetchStatistics, fetchRecentDetections]);
 
   return (
     <div className="dashboard">
@@ -254,7 +298,40 @@ const Dashboard = () => {
 
             <div className="camera-feed">
               {currentFrame ? (
-                <img src={currentFrame} alt="Camera feed" className="feed-image" />
+                <>
+                  <img src={currentFrame} alt="Camera feed" className="feed-image" />
+                  {frameOverlay && frameOverlay.width > 0 && (
+                    <svg
+                      className="feed-overlay"
+                      viewBox={`0 0 ${frameOverlay.width} ${frameOverlay.height}`}
+                      preserveAspectRatio="xMidYMid meet"
+                    >
+                      {(frameOverlay.faces || []).map((face, index) => {
+                        const [x1, y1, x2, y2] = face.bbox;
+                        const color = face.name ? '#22c55e' : '#ef4444';
+                        const label = face.name
+                          ? `${face.name} (${face.confidence.toFixed(2)})`
+                          : 'Unknown';
+                        return (
+                          <g key={index}>
+                            <rect x={x1} y={y1} width={x2 - x1} height={y2 - y1}
+                              fill="none" stroke={color} strokeWidth="2" />
+                            <text x={x1} y={y1 - 6} fill="#fff" stroke={color}
+                              strokeWidth="3" paintOrder="stroke" fontSize="14">
+                              {label}
+                            </text>
+                          </g>
+                        );
+                      })}
+                      {frameOverlay.timestamp && (
+                        <text x="10" y="28" fill="#fff" fontSize="16"
+                          stroke="#000" strokeWidth="3" paintOrder="stroke">
+                          {frameOverlay.timestamp}
+                        </text>
+                      )}
+                    </svg>
+                  )}
+                </>
               ) : (
                 <div className="feed-placeholder">
                   <CameraOff size={64} />
@@ -11,12 +11,18 @@ import {
 import { reportsAPI } from '../services/api';
 import './Reports.css';
 
+// Intruder detections fetched per page in the history tab
+const HISTORY_PAGE_SIZE = 60;
+
 const Reports = () => {
   const [selectedDate, setSelectedDate] = useState(
     new Date().toISOString().split('T')[0]
   );
   const [dailyReport, setDailyReport] = useState(null);
   const [intruderReport, setIntruderReport] = useState([]);
+  const [intruderTotal, setIntruderTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(false);
   const [activeTab, setActiveTab] = useState('daily');
 
@@ -40,9 +46,11 @@ const Reports = () => {
   const fetchIntruderReport = async () => {
     setLoading(true);
     try {
-      const response = await reportsAPI.getIntruderReport();
+      const response = await reportsAPI.getIntruderReport({ limit: HISTORY_PAGE_SIZE });
       if (response.data.success) {
         setIntruderReport(response.data.intruders);
+        setIntruderTotal(response.data.total);
+        setNextCursor(response.data.next_cursor);
       }
     } catch (error) {
       toast.error('Failed to fetch intruder report');
@@ -52,6 +60,26 @@ const Reports = () => {
     }
   };
 
+  // Append the next page of older intruder detections
+  const loadMoreIntruders = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await reportsAPI.getIntruderReport({
+        limit: HISTORY_PAGE_SIZE,
+        cursor: nextCursor,
+      });
+      if (response.data.success) {
+        setIntruderReport(prev => [...prev, ...response.data.intruders]);
+        setNextCursor(response.data.next_cursor);
+      }
+    } catch (error) {
+      toast.error('Failed to load more intruders');
+      console.error(error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (activeTab === 'daily') {
       fetchDailyReport(selectedDate);
@@ -146,7 +174,7 @@ const Reports = () => {
                   </div>
                   <div className="summary-content">
                     <div className="summary-value">
-                      {(dailyReport.intruders || []).length}
+                      {dailyReport.intruder_count}
                     </div>
                     <div className="summary-label">Intruders Detected</div>
                   </div>
@@ -192,7 +220,7 @@ const Reports = () => {
                         <div className="intruder-image">
                           {intruder.face_image_path ? (
                             <img
-                              src={`http://localhost:5000/api/images/${intruder.face_image_path.split(/[/\\]/).pop()}`}
+                              src={`http://localhost:5000/api/images/${intruder.face_image_path.split(/[/\\]/).pop()}?size=240`}
                               alt="Intruder"
                             />
                           ) : (
@@ -233,7 +261,7 @@ const Reports = () => {
           ) : intruderReport.length > 0 ? (
             <div className="intruders-history">
               <div className="history-header">
-                <h3>All Intruder Detections</h3>
+                <h3>All Intruder Detections ({intruderTotal})</h3>
                 <div className="filter-btn">
                   <Filter size={16} />
                   Filter
@@ -246,7 +274,7 @@ const Reports = () => {
                     <div className="intruder-image">
                       {intruder.face_image_path ? (
                         <img
-                          src={`http://localhost:5000/api/images/${intruder.face_image_path.split(/[/\\]/).pop()}`}
+                          src={`http://localhost:5000/api/images/${intruder.face_image_path.split(/[/\\]/).pop()}?size=240`}
                           alt="Intruder"
                           onError={(e) => {
                             e.target.style.display = 'none';
@@ -268,6 +296,12 @@ const Reports = () => {
                   </div>
                 ))}
               </div>
+
+              {nextCursor && (
+                <button className="load-more-btn" onClick={loadMoreIntruders} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load older detections'}
+                </button>
+              )}
             </div>
           ) : (
             <div className="empty-state">
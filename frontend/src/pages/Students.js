@@ -12,6 +12,9 @@ import {
 import { studentsAPI, detectionsAPI } from '../services/api';
 import './Students.css';
 
+// Detections fetched per page in the details modal
+const DETECTIONS_PAGE_SIZE = 20;
+
 const Students = () => {
   const [students, setStudents] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
@@ -77,11 +80,14 @@ const Students = () => {
     setShowDetailsModal(true);
     
     try {
-      const response = await detectionsAPI.getByStudent(student.name);
+      const response = await detectionsAPI.getByStudent(student.name, {
+        limit: DETECTIONS_PAGE_SIZE
+      });
       if (response.data.success) {
         setSelectedStudent(prev => ({
           ...prev,
-          detections: response.data.detections
+          detections: response.data.detections,
+          nextCursor: response.data.next_cursor
         }));
       }
     } catch (error) {
@@ -89,6 +95,26 @@ const Students = () => {
     }
   };
 
+  // Append the next page of the selected student's detections
+  const handleLoadMoreDetections = async () => {
+    try {
+      const response = await detectionsAPI.getByStudent(selectedStudent.name, {
+        limit: DETECTIONS_PAGE_SIZE,
+        cursor: selectedStudent.nextCursor
+      });
+      if (response.data.success) {
+        setSelectedStudent(prev => ({
+          ...prev,
+          detections: [...prev.detections, ...response.data.detections],
+          nextCursor: response.data.next_cursor
+        }));
+      }
+    } catch (error) {
+      toast.error('Failed to load more detections');
+      console.error(error);
+    }
+  };
+
   return (
     <div className="students-page">
       <div className="page-header">
@@ -135,7 +161,7 @@ const Students = () => {
               <div className="student-image">
                 {student.image_path ? (
                   <img
-                    src={`http://localhost:5000/api/images/${student.image_path.split(/[/\\]/).pop()}`}
+                    src={`http://localhost:5000/api/images/${student.image_path.split(/[/\\]/).pop()}?size=240`}
                     alt={student.name}
                     onError={(e) => {
                       e.target.style.display = 'none';
@@ -199,6 +225,7 @@ const Students = () => {
       {showDetailsModal && selectedStudent && (
         <StudentDetailsModal
           student={selectedStudent}
+          onLoadMore={handleLoadMoreDetections}
           onClose={() => {
             setShowDetailsModal(false);
             setSelectedStudent(null);
@@ -443,7 +470,7 @@ const AddStudentModal = ({ onClose, onSuccess }) => {
 };
 
 // Student Details Modal Component
-const StudentDetailsModal = ({ student, onClose }) => {
+const StudentDetailsModal = ({ student, onLoadMore, onClose }) => {
   return (
     <div className="modal-overlay" onClick={onClose}>
       <div className="modal-content large" onClick={(e) => e.stopPropagation()}>
@@ -479,7 +506,7 @@ const StudentDetailsModal = ({ student, onClose }) => {
             <h4>Detection History</h4>
             {student.detections && student.detections.length > 0 ? (
               <div className="detections-list">
-                {student.detections.slice(0, 10).map((detection, index) => (
+                {student.detections.map((detection, index) => (
                   <div key={index} className="detection-item">
                     <div className="detection-time">
                       {new Date(detection.timestamp).toLocaleString()}
@@ -493,6 +520,11 @@ const StudentDetailsModal = ({ student, onClose }) => {
             ) : (
               <p className="no-detections">No detections recorded yet</p>
             )}
+            {student.nextCursor && (
+              <button className="load-more-btn" onClick={onLoadMore}>
+                Load older detections
+              </button>
+            )}
           </div>
         </div>
       </div>
@@ -15,6 +15,13 @@ export const cameraAPI = {
   stop: () => api.post('/camera/stop'),
   getStatus: () => api.get('/camera/status'),
   getFrame: () => api.get('/camera/frame'),
+  // Binary JPEG; resolves with 304 when no newer frame arrived within the timeout
+  getFrameJpeg: (after) => api.get('/camera/frame.jpg', {
+    params: { after },
+    responseType: 'blob',
+    validateStatus: (status) => status === 200 || status === 304,
+  }),
+  getFaces: () => api.get('/camera/faces'),
   takeSnapshot: () => api.post('/camera/snapshot'),
 };
 
@@ -22,6 +29,8 @@ export const cameraAPI = {
 export const recordingAPI = {
   start: () => api.post('/recording/start'),
   stop: () => api.post('/recording/stop'),
+  list: (params = {}) => api.get('/recordings', { params }),
+  forDetection: (id, padding = 30) => api.get(`/detections/${id}/recordings?padding=${padding}`),
 };
 
 // Student Management
@@ -33,22 +42,53 @@ export const studentsAPI = {
 };
 
 // Detections
+// Listings are paged: pass the previous response's next_cursor as params.cursor
 export const detectionsAPI = {
-  getRecent: (limit = 50) => api.get(`/detections/recent?limit=${limit}`),
-  getByStudent: (name) => api.get(`/detections/student/${encodeURIComponent(name)}`),
+  // params: { cursor, limit, camera_id, start, end, known }
+  getRecent: (params = {}) => api.get('/detections/recent', { params }),
+  getByStudent: (name, params = {}) =>
+    api.get(`/detections/student/${encodeURIComponent(name)}`, { params }),
 };
 
 // Alerts
 export const alertsAPI = {
-  getAll: () => api.get('/alerts'),
+  // params: { cursor, limit, status: 'pending' | 'acknowledged' | 'all', type, start, end }
+  getAll: (params = {}) => api.get('/alerts', { params }),
   acknowledge: (id) => api.post(`/alerts/${id}/acknowledge`),
 };
 
 // Statistics & Reports
 export const reportsAPI = {
   getStatistics: () => api.get('/statistics'),
-  getDailyReport: (date) => api.get(`/reports/daily?date=${date}`),
-  getIntruderReport: () => api.get('/reports/intruders'),
+  // params: { start, end, camera_id, limit, cursor } (days are YYYY-MM-DD, inclusive)
+  getDailyReport: (date, params = {}) => api.get('/reports/daily', { params: { date, ...params } }),
+  getIntruderReport: (params = {}) => api.get('/reports/intruders', { params }),
+};
+
+// Live events pushed by the server (Server-Sent Events)
+// handlers: { [eventType]: (data) => void, reconnect: () => void }
+// Returns a function that closes the connection
+export const subscribeEvents = (handlers) => {
+  const source = new EventSource(`${API_BASE_URL}/events`);
+  let connectedOnce = false;
+
+  source.onopen = () => {
+    // Events may have been missed while disconnected - let the page resync
+    if (connectedOnce && handlers.reconnect) handlers.reconnect();
+    connectedOnce = true;
+  };
+
+  // The server dropped events because this client fell behind - resync the same way
+  source.addEventListener('resync', () => {
+    if (handlers.reconnect) handlers.reconnect();
+  });
+
+  Object.entries(handlers).forEach(([type, handler]) => {
+    if (type === 'reconnect') return;
+    source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+  });
+
+  return () => source.close();
 };
 
 // System